@@ -0,0 +1,131 @@
+"""
+File containing the microbenchmark of host identifier parsing over a large cases file.
+Results are appended to the same JSON lines file as the stage benchmarks.
+"""
+import json
+import logging
+import platform
+import time
+from datetime import datetime, timezone
+
+import click
+import yaml
+
+from benchmarks.run_benchmarks import (
+    DEFAULT_RESULTS_FILE,
+    LOGGER,
+    git_commit,
+    previous_entry,
+    summarize,
+)
+from benchmarks.synthetic_cluster import SyntheticCluster
+from illuminatio.host import Host, _parse_identifier
+from illuminatio.test_case import from_merged_dict, merge_in_dict, triples_from_dict
+from illuminatio.test_generator import NetworkTestCaseGenerator
+
+
+def _synthetic_cases(namespaces, pods, policies, seed):
+    cluster = SyntheticCluster(namespaces, pods, policies, seed)
+    cases, _ = NetworkTestCaseGenerator(LOGGER).generate_test_cases(
+        cluster.policies, cluster.namespaces
+    )
+    return merge_in_dict(cases)
+
+
+def _identifiers(merged_cases):
+    # every case parses its sender and receiver, like from_merged_dict does
+    identifiers = []
+    for from_key, to_key, _ in triples_from_dict(merged_cases):
+        identifiers.extend((from_key, to_key))
+    return identifiers
+
+
+def run_once(merged_cases, identifiers):
+    """
+    Parses all identifiers without and with the parse cache and returns the durations
+    """
+    durations = {}
+    parse = _parse_identifier.__wrapped__
+    start_time = time.perf_counter()
+    for identifier in identifiers:
+        parse(identifier)
+    durations["parse-uncached"] = time.perf_counter() - start_time
+    _parse_identifier.cache_clear()
+    start_time = time.perf_counter()
+    for identifier in identifiers:
+        Host.from_identifier(identifier)
+    durations["parse-cached"] = time.perf_counter() - start_time
+    _parse_identifier.cache_clear()
+    start_time = time.perf_counter()
+    from_merged_dict(merged_cases)
+    durations["from-merged-dict"] = time.perf_counter() - start_time
+    return durations
+
+
+@click.command()
+@click.option(
+    "--cases-file",
+    type=click.Path(exists=True),
+    help="Cases file written by 'illuminatio generate', replaces the synthetic cluster.",
+)
+@click.option("--namespaces", default=50, show_default=True)
+@click.option("--pods", default=2000, show_default=True)
+@click.option("--policies", default=500, show_default=True)
+@click.option("--repeat", default=5, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--results-file", default=DEFAULT_RESULTS_FILE, show_default=True, type=click.Path()
+)
+def cli(cases_file, namespaces, pods, policies, repeat, seed, results_file):
+    """
+    Times parsing the host identifiers of every case, with and without the parse cache
+    """
+    logging.basicConfig(level=logging.WARNING)
+    if cases_file:
+        params = {"benchmark": "host-parse", "cases-file": cases_file}
+        with open(cases_file) as stream:
+            merged_cases = yaml.safe_load(stream)
+    else:
+        params = {
+            "benchmark": "host-parse",
+            "namespaces": namespaces,
+            "pods": pods,
+            "policies": policies,
+            "seed": seed,
+        }
+        merged_cases = _synthetic_cases(namespaces, pods, policies, seed)
+    identifiers = _identifiers(merged_cases)
+    samples = {}
+    for _ in range(repeat):
+        for stage, duration in run_once(merged_cases, identifiers).items():
+            samples.setdefault(stage, []).append(duration)
+    commit = git_commit()
+    entry = {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": params,
+        "identifiers": len(identifiers),
+        "unique-identifiers": len(set(identifiers)),
+        "repeat": repeat,
+        "stages": summarize(samples),
+    }
+    previous = previous_entry(results_file, params, commit)
+    click.echo(
+        "%d identifiers (%d unique), medians over %d runs:"
+        % (entry["identifiers"], entry["unique-identifiers"], repeat)
+    )
+    for stage, stats in entry["stages"].items():
+        line = "  %-16s %10.4fs" % (stage, stats["median"])
+        if previous is not None and stage in previous["stages"]:
+            line += "  (%s: %.4fs)" % (
+                previous["commit"],
+                previous["stages"][stage]["median"],
+            )
+        click.echo(line)
+    with open(results_file, "a") as stream:
+        stream.write(json.dumps(entry, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,195 @@
+"""
+File containing the benchmark suite timing illuminatio's stages on synthetic clusters.
+Results are appended as JSON lines keyed by git commit, so regressions show up across commits.
+"""
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import click
+import kubernetes as k8s
+
+from benchmarks.synthetic_cluster import SyntheticCluster
+from illuminatio.case_table import CaseTable
+from illuminatio.fake_cluster import FakeCluster
+from illuminatio.illuminatio import transform_results
+from illuminatio.rule import Rule
+from illuminatio.test_case import merge_in_dict
+from illuminatio.test_generator import NetworkTestCaseGenerator
+from illuminatio.test_orchestrator import NetworkTestOrchestrator
+
+LOGGER = logging.getLogger("illuminatio-benchmarks")
+DEFAULT_RESULTS_FILE = "benchmarks/results.jsonl"
+
+
+def git_commit():
+    """
+    Returns the current commit, marked as dirty if the working tree has changes
+    """
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+        dirty = subprocess.check_output(
+            ["git", "status", "--porcelain", "--untracked-files=no"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def _timed(func, *args):
+    start_time = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start_time, result
+
+
+def _resolve_hosts(cluster, cases):
+    with FakeCluster(seed=0) as fake_cluster:
+        fake_cluster.add(*cluster.resources())
+        core_api = k8s.client.CoreV1Api(fake_cluster.api_client())
+        orch = NetworkTestOrchestrator(cases, LOGGER)
+        orch.set_target_image("nginx")
+        start_time = time.perf_counter()
+        orch.refresh_cluster_resources(core_api)
+        mappings = orch.ensure_cases_are_generated(core_api)
+        return time.perf_counter() - start_time, mappings
+
+
+def _raw_results(from_host_mappings, to_host_mappings, port_mappings):
+    raw_results = {}
+    for from_host, sender_pod in from_host_mappings.items():
+        for to_host, receiver in to_host_mappings[from_host].items():
+            raw_results.setdefault(sender_pod, {})[receiver] = {
+                mapped_port: {"success": True}
+                for mapped_port in port_mappings[from_host][to_host].values()
+            }
+    return raw_results
+
+
+def run_once(cluster, workers=1):
+    """
+    Runs all stages once and returns their durations and the number of generated cases
+    """
+    durations = {}
+    durations["parse"], _ = _timed(
+        lambda: [Rule.from_network_policy(p) for p in cluster.policies]
+    )
+    generator = NetworkTestCaseGenerator(LOGGER, workers)
+    durations["generate"], (cases, _) = _timed(
+        generator.generate_test_cases, cluster.policies, cluster.namespaces
+    )
+    durations["merge"], _ = _timed(merge_in_dict, cases)
+    durations["case-table"], _ = _timed(
+        lambda: CaseTable.from_cases(cases).to_merged_dict()
+    )
+    durations["host-resolution"], mappings = _resolve_hosts(cluster, cases)
+    from_host_mappings, to_host_mappings, port_mappings, _ = mappings
+    raw_results = _raw_results(from_host_mappings, to_host_mappings, port_mappings)
+    durations["transform"], _ = _timed(
+        transform_results,
+        raw_results,
+        from_host_mappings,
+        to_host_mappings,
+        port_mappings,
+    )
+    return durations, len(cases)
+
+
+def summarize(samples):
+    """
+    Reduces the samples of each stage to min, median and mean
+    """
+    return {
+        stage: {
+            "min": min(values),
+            "median": statistics.median(values),
+            "mean": statistics.mean(values),
+        }
+        for stage, values in samples.items()
+    }
+
+
+def previous_entry(results_file, params, commit):
+    """
+    Returns the latest stored entry with the same parameters from another commit
+    """
+    previous = None
+    try:
+        with open(results_file) as stream:
+            for line in stream:
+                entry = json.loads(line)
+                if entry["params"] == params and entry["commit"] != commit:
+                    previous = entry
+    except FileNotFoundError:
+        pass
+    return previous
+
+
+@click.command()
+@click.option("--namespaces", default=10, show_default=True)
+@click.option("--pods", default=200, show_default=True)
+@click.option("--policies", default=50, show_default=True)
+@click.option("--repeat", default=3, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    help="Processes the generator parses policies in.",
+)
+@click.option(
+    "--results-file", default=DEFAULT_RESULTS_FILE, show_default=True, type=click.Path()
+)
+def cli(namespaces, pods, policies, repeat, seed, workers, results_file):
+    """
+    Times parsing, case generation, merging, host resolution and result transformation
+    """
+    logging.basicConfig(level=logging.WARNING)
+    params = {
+        "namespaces": namespaces,
+        "pods": pods,
+        "policies": policies,
+        "seed": seed,
+    }
+    if workers > 1:
+        # keeps entries of serial runs comparable with those written before the option existed
+        params["workers"] = workers
+    cluster = SyntheticCluster(namespaces, pods, policies, seed)
+    samples = {}
+    for _ in range(repeat):
+        durations, case_count = run_once(cluster, workers)
+        for stage, duration in durations.items():
+            samples.setdefault(stage, []).append(duration)
+    commit = git_commit()
+    entry = {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": params,
+        "cases": case_count,
+        "repeat": repeat,
+        "stages": summarize(samples),
+    }
+    previous = previous_entry(results_file, params, commit)
+    click.echo("%d cases, medians over %d runs:" % (case_count, repeat))
+    for stage, stats in entry["stages"].items():
+        line = "  %-16s %10.4fs" % (stage, stats["median"])
+        if previous is not None and stage in previous["stages"]:
+            before = previous["stages"][stage]["median"]
+            line += "  (%s: %.4fs, x%.2f)" % (
+                previous["commit"],
+                before,
+                stats["median"] / before if before else float("inf"),
+            )
+        click.echo(line)
+    with open(results_file, "a") as stream:
+        stream.write(json.dumps(entry, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
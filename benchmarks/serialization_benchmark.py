@@ -0,0 +1,162 @@
+"""
+File containing the microbenchmark of the serialization backends for cases and results files.
+Results are appended to the same JSON lines file as the stage benchmarks.
+"""
+import io
+import json
+import logging
+import platform
+import random
+import time
+from datetime import datetime, timezone
+
+import click
+import yaml
+
+from benchmarks.run_benchmarks import (
+    DEFAULT_RESULTS_FILE,
+    LOGGER,
+    git_commit,
+    previous_entry,
+    summarize,
+)
+from benchmarks.synthetic_cluster import SyntheticCluster
+from illuminatio.case_table import CaseTable
+from illuminatio.test_generator import NetworkTestCaseGenerator
+from illuminatio.util import _orjson_encodable, orjson, msgpack
+
+
+def _synthetic_documents(namespaces, pods, policies, seed):
+    cluster = SyntheticCluster(namespaces, pods, policies, seed)
+    cases, _ = NetworkTestCaseGenerator(LOGGER).generate_test_cases(
+        cluster.policies, cluster.namespaces
+    )
+    merged_cases = CaseTable.from_cases(cases).to_merged_dict()
+    # results carry the per port entries transform_results writes
+    rand = random.Random(seed)
+    results = {}
+    for from_host, targets in merged_cases.items():
+        for to_host, ports in targets.items():
+            for port in ports:
+                success = rand.random() < 0.5
+                results.setdefault(from_host, {}).setdefault(to_host, {})[port] = {
+                    "success": success,
+                    "string": "Test %s:%s succeeded" % (to_host, port)
+                    if success
+                    else "Test %s:%s failed" % (to_host, port),
+                    "nmap-state": "open" if success else "filtered",
+                }
+    return {"cases": merged_cases, "results": results}
+
+
+def _orjson_dumps(data):
+    # includes the check the JSON format runs before taking the orjson path
+    if not _orjson_encodable(data):
+        raise ValueError("orjson would not write the data like the standard library")
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+
+
+def _backends():
+    """
+    Returns dump and load per available backend, each working on bytes
+    """
+    backends = {
+        "yaml-python": (
+            lambda data: yaml.dump(data, Dumper=yaml.SafeDumper).encode("utf-8"),
+            lambda raw: yaml.load(raw, Loader=yaml.SafeLoader),
+        ),
+        "json": (
+            lambda data: json.dumps(data, indent=2).encode("utf-8"),
+            json.loads,
+        ),
+    }
+    if hasattr(yaml, "CSafeDumper"):
+        backends["yaml-libyaml"] = (
+            lambda data: yaml.dump(data, Dumper=yaml.CSafeDumper).encode("utf-8"),
+            lambda raw: yaml.load(raw, Loader=yaml.CSafeLoader),
+        )
+    if orjson is not None:
+        backends["orjson"] = (_orjson_dumps, orjson.loads)
+    if msgpack is not None:
+        backends["msgpack"] = (
+            lambda data: msgpack.packb(data, use_bin_type=True),
+            lambda raw: msgpack.unpack(io.BytesIO(raw), raw=False),
+        )
+    return backends
+
+
+def run_once(documents, backends):
+    """
+    Dumps and loads every document with every backend and returns the durations and sizes
+    """
+    durations = {}
+    sizes = {}
+    for document, data in documents.items():
+        for backend, (dump, load) in backends.items():
+            stage = "%s-%s" % (document, backend)
+            start_time = time.perf_counter()
+            raw = dump(data)
+            durations[stage + "-dump"] = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            load(raw)
+            durations[stage + "-load"] = time.perf_counter() - start_time
+            sizes[stage] = len(raw)
+    return durations, sizes
+
+
+@click.command()
+@click.option("--namespaces", default=50, show_default=True)
+@click.option("--pods", default=2000, show_default=True)
+@click.option("--policies", default=500, show_default=True)
+@click.option("--repeat", default=3, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--results-file", default=DEFAULT_RESULTS_FILE, show_default=True, type=click.Path()
+)
+def cli(namespaces, pods, policies, repeat, seed, results_file):
+    """
+    Times dumping and loading cases and results with every available serialization backend
+    """
+    logging.basicConfig(level=logging.WARNING)
+    params = {
+        "benchmark": "serialization",
+        "namespaces": namespaces,
+        "pods": pods,
+        "policies": policies,
+        "seed": seed,
+    }
+    documents = _synthetic_documents(namespaces, pods, policies, seed)
+    backends = _backends()
+    samples = {}
+    sizes = {}
+    for _ in range(repeat):
+        durations, sizes = run_once(documents, backends)
+        for stage, duration in durations.items():
+            samples.setdefault(stage, []).append(duration)
+    commit = git_commit()
+    entry = {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "params": params,
+        "backends": sorted(backends),
+        "sizes": sizes,
+        "repeat": repeat,
+        "stages": summarize(samples),
+    }
+    previous = previous_entry(results_file, params, commit)
+    click.echo("%s, medians over %d runs:" % (", ".join(entry["backends"]), repeat))
+    for stage, stats in entry["stages"].items():
+        line = "  %-32s %10.4fs" % (stage, stats["median"])
+        if previous is not None and stage in previous["stages"]:
+            line += "  (%s: %.4fs)" % (
+                previous["commit"],
+                previous["stages"][stage]["median"],
+            )
+        click.echo(line)
+    with open(results_file, "a") as stream:
+        stream.write(json.dumps(entry, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
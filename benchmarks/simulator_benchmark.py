@@ -0,0 +1,123 @@
+"""
+File containing the benchmark of the reachability computation on synthetic clusters of growing size.
+Results are appended to the same JSON lines file as the stage benchmarks.
+"""
+import json
+import platform
+import time
+from datetime import datetime, timezone
+
+import click
+
+from benchmarks.run_benchmarks import (
+    DEFAULT_RESULTS_FILE,
+    git_commit,
+    previous_entry,
+    summarize,
+)
+from benchmarks.synthetic_cluster import SyntheticCluster
+from illuminatio.simulator import BitsetSimulator, PolicySimulator
+
+# the pairwise simulator is quadratic in python, beyond this it takes minutes
+MAX_PAIRWISE_PODS = 2000
+
+
+def _pairwise_allowed(cluster, ports):
+    simulator = PolicySimulator(cluster.pods, cluster.namespaces, cluster.policies)
+    pod_count = len(cluster.pods)
+    return sum(
+        simulator.is_allowed(sender, receiver, port)
+        for port in ports
+        for sender in range(pod_count)
+        for receiver in range(pod_count)
+        if sender != receiver
+    )
+
+
+def _bitset_allowed(cluster, ports):
+    simulator = BitsetSimulator(cluster.pods, cluster.namespaces, cluster.policies)
+    reachability = simulator.reachability(ports)
+    return sum(reachability.allowed_pairs(port) for port in ports)
+
+
+def run_once(cluster, ports, pairwise):
+    """
+    Computes the reachability once per simulator and returns the durations and allowed connections
+    """
+    durations, allowed = {}, {}
+    simulators = [("bitset", _bitset_allowed)]
+    if pairwise:
+        simulators.append(("pairwise", _pairwise_allowed))
+    for name, compute in simulators:
+        start_time = time.perf_counter()
+        allowed[name] = compute(cluster, ports)
+        durations[name] = time.perf_counter() - start_time
+    if len(set(allowed.values())) > 1:
+        raise ValueError(
+            "Simulators disagree on %s pods: %s" % (len(cluster.pods), allowed)
+        )
+    return durations, allowed["bitset"]
+
+
+@click.command()
+@click.option(
+    "--pods", multiple=True, type=int, default=[1000, 10000, 50000], show_default=True
+)
+@click.option("--namespaces", default=50, show_default=True)
+@click.option("--policies", default=500, show_default=True)
+@click.option("--repeat", default=3, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--results-file", default=DEFAULT_RESULTS_FILE, show_default=True, type=click.Path()
+)
+def cli(pods, namespaces, policies, repeat, seed, results_file):
+    """
+    Times the reachability computation for every pod count,
+    comparing with the pairwise simulator on small clusters
+    """
+    commit = git_commit()
+    for pod_count in pods:
+        params = {
+            "benchmark": "simulator",
+            "namespaces": namespaces,
+            "pods": pod_count,
+            "policies": policies,
+            "seed": seed,
+        }
+        cluster = SyntheticCluster(namespaces, pod_count, policies, seed)
+        ports = [80, 443, "*"]
+        samples = {}
+        for _ in range(repeat):
+            durations, allowed = run_once(
+                cluster, ports, pod_count <= MAX_PAIRWISE_PODS
+            )
+            for name, duration in durations.items():
+                samples.setdefault(name, []).append(duration)
+        entry = {
+            "commit": commit,
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "params": params,
+            "allowed": allowed,
+            "repeat": repeat,
+            "stages": summarize(samples),
+        }
+        previous = previous_entry(results_file, params, commit)
+        click.echo(
+            "%d pods, %d allowed connections, medians over %d runs:"
+            % (pod_count, allowed, repeat)
+        )
+        for name, stats in entry["stages"].items():
+            line = "  %-16s %10.4fs" % (name, stats["median"])
+            if previous is not None and name in previous["stages"]:
+                line += "  (%s: %.4fs)" % (
+                    previous["commit"],
+                    previous["stages"][name]["median"],
+                )
+            click.echo(line)
+        with open(results_file, "a") as stream:
+            stream.write(json.dumps(entry, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    cli()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,195 @@
+"""
+File containing a generator for synthetic clusters,
+with realistic label distributions and NetworkPolicies shaped like the e2e-manifests recipes
+"""
+import random
+
+import kubernetes as k8s
+
+TIERS = ["frontend", "backend", "db", "cache", "worker"]
+TEAMS = ["operations", "payments", "search", "platform", "data"]
+ENVIRONMENTS = ["prod", "staging", "dev"]
+
+
+def _meta(name, namespace=None, labels=None):
+    return k8s.client.V1ObjectMeta(name=name, namespace=namespace, labels=labels)
+
+
+def _selector(labels):
+    return k8s.client.V1LabelSelector(match_labels=labels)
+
+
+def _peer(pod_labels=None, namespace_labels=None):
+    return k8s.client.V1NetworkPolicyPeer(
+        pod_selector=_selector(pod_labels) if pod_labels is not None else None,
+        namespace_selector=_selector(namespace_labels)
+        if namespace_labels is not None
+        else None,
+    )
+
+
+def _ingress(peers, ports=None):
+    return k8s.client.V1NetworkPolicyIngressRule(
+        _from=peers,
+        ports=[k8s.client.V1NetworkPolicyPort(port=p, protocol="TCP") for p in ports]
+        if ports
+        else None,
+    )
+
+
+def _policy(name, namespace, pod_labels, ingress=None, egress=None, types=None):
+    return k8s.client.V1NetworkPolicy(
+        metadata=_meta(name, namespace),
+        spec=k8s.client.V1NetworkPolicySpec(
+            pod_selector=_selector(pod_labels),
+            ingress=ingress,
+            egress=egress,
+            policy_types=types,
+        ),
+    )
+
+
+class SyntheticCluster:
+    """
+    Class generating namespaces, pods, services and NetworkPolicies of a synthetic cluster.
+    App popularity follows a Zipf-like distribution, so few apps have many replicas.
+    """
+
+    def __init__(self, namespaces=10, pods=200, policies=50, seed=0):
+        self.random = random.Random(seed)
+        self.namespaces = [self._namespace(i) for i in range(namespaces)]
+        self.apps = {
+            ns.metadata.name: ["app-%d" % i for i in range(self.random.randint(3, 12))]
+            for ns in self.namespaces
+        }
+        self.pods = [self._pod(i) for i in range(pods)]
+        self.services = self._services()
+        self.policies = [self._recipe_policy(i) for i in range(policies)]
+
+    def _namespace(self, index):
+        return k8s.client.V1Namespace(
+            metadata=_meta(
+                "ns-%d" % index,
+                labels={
+                    "team": self.random.choice(TEAMS),
+                    "env": self.random.choice(ENVIRONMENTS),
+                },
+            )
+        )
+
+    def _pick_app(self, namespace):
+        apps = self.apps[namespace]
+        weights = [1.0 / (rank + 1) for rank in range(len(apps))]
+        return self.random.choices(apps, weights)[0]
+
+    def _app_labels(self, namespace, app):
+        # labels derived from the app keep replicas of one app selectable together
+        tier = TIERS[sum(map(ord, namespace + app)) % len(TIERS)]
+        return {"app": app, "tier": tier}
+
+    def _pod(self, index):
+        namespace = self.random.choice(self.namespaces).metadata.name
+        app = self._pick_app(namespace)
+        labels = dict(self._app_labels(namespace, app), version="v%d" % (index % 3))
+        return k8s.client.V1Pod(
+            metadata=_meta("%s-%d" % (app, index), namespace, labels),
+            spec=k8s.client.V1PodSpec(
+                containers=[
+                    k8s.client.V1Container(
+                        name=app,
+                        image="nginx",
+                        ports=[k8s.client.V1ContainerPort(container_port=80)],
+                    )
+                ]
+            ),
+        )
+
+    def _services(self):
+        services = {}
+        for pod in self.pods:
+            key = (pod.metadata.namespace, pod.metadata.labels["app"])
+            if key in services:
+                continue
+            services[key] = k8s.client.V1Service(
+                metadata=_meta(key[1], key[0], {"app": key[1]}),
+                spec=k8s.client.V1ServiceSpec(
+                    selector={"app": key[1]},
+                    ports=[k8s.client.V1ServicePort(port=80, target_port=80)],
+                ),
+            )
+        return list(services.values())
+
+    def _recipe_policy(self, index):
+        namespace = self.random.choice(self.namespaces).metadata.name
+        app = self._pick_app(namespace)
+        app_labels = {"app": app}
+        other_namespace = self.random.choice(self.namespaces)
+        other_app = self._pick_app(other_namespace.metadata.name)
+        name = "policy-%d" % index
+        recipes = [
+            # 01 deny all traffic to an application
+            lambda: _policy(name, namespace, app_labels, ingress=[]),
+            # 02 limit traffic to an application
+            lambda: _policy(
+                name,
+                namespace,
+                app_labels,
+                ingress=[_ingress([_peer(self._app_labels(namespace, other_app))])],
+            ),
+            # 03 deny all non-whitelisted traffic in the namespace
+            lambda: _policy(name, namespace, {}, ingress=[]),
+            # 04 deny traffic from other namespaces
+            lambda: _policy(name, namespace, {}, ingress=[_ingress([_peer({})])]),
+            # 05 allow traffic from all namespaces
+            lambda: _policy(
+                name, namespace, app_labels, ingress=[_ingress([_peer(None, {})])]
+            ),
+            # 06 allow traffic from a namespace
+            lambda: _policy(
+                name,
+                namespace,
+                app_labels,
+                ingress=[
+                    _ingress(
+                        [_peer(None, {"team": other_namespace.metadata.labels["team"]})]
+                    )
+                ],
+            ),
+            # 07 allow traffic from some pods in another namespace
+            lambda: _policy(
+                name,
+                namespace,
+                app_labels,
+                ingress=[
+                    _ingress(
+                        [
+                            _peer(
+                                {"tier": self.random.choice(TIERS)},
+                                {"env": other_namespace.metadata.labels["env"]},
+                            )
+                        ]
+                    )
+                ],
+            ),
+            # 09 allow traffic only to a port
+            lambda: _policy(
+                name,
+                namespace,
+                app_labels,
+                ingress=[
+                    _ingress(
+                        [_peer({"tier": self.random.choice(TIERS)})],
+                        ports=[self.random.choice([80, 443, 5432, 8080])],
+                    )
+                ],
+            ),
+            # 11 deny egress traffic from an application
+            lambda: _policy(name, namespace, app_labels, egress=[], types=["Egress"]),
+        ]
+        return self.random.choice(recipes)()
+
+    def resources(self):
+        """
+        Returns all generated resources, namespaces first
+        """
+        return self.namespaces + self.pods + self.services + self.policies
@@ -0,0 +1,162 @@
+"""
+File containing an on-disk cache of generated test cases,
+addressed by a hash of the normalized NetworkPolicies and namespace labels they were generated from
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import List
+
+import kubernetes as k8s
+
+from illuminatio import __version__
+
+# bump whenever the generated cases change for the same input
+CASE_CACHE_VERSION = 2
+CASE_CACHE_META_KEY = "illuminatio.case-cache"
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+CACHE_FILE_SUFFIX = ".json.gz"
+
+
+def default_cache_dir():
+    """
+    Returns the cache directory following the XDG base directory specification
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "illuminatio", "cases")
+
+
+def cache_key(
+    network_policies: List[k8s.client.V1NetworkPolicy],
+    namespaces: List[k8s.client.V1Namespace],
+):
+    """
+    Returns a stable hash of everything test case generation depends on,
+    ignoring metadata like resourceVersions and the order policies and namespaces were listed in
+    """
+    serialize = k8s.client.ApiClient().sanitize_for_serialization
+    normalized = {
+        "version": [CASE_CACHE_VERSION, __version__],
+        "policies": sorted(
+            [
+                [
+                    policy.metadata.namespace,
+                    policy.metadata.name,
+                    serialize(policy.spec),
+                ]
+                for policy in network_policies
+            ],
+            key=lambda policy: (policy[0] or "", policy[1] or ""),
+        ),
+        "namespaces": sorted(
+            [
+                [namespace.metadata.name, namespace.metadata.labels or {}]
+                for namespace in namespaces
+            ],
+            key=lambda namespace: namespace[0],
+        ),
+    }
+    return hashlib.sha256(
+        json.dumps(normalized, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+class CaseCache:
+    """
+    Class for a directory of merged case dicts, one gzip compressed JSON file per key.
+    When the files exceed the size limit, the least recently used ones are evicted.
+    """
+
+    def __init__(self, directory=None, max_size=DEFAULT_CACHE_SIZE, logger=None):
+        self.directory = directory or default_cache_dir()
+        self.max_size = max_size
+        self.logger = logger or logging.getLogger(__name__)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_FILE_SUFFIX)
+
+    def get(self, key):
+        """
+        Returns the merged case dict stored under the key, None on a miss
+        """
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as cache_file:
+                cases = json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            self.logger.warning("Dropping unreadable cache entry %s: %s", path, error)
+            self._remove(path)
+            return None
+        # the modification time orders entries by their last use
+        os.utime(path)
+        return cases
+
+    def put(self, key, cases):
+        """
+        Stores a merged case dict under the key and evicts old entries beyond the size limit
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        # written to a temporary file first, so concurrent readers never see partial entries
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=self.directory, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as raw_file, gzip.open(
+                raw_file, "wt", encoding="utf-8"
+            ) as cache_file:
+                json.dump(cases, cache_file, separators=(",", ":"))
+            os.replace(temporary_path, self._path(key))
+        except BaseException:
+            self._remove(temporary_path)
+            raise
+        self.evict(keep=key)
+
+    def entries(self):
+        """
+        Returns (path, size, last use) of all entries, least recently used first
+        """
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(CACHE_FILE_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self, keep=None):
+        """
+        Removes the least recently used entries until the cache fits its size limit,
+        never removing the entry of the key to keep
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_size:
+                break
+            if keep is not None and path == self._path(keep):
+                continue
+            self.logger.debug("Evicting cache entry %s", path)
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
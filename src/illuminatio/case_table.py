@@ -0,0 +1,241 @@
+"""
+File containing a columnar table of test cases,
+host identifiers and port strings are interned to ids and every case is one row of three integer arrays
+"""
+from array import array
+from typing import Iterable
+
+from illuminatio.test_case import NetworkTestCase
+
+SENDER = "sender"
+TARGET = "target"
+
+
+def _ids():
+    return array("I")
+
+
+class CaseGroups:
+    """
+    Class for the rows of a case table grouped by the sender or target column.
+    All groups are slices of one row index array, handed out as memoryviews without copying.
+    """
+
+    def __init__(self, table, column):
+        values = table.column(column)
+        counts = [0] * len(table.hosts)
+        keys = []
+        for value in values:
+            if not counts[value]:
+                keys.append(value)
+            counts[value] += 1
+        starts = [0] * len(counts)
+        offset = 0
+        for key in keys:
+            starts[key] = offset
+            offset += counts[key]
+        positions = list(starts)
+        order = array("I", bytes(values.itemsize * len(values)))
+        for row, value in enumerate(values):
+            order[positions[value]] = row
+            positions[value] += 1
+        self._table = table
+        self._keys = keys
+        self._starts = starts
+        self._counts = counts
+        self._order = memoryview(order)
+
+    def rows(self, host_identifier):
+        """
+        Returns the rows of a host, empty if it has none in the grouped column
+        """
+        host_id = self._table.host_id(host_identifier)
+        if host_id is None or not self._counts[host_id]:
+            return self._order[0:0]
+        start = self._starts[host_id]
+        return self._order[start : start + self._counts[host_id]]
+
+    def __iter__(self):
+        """
+        Yields the host identifiers and their rows, in the order of the first row of each host
+        """
+        for key in self._keys:
+            start = self._starts[key]
+            yield self._table.hosts[key], self._order[start : start + self._counts[key]]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class CaseTable:
+    """
+    Class for test cases stored column by column,
+    the compact alternative to lists of NetworkTestCases and merged case dicts
+    """
+
+    def __init__(self):
+        self.hosts = []
+        self.ports = []
+        self._host_ids = {}
+        self._port_ids = {}
+        self.senders = _ids()
+        self.targets = _ids()
+        self.port_ids = _ids()
+        self._groups = {}
+
+    @classmethod
+    def from_cases(cls, cases: Iterable[NetworkTestCase]):
+        """
+        Creates a table holding the given NetworkTestCases
+        """
+        table = cls()
+        for case in cases:
+            table.add(*case.stringify_members())
+        return table
+
+    @classmethod
+    def from_merged_dict(cls, dictionary: dict):
+        """
+        Creates a table from the nested sender, target and port list format of merge_in_dict
+        """
+        table = cls()
+        for from_host, target_dict in dictionary.items():
+            for to_host, ports in target_dict.items():
+                for port in ports:
+                    table.add(from_host, to_host, port)
+        return table
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]):
+        """
+        Creates a table from fromHost, toHost and port records, consuming them one at a time
+        """
+        table = cls()
+        for number, record in enumerate(records, 1):
+            try:
+                table.add(record["fromHost"], record["toHost"], record["port"])
+            except (KeyError, TypeError) as error:
+                raise ValueError(
+                    "Invalid case record %d: %r" % (number, record)
+                ) from error
+        return table
+
+    def _intern_host(self, identifier):
+        host_id = self._host_ids.get(identifier)
+        if host_id is None:
+            host_id = self._host_ids[identifier] = len(self.hosts)
+            self.hosts.append(identifier)
+        return host_id
+
+    def add(self, from_host: str, to_host: str, port: str):
+        """
+        Appends a case given by the identifiers of its hosts and its port string
+        """
+        port_id = self._port_ids.get(port)
+        if port_id is None:
+            port_id = self._port_ids[port] = len(self.ports)
+            self.ports.append(port)
+        self.senders.append(self._intern_host(from_host))
+        self.targets.append(self._intern_host(to_host))
+        self.port_ids.append(port_id)
+        if self._groups:
+            self._groups = {}
+
+    def host_id(self, identifier):
+        """
+        Returns the id of a host identifier, None if no case contains it
+        """
+        return self._host_ids.get(identifier)
+
+    def column(self, column):
+        """
+        Returns the host id array of the sender or target column
+        """
+        if column == SENDER:
+            return self.senders
+        if column == TARGET:
+            return self.targets
+        raise ValueError("Unknown column %s, use %s or %s" % (column, SENDER, TARGET))
+
+    def row(self, index):
+        """
+        Returns the sender identifier, target identifier and port string of a row
+        """
+        return (
+            self.hosts[self.senders[index]],
+            self.hosts[self.targets[index]],
+            self.ports[self.port_ids[index]],
+        )
+
+    def __len__(self):
+        return len(self.senders)
+
+    def __iter__(self):
+        hosts = self.hosts
+        ports = self.ports
+        for sender, target, port in zip(self.senders, self.targets, self.port_ids):
+            yield hosts[sender], hosts[target], ports[port]
+
+    def group_by(self, column):
+        """
+        Returns the rows grouped by the hosts of the sender or target column,
+        computed once until the next case is added
+        """
+        if column not in self._groups:
+            self._groups[column] = CaseGroups(self, column)
+        return self._groups[column]
+
+    def targets_of(self, rows):
+        """
+        Returns the port strings per target identifier of the given rows
+        """
+        out = {}
+        hosts, targets = self.hosts, self.targets
+        ports, port_ids = self.ports, self.port_ids
+        for row in rows:
+            target = hosts[targets[row]]
+            if target in out:
+                out[target].append(ports[port_ids[row]])
+            else:
+                out[target] = [ports[port_ids[row]]]
+        return out
+
+    def ports_per_target(self):
+        """
+        Returns the distinct port strings each target is tested on, over all senders
+        """
+        ports = self.ports
+        return {
+            target: list(dict.fromkeys(ports[self.port_ids[row]] for row in rows))
+            for target, rows in self.group_by(TARGET)
+        }
+
+    def hosts_in(self, column):
+        """
+        Returns the identifiers of all hosts in the sender or target column
+        """
+        return [host for host, _ in self.group_by(column)]
+
+    def filter_hosts(self, predicate):
+        """
+        Returns a table of the rows whose sender and target identifiers both satisfy the predicate,
+        which is called once per host
+        """
+        keep = [predicate(identifier) for identifier in self.hosts]
+        table = CaseTable()
+        for sender, target, port in zip(self.senders, self.targets, self.port_ids):
+            if keep[sender] and keep[target]:
+                table.add(self.hosts[sender], self.hosts[target], self.ports[port])
+        return table
+
+    def to_merged_dict(self):
+        """
+        Returns the cases in the nested format of merge_in_dict, ready to be written
+        """
+        return {sender: self.targets_of(rows) for sender, rows in self.group_by(SENDER)}
+
+    def cases(self):
+        """
+        Materializes the rows as NetworkTestCases
+        """
+        return [NetworkTestCase.from_stringified_members(*triple) for triple in self]
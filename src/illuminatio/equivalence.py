@@ -0,0 +1,142 @@
+"""
+File containing the grouping of pods into equivalence classes,
+pods selected by exactly the same policies and peer rules behave identically in every test
+"""
+from typing import List
+
+import kubernetes as k8s
+
+from illuminatio.simulator import EGRESS, INGRESS, PolicySimulator, pod_identifier
+
+
+class PodClass:
+    """
+    Class for a set of pods that all NetworkPolicies treat alike, represented by its first member
+    """
+
+    def __init__(self, pods):
+        if not pods:
+            raise ValueError("A pod class needs at least one pod")
+        self.pods = sorted(pods, key=pod_identifier)
+
+    @property
+    def representative(self):
+        """
+        Returns the pod probed on behalf of the whole class
+        """
+        return self.pods[0]
+
+    def identifiers(self):
+        """
+        Returns the namespace:name identifiers of all members
+        """
+        return [pod_identifier(pod) for pod in self.pods]
+
+    def __len__(self):
+        return len(self.pods)
+
+    def __repr__(self):
+        return "PodClass(representative=%s, size=%d)" % (
+            pod_identifier(self.representative),
+            len(self.pods),
+        )
+
+
+def _selection_signatures(simulator: PolicySimulator):
+    """
+    Returns per pod whether it is isolated per direction, the rules that apply to it
+    and the rules whose peers include it, along with its named ports,
+    as these decide every connection the pod takes part in
+    """
+    pod_count = len(simulator.pods)
+    rule_ids = {}
+    peer_of = [[] for _ in range(pod_count)]
+    applied = [[] for _ in range(pod_count)]
+    isolated = [[] for _ in range(pod_count)]
+    for direction in (INGRESS, EGRESS):
+        for index, rules in enumerate(simulator.rules[direction]):
+            if rules is None:
+                continue
+            # a deny-all policy isolates the pod without applying any rule
+            isolated[index].append(direction)
+            for rule in rules:
+                rule_id = rule_ids.setdefault(id(rule), len(rule_ids))
+                applied[index].append((direction, rule_id))
+    seen = set()
+    for direction in (INGRESS, EGRESS):
+        for rules in simulator.rules[direction]:
+            for rule in rules or []:
+                if id(rule) in seen or rule.peers is None:
+                    continue
+                seen.add(id(rule))
+                for index in rule.peers:
+                    peer_of[index].append(rule_ids[id(rule)])
+    return [
+        (
+            simulator.pods[index].metadata.namespace,
+            tuple(isolated[index]),
+            tuple(applied[index]),
+            tuple(sorted(peer_of[index])),
+            tuple(sorted(simulator.container_ports[index].items())),
+        )
+        for index in range(pod_count)
+    ]
+
+
+class PodEquivalence:
+    """
+    Class grouping the pods of a cluster into equivalence classes
+    by the exact set of policies and peer rules that select them
+    """
+
+    def __init__(
+        self,
+        pods: List[k8s.client.V1Pod],
+        namespaces: List[k8s.client.V1Namespace],
+        network_policies: List[k8s.client.V1NetworkPolicy],
+    ):
+        simulator = PolicySimulator(pods, namespaces, network_policies)
+        members = {}
+        for pod, signature in zip(simulator.pods, _selection_signatures(simulator)):
+            members.setdefault(signature, []).append(pod)
+        self.classes = sorted(
+            (PodClass(pods) for pods in members.values()),
+            key=lambda pod_class: pod_identifier(pod_class.representative),
+        )
+        self._class_of = {
+            identifier: pod_class
+            for pod_class in self.classes
+            for identifier in pod_class.identifiers()
+        }
+
+    def class_of(self, pod):
+        """
+        Returns the class of a pod, None for pods created after the grouping
+        """
+        return self._class_of.get(pod_identifier(pod))
+
+    def representatives(self, pods):
+        """
+        Reduces pods to the representatives of their classes, keeping pods of no class as they are
+        """
+        out = {}
+        for pod in pods:
+            pod_class = self.class_of(pod)
+            representative = pod if pod_class is None else pod_class.representative
+            out.setdefault(pod_identifier(representative), representative)
+        return list(out.values())
+
+    def membership(self, representatives=None):
+        """
+        Returns the member identifiers per representative identifier,
+        limited to the given representative identifiers if any
+        """
+        return {
+            pod_identifier(pod_class.representative): pod_class.identifiers()
+            for pod_class in self.classes
+            if representatives is None
+            or pod_identifier(pod_class.representative) in representatives
+        }
+
+    def __len__(self):
+        return len(self.classes)
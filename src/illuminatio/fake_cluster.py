@@ -0,0 +1,697 @@
+"""
+File containing an in-process fake of the kubernetes API server.
+It can be seeded with synthetic resources and serves list/watch/get/create/patch/replace/delete
+with configurable latency and error injection, so orchestration can be tested
+and benchmarked without a cluster.
+"""
+import copy
+import json
+import random
+import re
+import string
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import kubernetes as k8s
+
+CLUSTER_SCOPED_RESOURCES = {
+    "namespaces",
+    "nodes",
+    "persistentvolumes",
+    "clusterroles",
+    "clusterrolebindings",
+}
+KINDS = {
+    "pods": "Pod",
+    "services": "Service",
+    "namespaces": "Namespace",
+    "nodes": "Node",
+    "configmaps": "ConfigMap",
+    "serviceaccounts": "ServiceAccount",
+    "daemonsets": "DaemonSet",
+    "networkpolicies": "NetworkPolicy",
+    "clusterroles": "ClusterRole",
+    "clusterrolebindings": "ClusterRoleBinding",
+}
+API_VERSIONS = {
+    "daemonsets": "apps/v1",
+    "networkpolicies": "networking.k8s.io/v1",
+    "clusterroles": "rbac.authorization.k8s.io/v1",
+    "clusterrolebindings": "rbac.authorization.k8s.io/v1",
+}
+
+
+class FakeApiError(Exception):
+    """
+    Exception answered with a kubernetes Status object of the given HTTP code
+    """
+
+    def __init__(self, code, reason, message):
+        super().__init__(message)
+        self.code = code
+        self.reason = reason
+        self.message = message
+
+    def to_status(self):
+        """
+        Converts the error into a kubernetes Status object
+        """
+        return {
+            "kind": "Status",
+            "apiVersion": "v1",
+            "metadata": {},
+            "status": "Failure",
+            "message": self.message,
+            "reason": self.reason,
+            "code": self.code,
+        }
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_selector(selector):
+    """
+    Parses a label or field selector string into (key, operator, values) requirements
+    """
+    requirements = []
+    if not selector:
+        return requirements
+    for term in _split_selector(selector):
+        term = term.strip()
+        if " notin " in term or " in " in term:
+            operator = "notin" if " notin " in term else "in"
+            key, values = term.split(" %s " % operator, 1)
+            values = values.strip().strip("()")
+            requirements.append(
+                (key.strip(), operator, {v.strip() for v in values.split(",")})
+            )
+        elif "!=" in term:
+            key, value = term.split("!=", 1)
+            requirements.append((key.strip(), "!=", {value.strip()}))
+        elif "==" in term or "=" in term:
+            key, value = term.split("==" if "==" in term else "=", 1)
+            requirements.append((key.strip(), "=", {value.strip()}))
+        elif term.startswith("!"):
+            requirements.append((term[1:].strip(), "!exists", set()))
+        else:
+            requirements.append((term, "exists", set()))
+    return requirements
+
+
+def _split_selector(selector):
+    # commas inside of set based requirements do not separate terms
+    terms, depth, current = [], 0, ""
+    for char in selector:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            terms.append(current)
+            current = ""
+        else:
+            current += char
+    terms.append(current)
+    return [term for term in terms if term.strip()]
+
+
+def _matches(requirements, values):
+    for key, operator, expected in requirements:
+        present = key in values and values[key] is not None
+        value = str(values[key]) if present else None
+        if operator == "=" and value not in expected:
+            return False
+        if operator in ("!=", "notin") and value in expected:
+            return False
+        if operator == "in" and value not in expected:
+            return False
+        if operator == "exists" and not present:
+            return False
+        if operator == "!exists" and present:
+            return False
+    return True
+
+
+def _field_values(obj):
+    metadata = obj.get("metadata", {})
+    return {
+        "metadata.name": metadata.get("name"),
+        "metadata.namespace": metadata.get("namespace"),
+        "spec.nodeName": obj.get("spec", {}).get("nodeName"),
+        "status.phase": obj.get("status", {}).get("phase"),
+    }
+
+
+def merge_patch(target, patch):
+    """
+    Applies a JSON merge patch (RFC 7386) to a copy of the target and returns it.
+    Strategic merge patches are treated the same way, which is close enough for illuminatio's patches.
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = copy.deepcopy(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def json_patch(target, operations):
+    """
+    Applies the add, replace and remove operations of a JSON patch (RFC 6902) to a copy of the target
+    """
+    result = copy.deepcopy(target)
+    for operation in operations:
+        path = [
+            p.replace("~1", "/").replace("~0", "~")
+            for p in operation["path"].split("/")[1:]
+        ]
+        parent = result
+        for part in path[:-1]:
+            parent = parent[int(part)] if isinstance(parent, list) else parent[part]
+        last = path[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if operation["op"] == "remove":
+                del parent[index]
+            elif operation["op"] == "add":
+                parent.insert(index, operation["value"])
+            else:
+                parent[index] = operation["value"]
+        elif operation["op"] == "remove":
+            del parent[last]
+        elif operation["op"] in ("add", "replace"):
+            parent[last] = operation["value"]
+        else:
+            raise FakeApiError(
+                422, "Invalid", "Unsupported patch operation %s" % operation["op"]
+            )
+    return result
+
+
+class FakeCluster:
+    """
+    Class for a fake kubernetes API server running in a background thread.
+    Created pods are immediately scheduled and running,
+    daemonsets are immediately ready on all nodes.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = []
+        self._random = random.Random(seed)
+        self._objects = {}
+        self._events = []
+        self._resource_version = 0
+        self._injected_errors = []
+        self._next_ip = 0
+        self._scheduled_pods = 0
+        self._condition = threading.Condition()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        Returns the base url of the running server
+        """
+        host, port = self._server.server_address[:2]
+        return "http://%s:%s" % (host, port)
+
+    def start(self):
+        """
+        Starts serving on a free local port
+        """
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _create_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server and ends all open watches
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._condition:
+            self._condition.notify_all()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def configuration(self):
+        """
+        Returns a kubernetes client Configuration pointing to this fake cluster
+        """
+        configuration = k8s.client.Configuration()
+        configuration.host = self.url
+        return configuration
+
+    def api_client(self):
+        """
+        Returns a kubernetes ApiClient talking to this fake cluster
+        """
+        return k8s.client.ApiClient(self.configuration())
+
+    def inject_error(self, code, method=None, resource=None, count=1):
+        """
+        Fails the next count requests matching method and resource (None matches any) with the given code
+        """
+        with self._condition:
+            self._injected_errors.append(
+                {
+                    "code": code,
+                    "method": method,
+                    "resource": resource,
+                    "count": count,
+                }
+            )
+
+    def add(self, *objects):
+        """
+        Seeds the cluster with resources given as kubernetes models or dictionaries.
+        The resource type is derived from the object's kind.
+        """
+        sanitizer = k8s.client.ApiClient()
+        for obj in objects:
+            if not isinstance(obj, dict):
+                # models like V1Pod usually leave their kind unset
+                model_kind = re.sub(r"^V\d+((alpha|beta)\d+)?", "", type(obj).__name__)
+                obj = sanitizer.sanitize_for_serialization(obj)
+                obj.setdefault("kind", model_kind)
+            kind = obj.get("kind")
+            resource = next((r for r, k in KINDS.items() if k == kind), None)
+            if resource is None:
+                raise ValueError("Cannot seed object of unknown kind %s" % kind)
+            namespace = obj.get("metadata", {}).get("namespace")
+            if resource not in CLUSTER_SCOPED_RESOURCES and namespace is None:
+                namespace = "default"
+            self.create(resource, namespace, obj)
+
+    def objects(self, resource, namespace=None):
+        """
+        Returns copies of all stored objects of a resource type, optionally limited to a namespace
+        """
+        with self._condition:
+            return [
+                copy.deepcopy(obj)
+                for (ns, _), obj in sorted(self._objects.get(resource, {}).items())
+                if namespace is None or ns == namespace
+            ]
+
+    def _next_version(self):
+        self._resource_version += 1
+        return str(self._resource_version)
+
+    def _emit(self, event_type, resource, obj):
+        self._events.append(
+            (int(obj["metadata"]["resourceVersion"]), event_type, resource, obj)
+        )
+        self._condition.notify_all()
+
+    def _store(self, resource):
+        return self._objects.setdefault(resource, {})
+
+    def get(self, resource, namespace, name):
+        """
+        Returns a copy of a stored object or raises a not found error
+        """
+        with self._condition:
+            obj = self._store(resource).get((namespace, name))
+            if obj is None:
+                raise FakeApiError(
+                    404,
+                    "NotFound",
+                    '%s "%s" not found' % (resource, name),
+                )
+            return copy.deepcopy(obj)
+
+    def list(self, resource, namespace=None, label_selector=None, field_selector=None):
+        """
+        Returns copies of all objects matching the namespace and selectors
+        """
+        labels = _parse_selector(label_selector)
+        fields = _parse_selector(field_selector)
+        with self._condition:
+            return [
+                copy.deepcopy(obj)
+                for (ns, _), obj in sorted(self._store(resource).items())
+                if (namespace is None or ns == namespace)
+                and _matches(labels, obj["metadata"].get("labels") or {})
+                and _matches(fields, _field_values(obj))
+            ], str(self._resource_version)
+
+    def create(self, resource, namespace, obj):
+        """
+        Stores a new object, completing its metadata and status like the API server and controllers would
+        """
+        obj = copy.deepcopy(obj)
+        metadata = obj.setdefault("metadata", {})
+        with self._condition:
+            if not metadata.get("name"):
+                if not metadata.get("generateName"):
+                    raise FakeApiError(
+                        422, "Invalid", "name or generateName is required"
+                    )
+                suffix = "".join(
+                    self._random.choice(string.ascii_lowercase + string.digits)
+                    for _ in range(5)
+                )
+                metadata["name"] = metadata["generateName"] + suffix
+            key = (namespace, metadata["name"])
+            if key in self._store(resource):
+                raise FakeApiError(
+                    409,
+                    "AlreadyExists",
+                    '%s "%s" already exists' % (resource, metadata["name"]),
+                )
+            if namespace is not None:
+                metadata["namespace"] = namespace
+            metadata.setdefault(
+                "uid", str(uuid.UUID(int=self._random.getrandbits(128)))
+            )
+            metadata.setdefault("creationTimestamp", _now())
+            metadata["generation"] = 1
+            metadata["resourceVersion"] = self._next_version()
+            obj.setdefault("kind", KINDS.get(resource))
+            obj.setdefault("apiVersion", API_VERSIONS.get(resource, "v1"))
+            self._complete(resource, obj)
+            self._store(resource)[key] = obj
+            self._emit("ADDED", resource, copy.deepcopy(obj))
+            return copy.deepcopy(obj)
+
+    def _complete(self, resource, obj):
+        if resource == "pods":
+            spec = obj.setdefault("spec", {})
+            nodes = sorted(name for _, name in self._store("nodes"))
+            if not spec.get("nodeName") and nodes:
+                spec["nodeName"] = nodes[self._scheduled_pods % len(nodes)]
+                self._scheduled_pods += 1
+            status = obj.setdefault("status", {})
+            status.setdefault("phase", "Running")
+            status.setdefault("podIP", self._next_address("10.1"))
+            status.setdefault("hostIP", "192.168.0.1")
+            status.setdefault(
+                "containerStatuses",
+                [
+                    {
+                        "name": container["name"],
+                        "containerID": "containerd://%s" % uuid.uuid4().hex,
+                        "image": container.get("image", ""),
+                        "imageID": "",
+                        "ready": True,
+                        "restartCount": 0,
+                    }
+                    for container in spec.get("containers", [])
+                ],
+            )
+        elif resource == "services":
+            spec = obj.setdefault("spec", {})
+            spec.setdefault("clusterIP", self._next_address("10.96"))
+        elif resource == "namespaces":
+            obj.setdefault("status", {}).setdefault("phase", "Active")
+        elif resource == "daemonsets":
+            nodes = len(self._store("nodes"))
+            obj["status"] = {
+                "currentNumberScheduled": nodes,
+                "desiredNumberScheduled": nodes,
+                "numberAvailable": nodes,
+                "numberMisscheduled": 0,
+                "numberReady": nodes,
+                "updatedNumberScheduled": nodes,
+                "observedGeneration": obj["metadata"]["generation"],
+            }
+
+    def _next_address(self, prefix):
+        self._next_ip += 1
+        return "%s.%s.%s" % (prefix, self._next_ip // 250, self._next_ip % 250 + 1)
+
+    def update(self, resource, namespace, name, patch=None, operations=None, obj=None):
+        """
+        Patches (merge or JSON patch) or replaces a stored object
+        """
+        with self._condition:
+            current = self.get(resource, namespace, name)
+            if obj is not None:
+                updated = copy.deepcopy(obj)
+                updated.setdefault("metadata", {})
+                for key in ("uid", "creationTimestamp", "generation"):
+                    if key in current["metadata"]:
+                        updated["metadata"][key] = current["metadata"][key]
+            elif operations is not None:
+                updated = json_patch(current, operations)
+            else:
+                updated = merge_patch(current, patch)
+            updated["metadata"]["name"] = name
+            if namespace is not None:
+                updated["metadata"]["namespace"] = namespace
+            if updated.get("spec") != current.get("spec"):
+                updated["metadata"]["generation"] = (
+                    current["metadata"]["generation"] + 1
+                )
+            updated["metadata"]["resourceVersion"] = self._next_version()
+            if resource == "daemonsets":
+                self._complete(resource, updated)
+            self._store(resource)[(namespace, name)] = updated
+            self._emit("MODIFIED", resource, copy.deepcopy(updated))
+            return copy.deepcopy(updated)
+
+    def delete(self, resource, namespace, name):
+        """
+        Deletes a stored object, deleting a namespace deletes everything in it
+        """
+        with self._condition:
+            obj = self.get(resource, namespace, name)
+            del self._store(resource)[(namespace, name)]
+            obj["metadata"]["resourceVersion"] = self._next_version()
+            self._emit("DELETED", resource, copy.deepcopy(obj))
+            if resource == "namespaces":
+                for other_resource, store in list(self._objects.items()):
+                    for key in [key for key in store if key[0] == name]:
+                        self.delete(other_resource, name, key[1])
+            return obj
+
+    def delete_collection(
+        self, resource, namespace, label_selector=None, field_selector=None
+    ):
+        """
+        Deletes all objects matching the namespace and selectors
+        """
+        with self._condition:
+            items, _ = self.list(resource, namespace, label_selector, field_selector)
+            for obj in items:
+                self.delete(resource, namespace, obj["metadata"]["name"])
+            return items
+
+    def watch(
+        self,
+        resource,
+        namespace,
+        label_selector,
+        field_selector,
+        resource_version,
+        timeout,
+    ):
+        """
+        Yields watch events of matching objects.
+        Without a resource version all existing objects are sent as ADDED first.
+        """
+        labels = _parse_selector(label_selector)
+        fields = _parse_selector(field_selector)
+
+        def selected(obj):
+            return (
+                (namespace is None or obj["metadata"].get("namespace") == namespace)
+                and _matches(labels, obj["metadata"].get("labels") or {})
+                and _matches(fields, _field_values(obj))
+            )
+
+        if resource_version:
+            seen = int(resource_version)
+        else:
+            items, seen = self.list(resource, namespace, label_selector, field_selector)
+            seen = int(seen)
+            for obj in items:
+                yield {"type": "ADDED", "object": obj}
+        deadline = time.time() + timeout
+        while self._server is not None:
+            with self._condition:
+                pending = [
+                    event
+                    for event in self._events
+                    if event[0] > seen and event[2] == resource and selected(event[3])
+                ]
+                if not pending:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return
+                    self._condition.wait(remaining)
+                    continue
+            for version, event_type, _, obj in pending:
+                seen = version
+                yield {"type": event_type, "object": copy.deepcopy(obj)}
+
+    def _injected_error(self, method, resource):
+        with self._condition:
+            for injected in self._injected_errors:
+                if injected["method"] not in (None, method) or injected[
+                    "resource"
+                ] not in (
+                    None,
+                    resource,
+                ):
+                    continue
+                injected["count"] -= 1
+                if injected["count"] <= 0:
+                    self._injected_errors.remove(injected)
+                return FakeApiError(injected["code"], "Injected", "Injected error")
+        if self.error_rate and self._random.random() < self.error_rate:
+            return FakeApiError(500, "InternalError", "Injected random error")
+        return None
+
+    def handle(self, method, url, body):
+        """
+        Dispatches a request to the matching operation and returns (status code, response or event iterator)
+        """
+        parsed = urlparse(url)
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        resource, namespace, name = _parse_path(parsed.path)
+        self.requests.append((method, resource, namespace, name))
+        if self.latency:
+            time.sleep(self.latency)
+        error = self._injected_error(method, resource)
+        if error is not None:
+            raise error
+        label_selector = query.get("labelSelector")
+        field_selector = query.get("fieldSelector")
+        if method == "GET" and name is None:
+            if query.get("watch") in ("true", "1", "True"):
+                return 200, self.watch(
+                    resource,
+                    namespace,
+                    label_selector,
+                    field_selector,
+                    query.get("resourceVersion"),
+                    float(query.get("timeoutSeconds", 5)),
+                )
+            items, version = self.list(
+                resource, namespace, label_selector, field_selector
+            )
+            return 200, _list_response(resource, items, version)
+        if method == "GET":
+            return 200, self.get(resource, namespace, name)
+        if method == "POST":
+            return 201, self.create(resource, namespace, body)
+        if method == "PATCH":
+            if isinstance(body, list):
+                return 200, self.update(resource, namespace, name, operations=body)
+            return 200, self.update(resource, namespace, name, patch=body)
+        if method == "PUT":
+            return 200, self.update(resource, namespace, name, obj=body)
+        if method == "DELETE" and name is None:
+            self.delete_collection(resource, namespace, label_selector, field_selector)
+            return 200, {"kind": "Status", "apiVersion": "v1", "status": "Success"}
+        if method == "DELETE":
+            return 200, self.delete(resource, namespace, name)
+        raise FakeApiError(405, "MethodNotAllowed", "Method %s not allowed" % method)
+
+
+def _parse_path(path):
+    """
+    Splits an API path into (resource, namespace, name)
+    """
+    parts = [p for p in path.split("/") if p]
+    if parts[:1] == ["api"]:
+        parts = parts[2:]
+    elif parts[:1] == ["apis"]:
+        parts = parts[3:]
+    else:
+        raise FakeApiError(404, "NotFound", "Unknown path %s" % path)
+    if len(parts) >= 3 and parts[0] == "namespaces":
+        return parts[2], parts[1], parts[3] if len(parts) > 3 else None
+    if not parts:
+        raise FakeApiError(404, "NotFound", "Unknown path %s" % path)
+    return parts[0], None, parts[1] if len(parts) > 1 else None
+
+
+def _list_response(resource, items, version):
+    return {
+        "kind": "%sList" % KINDS.get(resource, resource),
+        "apiVersion": API_VERSIONS.get(resource, "v1"),
+        "metadata": {"resourceVersion": version},
+        "items": items,
+    }
+
+
+def _create_handler(cluster):
+    class FakeApiHandler(BaseHTTPRequestHandler):
+        """
+        Handler translating HTTP requests into operations of the fake cluster
+        """
+
+        protocol_version = "HTTP/1.1"
+        # headers and body are written separately, with Nagle's algorithm
+        # every keep-alive response would wait for the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def _handle(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            try:
+                code, response = cluster.handle(self.command, self.path, body)
+            except FakeApiError as error:
+                self._respond(error.code, error.to_status())
+                return
+            if isinstance(response, dict):
+                self._respond(code, response)
+                return
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            try:
+                for event in response:
+                    line = (json.dumps(event) + "\n").encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            self.close_connection = True
+
+        def _respond(self, code, response):
+            encoded = json.dumps(response).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        do_GET = _handle  # pylint: disable=invalid-name
+        do_POST = _handle  # pylint: disable=invalid-name
+        do_PUT = _handle  # pylint: disable=invalid-name
+        do_PATCH = _handle  # pylint: disable=invalid-name
+        do_DELETE = _handle  # pylint: disable=invalid-name
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+    return FakeApiHandler
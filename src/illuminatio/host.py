@@ -3,21 +3,94 @@ File for all kinds of hosts on which network tests can be performed
 """
 from abc import ABC
 
+import functools
 import ipaddress
+import weakref
 
 import kubernetes as k8s
 
+# equal hosts share one object, so comparing them is mostly an identity check
+_INTERNED_HOSTS = weakref.WeakValueDictionary()
+# identifiers repeat heavily across cases, parsed hosts are immutable and safe to share
+HOST_PARSE_CACHE_SIZE = 16384
+
+
+class FrozenLabels(dict):
+    """
+    Class for an immutable label dict, its items are sorted by key.
+    It stays a dict so it serializes like the plain dicts it replaces.
+    """
+
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Labels of a host are immutable")
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
+    __ior__ = _immutable
+
+    def __reduce__(self):
+        return FrozenLabels, (list(self.items()),)
+
+
+def _canonical_labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _labels_to_identifier(labels):
+    if not labels:
+        return "*"
+    return ",".join(["%s=%s" % (str(k).strip(), str(v).strip()) for k, v in labels])
+
 
 class Host(ABC):
     """
     Class for all kinds of hosts on which network tests can be performed
     """
 
+    __slots__ = ("_key", "_identifier", "_hash", "__weakref__")
+
+    @classmethod
+    def _intern(cls, key, identifier, **attributes):
+        host = _INTERNED_HOSTS.get((cls, key))
+        if host is not None:
+            return host
+        host = object.__new__(cls)
+        for name, value in attributes.items():
+            object.__setattr__(host, name, value)
+        object.__setattr__(host, "_key", key)
+        object.__setattr__(host, "_identifier", identifier)
+        object.__setattr__(host, "_hash", hash((cls.__name__, key)))
+        return _INTERNED_HOSTS.setdefault((cls, key), host)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % type(self).__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError("%s is immutable" % type(self).__name__)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        return type(other) is type(self) and other._key == self._key
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return self.__str__()
+
     def to_identifier(self):
         """
-        Abstract function returning the host identifier
+        Returns the host identifier
         """
-        return self
+        return self._identifier
 
     def matches(self, obj):
         """
@@ -32,35 +105,39 @@ class Host(ABC):
         """
         Returns the host type of a given identifier.
         """
-        if identifier == LocalHost().to_identifier():
-            return LocalHost()
-        try:
-            ipaddress.ip_address(identifier)
-            return ExternalHost(identifier)
-        except ValueError:
-            if ":" not in identifier:
-                raise ValueError(f"identifier {identifier} is not a valid Host")
-        split_namespace = identifier.split(":")
-        pod_label_string = (
-            split_namespace[1] if len(split_namespace) > 1 else split_namespace[0]
-        )
-        labels = Host._labels_from_string(pod_label_string)
-        namespace = split_namespace[0] if len(split_namespace) > 1 else "default"
-        if "=" in namespace or "*" in namespace:
-            return GenericClusterHost(Host._labels_from_string(namespace), labels)
-        if labels is not None:
-            return ClusterHost(namespace, labels)
-        return ConcreteClusterHost(namespace, pod_label_string)
-
-    @staticmethod
-    def _labels_from_string(label_string):
-        if label_string == "*":
-            return {}
-        if "=" in label_string:
-            split_labels = label_string.split(",")
-            labels = {sp.split("=")[0]: sp.split("=")[1] for sp in split_labels}
-            return labels
-        return None
+        return _parse_identifier(identifier)
+
+
+@functools.lru_cache(maxsize=HOST_PARSE_CACHE_SIZE)
+def _parse_identifier(identifier):
+    if identifier == "localhost":
+        return LocalHost()
+    try:
+        ipaddress.ip_address(identifier)
+        return ExternalHost(identifier)
+    except ValueError:
+        if ":" not in identifier:
+            raise ValueError(f"identifier {identifier} is not a valid Host")
+    split_namespace = identifier.split(":")
+    pod_label_string = (
+        split_namespace[1] if len(split_namespace) > 1 else split_namespace[0]
+    )
+    labels = _labels_from_string(pod_label_string)
+    namespace = split_namespace[0] if len(split_namespace) > 1 else "default"
+    if "=" in namespace or "*" in namespace:
+        return GenericClusterHost(_labels_from_string(namespace), labels)
+    if labels is not None:
+        return ClusterHost(namespace, labels)
+    return ConcreteClusterHost(namespace, pod_label_string)
+
+
+def _labels_from_string(label_string):
+    if label_string == "*":
+        return {}
+    if "=" in label_string:
+        split_labels = [label.split("=") for label in label_string.split(",")]
+        return {label[0]: label[1] for label in split_labels}
+    return None
 
 
 class ConcreteClusterHost(Host):
@@ -68,24 +145,23 @@ class ConcreteClusterHost(Host):
     Concrete class for cluster hosts
     """
 
-    def __init__(self, namespace, name):
+    __slots__ = ("namespace", "name")
+
+    def __new__(cls, namespace, name):
         if namespace is None:
             raise ValueError("namespace may not be None")
         if name is None:
             raise ValueError("name may not be None")
-        self.namespace = namespace
-        self.name = name
-
-    def __eq__(self, other):
-        if isinstance(other, ConcreteClusterHost):
-            return self.namespace == other.namespace and self.name == other.name
-        return False
-
-    def __hash__(self):
-        return hash(str(self))
+        return cls._intern(
+            (namespace, name),
+            "%s:%s" % (str(namespace), str(name)),
+            namespace=namespace,
+            name=name,
+        )
 
-    def to_identifier(self):
-        return "%s:%s" % (str(self.namespace), str(self.name))
+    def __reduce__(self):
+        # unpickled and copied hosts are interned again
+        return ConcreteClusterHost, (self.namespace, self.name)
 
     def __str__(self):
         return "ConcreteClusterHost(namespace=%s, name=%s)" % (
@@ -93,49 +169,30 @@ class ConcreteClusterHost(Host):
             str(self.name),
         )
 
-    def __repr__(self):
-        return self.__str__()
-
 
 class ClusterHost(Host):
     """
     Class for cluster hosts
     """
 
-    def __init__(self, namespace, pod_labels):
+    __slots__ = ("namespace", "pod_labels")
+
+    def __new__(cls, namespace, pod_labels):
         if namespace is None:
             raise ValueError("namespace may not be None")
         if pod_labels is None:
             raise ValueError("podLabels may not be None")
-        self.namespace = namespace
-        self.pod_labels = pod_labels
-
-    def __eq__(self, other):
-        if isinstance(other, ClusterHost):
-            return (
-                self.namespace == other.namespace
-                and self.pod_labels == other.pod_labels
-            )
-        return False
-
-    def __hash__(self):
-        return hash(str(self))
-
-    def to_identifier(self):
-        return "%s:%s" % (
-            str(self.namespace),
-            (
-                "*"
-                if not self.pod_labels
-                else ",".join(
-                    [
-                        "%s=%s" % (str(k).strip(), str(v).strip())
-                        for k, v in self.pod_labels.items()
-                    ]
-                )
-            ),
+        canonical_pod_labels = _canonical_labels(pod_labels)
+        return cls._intern(
+            (namespace, canonical_pod_labels),
+            "%s:%s" % (str(namespace), _labels_to_identifier(canonical_pod_labels)),
+            namespace=namespace,
+            pod_labels=FrozenLabels(canonical_pod_labels),
         )
 
+    def __reduce__(self):
+        return ClusterHost, (self.namespace, dict(self.pod_labels))
+
     def matches(self, obj):
         if obj is None:
             raise ValueError("obj to match to cannot be None")
@@ -167,9 +224,6 @@ class ClusterHost(Host):
             str(self.pod_labels),
         )
 
-    def __repr__(self):
-        return self.__str__()
-
 
 class GenericClusterHost(Host):
     """
@@ -177,24 +231,31 @@ class GenericClusterHost(Host):
     can be used to express multiple hosts e.g. with different namespace labels
     """
 
-    def __init__(self, namespace_labels, pod_labels):
+    __slots__ = ("namespace_labels", "pod_labels")
+
+    def __new__(cls, namespace_labels, pod_labels):
         if namespace_labels is None:
             raise ValueError("namespaceLabels may not be None")
         if pod_labels is None:
             raise ValueError("podLabels may not be None")
-        self.namespace_labels = namespace_labels
-        self.pod_labels = pod_labels
-
-    def __eq__(self, other):
-        if isinstance(other, GenericClusterHost):
-            return (
-                self.namespace_labels == other.namespace_labels
-                and self.pod_labels == other.pod_labels
-            )
-        return False
+        canonical_namespace_labels = _canonical_labels(namespace_labels)
+        canonical_pod_labels = _canonical_labels(pod_labels)
+        return cls._intern(
+            (canonical_namespace_labels, canonical_pod_labels),
+            "%s:%s"
+            % (
+                _labels_to_identifier(canonical_namespace_labels),
+                _labels_to_identifier(canonical_pod_labels),
+            ),
+            namespace_labels=FrozenLabels(canonical_namespace_labels),
+            pod_labels=FrozenLabels(canonical_pod_labels),
+        )
 
-    def __hash__(self):
-        return hash(str(self))
+    def __reduce__(self):
+        return (
+            GenericClusterHost,
+            (dict(self.namespace_labels), dict(self.pod_labels)),
+        )
 
     def matches(self, obj):
         if obj is None:
@@ -230,61 +291,28 @@ class GenericClusterHost(Host):
             )
         raise TypeError("obj is neither a pod nor a service")
 
-    def to_identifier(self):
-        return "%s:%s" % (
-            (
-                "*"
-                if not self.namespace_labels
-                else ",".join(
-                    [
-                        "%s=%s" % (str(k).strip(), str(v).strip())
-                        for k, v in self.namespace_labels.items()
-                    ]
-                )
-            ),
-            (
-                "*"
-                if not self.pod_labels
-                else ",".join(
-                    [
-                        "%s=%s" % (str(k).strip(), str(v).strip())
-                        for k, v in self.pod_labels.items()
-                    ]
-                )
-            ),
-        )
-
     def __str__(self):
         return "GenericClusterHost(namespaceLabels=%s, podLabels=%s)" % (
             str(self.namespace_labels),
             str(self.pod_labels),
         )
 
-    def __repr__(self):
-        return self.__str__()
-
 
 class ExternalHost(Host):
     """
     Class for execution on an external host
     """
 
-    def __init__(self, ip_address):
-        self.ip_address = ip_address
+    __slots__ = ("ip_address",)
 
-    def __str__(self):
-        return "ExternalHost(ipAddress=%s)" % str(self.ip_address)
+    def __new__(cls, ip_address):
+        return cls._intern(ip_address, str(ip_address), ip_address=ip_address)
 
-    def __repr__(self):
-        return self.__str__()
+    def __reduce__(self):
+        return ExternalHost, (self.ip_address,)
 
-    def __eq__(self, other):
-        if not isinstance(other, ExternalHost):
-            return False
-        return self.ip_address == other.ip_address
-
-    def to_identifier(self):
-        return str(self.ip_address)
+    def __str__(self):
+        return "ExternalHost(ipAddress=%s)" % str(self.ip_address)
 
 
 class LocalHost(Host):
@@ -292,14 +320,13 @@ class LocalHost(Host):
     Class for execution on localhost
     """
 
-    def __str__(self):
-        return "LocalHost()"
+    __slots__ = ()
 
-    def __eq__(self, other):
-        return isinstance(other, LocalHost)
+    def __new__(cls):
+        return cls._intern(None, "localhost")
 
-    def __repr__(self):
-        return self.__str__()
+    def __reduce__(self):
+        return LocalHost, ()
 
-    def to_identifier(self):
-        return "localhost"
+    def __str__(self):
+        return "LocalHost()"
@@ -3,20 +3,45 @@ This file contains the illuminatio CLI
 """
 
 import logging
+import random
 import time
-import json
+from contextlib import contextmanager
 
 import click
 import click_log
 import kubernetes as k8s
+from illuminatio.case_cache import (
+    CASE_CACHE_META_KEY,
+    DEFAULT_CACHE_SIZE,
+    CaseCache,
+    cache_key,
+)
+from illuminatio.case_table import SENDER, TARGET, CaseTable
 from illuminatio.cleaner import Cleaner
-from illuminatio.test_case import merge_in_dict, from_merged_dict
-from illuminatio.test_generator import NetworkTestCaseGenerator
-from illuminatio.test_orchestrator import NetworkTestOrchestrator
+from illuminatio.equivalence import PodEquivalence
+from illuminatio.instrumentation import API_CALLS
+from illuminatio.k8s_util import load_policy_manifests
+from illuminatio.probe_planner import ProbePlanner
+from illuminatio.profiling import CommandProfiler, PROFILER_META_KEY, profiled
+from illuminatio.simulator import create_simulator
+from illuminatio.snapshot import ClusterSnapshot, REPLAY_META_KEY, SNAPSHOT_META_KEY
+from illuminatio.tracing import TRACER
+from illuminatio.test_case import to_records
+from illuminatio.test_generator import (
+    IncrementalTestCaseGenerator,
+    NetworkTestCaseGenerator,
+)
+from illuminatio.test_orchestrator import (
+    NetworkTestOrchestrator,
+    TARGET_MODES,
+    TARGET_MODE_IMAGE,
+)
 from illuminatio.util import (
     CLEANUP_ALWAYS,
     CLEANUP_ON_REQUEST,
     STD_IDENTIFIER,
+    format_for,
+    iter_formatted,
     write_formatted,
     read_formatted,
 )
@@ -26,6 +51,8 @@ from termcolor import colored
 LOGGER = logging.getLogger(__name__)
 click_log.basic_config(LOGGER)
 
+KUBE_CONFIG_META_KEY = "illuminatio.kubeconfig"
+
 
 @click.group(chain=True)
 @click_log.simple_verbosity_option(LOGGER, default="INFO")
@@ -41,15 +68,121 @@ click_log.basic_config(LOGGER)
     envvar="KUBECONFIG",
     help="Path to the kubeconfig file to use. Cannot be used with --incluster.",
 )
-def cli(incluster, kubeconfig):
+@click.option(
+    "--trace-file",
+    default=None,
+    help="Write a trace of all steps, including the runners' ones, to this file (Chrome trace event format).",
+)
+@click.option(
+    "--profile",
+    "profile_dir",
+    default=None,
+    help="Profile each command and write pstats files and hotspot summaries to this directory.",
+)
+@click.option(
+    "--profile-top",
+    default=25,
+    show_default=True,
+    help="Number of hotspots listed in the profile summaries.",
+)
+@click.option(
+    "--profile-memory",
+    default=False,
+    is_flag=True,
+    help="Additionally take tracemalloc snapshots of each profiled command.",
+)
+@click.option(
+    "--record-snapshot",
+    default=None,
+    help="Record the pods, services, namespaces and NetworkPolicies read from the cluster into this file.",
+)
+@click.option(
+    "--replay-snapshot",
+    default=None,
+    help="Use a recorded snapshot instead of a cluster. run stops after resolving the test cases.",
+)
+@click.option(
+    "--cache-dir",
+    default=None,
+    envvar="ILLUMINATIO_CACHE_DIR",
+    help="Directory caching generated test cases per set of NetworkPolicies and namespace labels. "
+    "Defaults to illuminatio/cases in the user's cache directory.",
+)
+@click.option(
+    "--cache-size",
+    default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+    show_default=True,
+    help="Size limit of the test case cache in MiB, least recently used entries are evicted beyond it.",
+)
+@click.option(
+    "--no-cache",
+    default=False,
+    is_flag=True,
+    help="Always generate test cases, neither reading nor writing the cache.",
+)
+@click.pass_context
+def cli(
+    ctx,
+    incluster,
+    kubeconfig,
+    trace_file,
+    profile_dir,
+    profile_top,
+    profile_memory,
+    record_snapshot,
+    replay_snapshot,
+    cache_dir,
+    cache_size,
+    no_cache,
+):
     """
     CLI for testing kubernetes NetworkPolicies.
     """
-    if incluster:
+    if profile_dir:
+        ctx.meta[PROFILER_META_KEY] = CommandProfiler(
+            profile_dir, top=profile_top, memory=profile_memory, logger=LOGGER
+        )
+    if trace_file:
+        TRACER.enable()
+        ctx.call_on_close(lambda: TRACER.write(trace_file))
+    if record_snapshot and replay_snapshot:
+        LOGGER.error("--record-snapshot cannot be used with --replay-snapshot")
+        exit(1)
+    if record_snapshot:
+        snapshot = ClusterSnapshot()
+        ctx.meta[SNAPSHOT_META_KEY] = snapshot
+        ctx.call_on_close(lambda: snapshot.write(record_snapshot))
+    if not no_cache and not replay_snapshot:
+        # replays are for debugging the generation, which the cache would skip
+        ctx.meta[CASE_CACHE_META_KEY] = CaseCache(
+            cache_dir, cache_size * 1024 * 1024, LOGGER
+        )
+    if replay_snapshot:
+        fake_cluster = ClusterSnapshot.read(replay_snapshot).serve()
+        ctx.call_on_close(fake_cluster.stop)
+        k8s.client.Configuration.set_default(fake_cluster.configuration())
+        ctx.meta[REPLAY_META_KEY] = True
+        # wildcard ports are replaced by random ones, seeding keeps replays identical
+        random.seed(0)
+        LOGGER.info("Replaying cluster snapshot %s", replay_snapshot)
+        return
+    # credentials are only loaded by commands accessing the cluster
+    ctx.meta[KUBE_CONFIG_META_KEY] = {"incluster": incluster, "kubeconfig": kubeconfig}
+
+
+def load_kube_config():
+    """
+    Loads the cluster credentials selected on the command line, once per invocation
+    """
+    settings = click.get_current_context().meta.pop(KUBE_CONFIG_META_KEY, None)
+    if settings is None:
+        # already loaded or replaying a snapshot
+        return
+    if settings["incluster"]:
         k8s.config.load_incluster_config()
     else:
         try:
-            k8s.config.load_kube_config(config_file=kubeconfig)
+            k8s.config.load_kube_config(config_file=settings["kubeconfig"])
         except k8s.config.ConfigException as config_error:
             LOGGER.error(config_error)
             exit(1)
@@ -65,27 +198,193 @@ def cli(incluster, kubeconfig):
     "-o",
     "--outfile",
     default=STD_IDENTIFIER,
-    help="Output file to write results to. Format is chosen according to file ending. Supported: YAML, JSON.",
+    help="Output file to write results to. Format is chosen according to file ending. "
+    "Supported: YAML, JSON, MessagePack (.msgpack), "
+    "NDJSON (.ndjson or .jsonl, streamed one case per line as cases are generated).",
+)
+@click.option(
+    "-f",
+    "--from-manifests",
+    "manifest_paths",
+    multiple=True,
+    type=click.Path(exists=True),
+    help="Generate offline from the NetworkPolicy and Namespace manifests in these files or directories "
+    "instead of the cluster's. Can be given multiple times.",
+)
+@click.option(
+    "--incremental-state",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Continue from the generation state in this file, only recomputing what changed policies affect, "
+    "and write the new state to it. The state is unpickled, only pass files you trust.",
+)
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Parse policies and generate positive test cases in this many processes, namespaces are kept together. "
+    "Only pays off with several CPUs and thousands of policies, below that starting the workers costs more.",
 )
-def generate(outfile: str):
+@profiled("generate")
+@TRACER.traced("generate-command")
+def generate(outfile: str, manifest_paths, incremental_state, workers):
     """
     "Generate and output test cases.
     """
-    generator = NetworkTestCaseGenerator(LOGGER)
-    v1net = k8s.client.NetworkingV1Api()
+    generator = create_generator(incremental_state, workers)
+    if manifest_paths:
+        network_policies, namespaces = load_policy_manifests(manifest_paths)
+    else:
+        load_kube_config()
+        v1net = k8s.client.NetworkingV1Api()
+        core_api = k8s.client.CoreV1Api()
+        orch = NetworkTestOrchestrator([], LOGGER)
+        network_policies = v1net.list_network_policy_for_all_namespaces().items
+        if click.get_current_context().meta.get(SNAPSHOT_META_KEY) is not None:
+            # a snapshot is only replayable by run if it contains all resources
+            orch.refresh_cluster_resources(core_api)
+        else:
+            orch.refresh_namespaces(core_api)
+        record_snapshot(orch, network_policies)
+        namespaces = orch.current_namespaces
+    if format_for(outfile).streaming:
+        # written while they are generated, the case cache would need all cases at once
+        cases = generator.iter_test_cases(network_policies, namespaces)
+        write_formatted(to_records(cases), outfile)
+    else:
+        cases, _ = generate_cases(generator, network_policies, namespaces)
+        write_formatted(CaseTable.from_cases(cases).to_merged_dict(), outfile)
+    if incremental_state:
+        generator.save(incremental_state)
+
+
+def generate_cases(generator, network_policies, namespaces):
+    """
+    Generates the test cases and runtimes, or takes the cases from the cache if it is enabled
+    """
+    cache = click.get_current_context().meta.get(CASE_CACHE_META_KEY)
+    if cache is None:
+        return generator.generate_test_cases(network_policies, namespaces)
+    key = cache_key(network_policies, namespaces)
+    cached = cache.get(key)
+    if cached is not None:
+        LOGGER.info("Using cached test cases %s from %s", key[:12], cache.directory)
+        return CaseTable.from_merged_dict(cached).cases(), {"cache": "hit"}
+    cases, runtimes = generator.generate_test_cases(network_policies, namespaces)
+    cache.put(key, CaseTable.from_cases(cases).to_merged_dict())
+    return cases, runtimes
+
+
+def validate_document_outfile(_ctx, _param, value):
+    """
+    Rejects output files in formats that cannot hold a single document, before anything runs
+    """
+    if value:
+        try:
+            fmt = format_for(value)
+        except ValueError as error:
+            raise click.BadParameter(str(error))
+        if fmt.streaming:
+            raise click.BadParameter(
+                "Cannot write %s record by record, use YAML or JSON" % value
+            )
+    return value
+
+
+def create_generator(incremental_state=None, workers=1):
+    """
+    Returns a generator, continuing from the incremental state file if one is given
+    """
+    if incremental_state:
+        return IncrementalTestCaseGenerator.load(incremental_state, LOGGER, workers)
+    return NetworkTestCaseGenerator(LOGGER, workers)
+
+
+@cli.command(short_help="compute the expected reachability matrix")
+@click.option(
+    "-o",
+    "--outfile",
+    default=STD_IDENTIFIER,
+    help="Output file to write the matrix to. Format is chosen according to file ending. Supported: YAML, JSON.",
+    callback=validate_document_outfile,
+)
+@profiled("simulate")
+@TRACER.traced("simulate")
+def simulate(outfile: str):
+    """
+    Compute whether the NetworkPolicies allow each connection between the cluster's pods, without probing.
+    """
+    load_kube_config()
     orch = NetworkTestOrchestrator([], LOGGER)
-    net_pols = v1net.list_network_policy_for_all_namespaces()
-    cases, _ = generator.generate_test_cases(net_pols.items, orch.current_namespaces)
-    write_formatted(merge_in_dict(cases), outfile)
+    orch.refresh_cluster_resources(k8s.client.CoreV1Api())
+    network_policies = (
+        k8s.client.NetworkingV1Api().list_network_policy_for_all_namespaces().items
+    )
+    record_snapshot(orch, network_policies)
+    resources = orch.cluster_resources()
+    with TRACER.span("reachability-matrix", pods=len(resources["pods"])):
+        simulator = create_simulator(
+            resources["pods"], resources["namespaces"], network_policies
+        )
+        matrix = simulator.reachability_matrix()
+    write_formatted(matrix, outfile)
+
+
+@cli.command(short_help="plan a minimal set of probes")
+@click.option(
+    "-o",
+    "--outfile",
+    default=STD_IDENTIFIER,
+    help="Output file to write the plan and its report to. Format is chosen according to file ending. "
+    "Supported: YAML, JSON.",
+    callback=validate_document_outfile,
+)
+@profiled("plan")
+@TRACER.traced("plan")
+def plan(outfile: str):
+    """
+    Choose probes between the cluster's pods covering every policy rule and isolation, with a coverage report.
+    """
+    load_kube_config()
+    orch = NetworkTestOrchestrator([], LOGGER)
+    orch.refresh_cluster_resources(k8s.client.CoreV1Api())
+    network_policies = (
+        k8s.client.NetworkingV1Api().list_network_policy_for_all_namespaces().items
+    )
+    record_snapshot(orch, network_policies)
+    resources = orch.cluster_resources()
+    cases, _ = NetworkTestCaseGenerator(LOGGER).generate_test_cases(
+        network_policies, resources["namespaces"]
+    )
+    with TRACER.span("probe-plan", pods=len(resources["pods"])):
+        probe_plan = ProbePlanner(
+            resources["pods"], resources["namespaces"], network_policies
+        ).plan(len(cases))
+    report = probe_plan.report()
+    LOGGER.info(
+        "Planned %d probes covering %d of %d requirements, %d naive cases",
+        report["probes"],
+        report["covered"],
+        report["requirements"],
+        report["naive-cases"],
+    )
+    write_formatted({"probes": probe_plan.to_dict(), "report": report}, outfile)
 
 
 @cli.command(short_help="create and run test cases")
-@click.option("-t", "--test-cases", default=None, help="Test cases file.")
+@click.option(
+    "-t",
+    "--test-cases",
+    default=None,
+    help="Test cases file. NDJSON files (.ndjson or .jsonl) are read one case per line.",
+)
 @click.option(
     "-o",
     "--outfile",
     default=None,
     help="Output file to write results to. Format is chosen according to file ending. Supported: YAML, JSON.",
+    callback=validate_document_outfile,
 )
 @click.option(
     "-b/-w",
@@ -106,18 +405,76 @@ def generate(outfile: str):
     default="nginx:stable",
     help="Target image that is used to generate pods (should have a webserver inside listening on port 80).",
 )
+@click.option(
+    "--target-mode",
+    type=click.Choice(TARGET_MODES),
+    default=TARGET_MODE_IMAGE,
+    help="Create one target pod per host from the target image, or use the runner image's builtin "
+    "target listening on all tested ports with hosts no NetworkPolicy tells apart consolidated onto shared pods.",
+)
+@click.option(
+    "--spread-dummies/--no-spread-dummies",
+    default=False,
+    help="Prefer scheduling dummy sender pods on different nodes to balance the runners' workload.",
+)
+@click.option(
+    "--restrict-runners/--no-restrict-runners",
+    default=False,
+    help="Only schedule runners on nodes that host sender pods.",
+)
+@click.option(
+    "--runner-metrics/--no-runner-metrics",
+    default=False,
+    help="Let the runners serve Prometheus metrics, with liveness and readiness probes on their health endpoints.",
+)
+@click.option(
+    "--pod-classes/--no-pod-classes",
+    default=False,
+    help="Group pods selected by the same policies and rules into classes and probe from one pod per class, "
+    "the class members are listed in the output file.",
+)
+@click.option(
+    "--incremental-state",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Continue generating from the state in this file, only recomputing what changed policies affect, "
+    "and write the new state to it. The state is unpickled, only pass files you trust.",
+)
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Parse policies and generate positive test cases in this many processes, namespaces are kept together. "
+    "Only pays off with several CPUs and thousands of policies, below that starting the workers costs more.",
+)
+@click.option(
+    "--api-stats/--no-api-stats",
+    default=False,
+    help="Print a summary of all kubernetes API calls per run phase.",
+)
 @click.option(
     "-c",
     "--cri-socket",
     default=None,
     help="CRI socket used for the interaction with the container runtime.",
 )
+@profiled("run")
+@TRACER.traced("run")
 def run(
     test_cases: str,
     outfile: str,
     brief: bool,
     runner_image: str,
     target_image: str,
+    target_mode: str,
+    spread_dummies: bool,
+    restrict_runners: bool,
+    runner_metrics: bool,
+    pod_classes: bool,
+    incremental_state: str,
+    workers: int,
+    api_stats: bool,
     cri_socket: str,
 ):
     """
@@ -126,26 +483,52 @@ def run(
     runtimes = {}
     start_time = time.time()
     LOGGER.info("Starting test generation and run.")
+    load_kube_config()
+    API_CALLS.install()
     core_api = k8s.client.CoreV1Api()
     orch = NetworkTestOrchestrator([], LOGGER)
     orch.set_runner_image(runner_image)
     orch.set_target_image(target_image)
-    # Fetch all pods, namespaces, services
-    orch.refresh_cluster_resources(core_api)
-    v1net = k8s.client.NetworkingV1Api()
-    # Fetch all network policies
-    net_pols = v1net.list_network_policy_for_all_namespaces()
+    orch.set_target_mode(target_mode)
+    orch.spread_dummy_pods = spread_dummies
+    orch.restrict_runners = restrict_runners
+    orch.runner_metrics = runner_metrics
+    with run_phase("resource-pull"):
+        # Fetch all pods, namespaces, services
+        orch.refresh_cluster_resources(core_api)
+        v1net = k8s.client.NetworkingV1Api()
+        # Fetch all network policies
+        net_pols = v1net.list_network_policy_for_all_namespaces()
+    record_snapshot(orch, net_pols.items)
+    orch.set_network_policies(net_pols.items)
     runtimes["resource-pull"] = time.time() - start_time
+    if pod_classes:
+        resources = orch.cluster_resources()
+        with TRACER.span("pod-classes", pods=len(resources["pods"])) as classes_span:
+            equivalence = PodEquivalence(
+                resources["pods"], resources["namespaces"], net_pols.items
+            )
+            classes_span.set_attribute("classes", len(equivalence))
+        LOGGER.info(
+            "Grouped %d pods into %d classes",
+            len(resources["pods"]),
+            len(equivalence),
+        )
+        orch.set_pod_classes(equivalence)
 
     # Generate Test cases
-    if test_cases:
-        cases = from_merged_dict(read_formatted(test_cases))
-        gen_run_times = 0
-    else:
-        generator = NetworkTestCaseGenerator(LOGGER)
-        cases, gen_run_times = generator.generate_test_cases(
-            net_pols.items, orch.current_namespaces
-        )
+    with run_phase("generate") as generate_span:
+        if test_cases:
+            cases = read_cases(test_cases)
+            gen_run_times = 0
+        else:
+            generator = create_generator(incremental_state, workers)
+            cases, gen_run_times = generate_cases(
+                generator, net_pols.items, orch.current_namespaces
+            )
+            if incremental_state:
+                generator.save(incremental_state)
+        generate_span.set_attribute("cases", len(cases))
     LOGGER.debug("Got cases: %s", cases)
     case_time = time.time()
     runtimes["generate"] = case_time - start_time
@@ -155,6 +538,23 @@ def run(
         LOGGER.info("Skipping resource creation since no test were generated")
         return
 
+    if click.get_current_context().meta.get(REPLAY_META_KEY):
+        mappings = resolve_cases(cases, orch)
+        runtimes["resolve"] = time.time() - case_time
+        LOGGER.info(
+            "Resolved %d test cases against the snapshot, skipping the test run",
+            len(cases),
+        )
+        if outfile:
+            file_contents = {
+                "cases": as_case_table(cases).to_merged_dict(),
+                "runtimes": runtimes,
+                "results": {"mappings": mappings, "pod-classes": orch.class_members},
+                "api-calls": API_CALLS.to_dict(),
+            }
+            write_formatted(file_contents, outfile)
+        return
+
     (
         results,
         test_runtimes,
@@ -181,6 +581,7 @@ def run(
         }
         file_contents["runtimes"]["runners"] = test_runtimes
         file_contents["runtimes"]["generator"] = gen_run_times
+        file_contents["api-calls"] = API_CALLS.to_dict()
         try:
             write_formatted(file_contents, outfile)
         except ValueError as err:
@@ -188,9 +589,71 @@ def run(
     # echo results, whether they have been saved or not
     result_duration = result_time - case_time
     render_results(results, result_duration)
+    if api_stats:
+        render_api_calls(API_CALLS.summary_rows())
     # clean(True)
 
 
+def read_cases(filename):
+    """
+    Reads a test case file into a case table, line-oriented files record by record without a
+    NetworkTestCase per record. The whole table is built before any host is resolved,
+    its columns grow with the number of cases.
+    """
+    if format_for(filename).streaming:
+        return CaseTable.from_records(iter_formatted(filename))
+    return CaseTable.from_merged_dict(read_formatted(filename))
+
+
+def as_case_table(cases):
+    """
+    Returns the cases as a case table, converting lists of NetworkTestCases
+    """
+    return cases if isinstance(cases, CaseTable) else CaseTable.from_cases(cases)
+
+
+@contextmanager
+def run_phase(name):
+    """
+    Attributes all kubernetes API calls within the context to the phase and traces it as a span
+    """
+    with API_CALLS.phase(name), TRACER.span(name) as span:
+        yield span
+
+
+def record_snapshot(orch, network_policies):
+    """
+    Records the cluster resources read by the orchestrator and the NetworkPolicies,
+    if snapshot recording is enabled
+    """
+    snapshot = click.get_current_context().meta.get(SNAPSHOT_META_KEY)
+    if snapshot is None:
+        return
+    for resource, items in orch.cluster_resources().items():
+        snapshot.record(resource, items)
+    snapshot.record("networkpolicies", network_policies)
+
+
+def resolve_cases(cases, orch):
+    """
+    Finds or creates the cluster resources of all test cases without running them
+    and returns the resulting mappings
+    """
+    orch.test_cases = cases
+    with run_phase("resource-creation"):
+        (
+            from_host_mappings,
+            to_host_mappings,
+            port_mappings,
+            _,
+        ) = orch.ensure_cases_are_generated(k8s.client.CoreV1Api())
+    return {
+        "fromHost": from_host_mappings,
+        "toHost": to_host_mappings,
+        "ports": port_mappings,
+    }
+
+
 def execute_tests(cases, orch, cri_socket):
     """
     Executes all tests with given test cases
@@ -201,21 +664,23 @@ def execute_tests(cases, orch, cri_socket):
     # -> illuminatio
     namespace_name = "illuminatio"
 
-    if not orch.namespace_exists(namespace_name, core_api):
-        orch.create_namespace(namespace_name, core_api)
+    with run_phase("resource-creation") as creation_span:
+        if not orch.namespace_exists(namespace_name, core_api):
+            orch.create_namespace(namespace_name, core_api)
 
-    (
-        from_host_mappings,
-        to_host_mappings,
-        port_mappings,
-        cfgmap,
-    ) = orch.ensure_cases_are_generated(core_api)
-    pod_selector = orch.ensure_daemonset_is_ready(
-        cfgmap, k8s.client.AppsV1Api(), core_api, cri_socket
-    )
-    resource_creation_time = time.time()
-    raw_results, runtimes = orch.collect_results(pod_selector, core_api)
-    result_collection_time = time.time()
+        (
+            from_host_mappings,
+            to_host_mappings,
+            port_mappings,
+            cfgmap,
+        ) = orch.ensure_cases_are_generated(core_api)
+        pod_selector = orch.ensure_daemonset_is_ready(
+            cfgmap, k8s.client.AppsV1Api(), core_api, cri_socket
+        )
+    resource_creation_time = creation_span.end
+    with run_phase("result-waiting") as waiting_span:
+        raw_results, runtimes = orch.collect_results(pod_selector, core_api)
+    result_collection_time = waiting_span.end
     additional_data = {
         "raw-results": raw_results,
         "mappings": {
@@ -223,10 +688,12 @@ def execute_tests(cases, orch, cri_socket):
             "toHost": to_host_mappings,
             "ports": port_mappings,
         },
+        "pod-classes": orch.class_members,
     }
-    results = transform_results(
-        raw_results, from_host_mappings, to_host_mappings, port_mappings
-    )
+    with TRACER.span("transform-results"):
+        results = transform_results(
+            raw_results, from_host_mappings, to_host_mappings, port_mappings
+        )
     return (
         results,
         runtimes,
@@ -263,7 +730,6 @@ def transform_results(
                 LOGGER.debug("receiver_pod: %s", receiver_pod)
                 LOGGER.debug("mapped_sender_pod: %s", mapped_sender_pod)
                 LOGGER.debug("mapped_receiver_pod: %s", mapped_receiver_pod)
-                LOGGER.debug("raw_results: %s", json.dumps(raw_results))
                 # FIXME: https://github.com/inovex/illuminatio/issues/98
                 if mapped_port in raw_results[mapped_sender_pod][mapped_receiver_pod]:
                     # fetch all requests from desired ports
@@ -330,25 +796,42 @@ def render_cases(cases, run_time, trailing_spaces=2):
     """
     Prints test cases in a beautiful way
     """
-    # convert into tuples for character counting and printing
-    case_string_tuples = [
-        (c.from_host.to_identifier(), c.to_host.to_identifier(), c.port_string)
-        for c in cases
-    ]
+    table = as_case_table(cases)
     # computes width (=max string length per column + trailingSpaces)
     widths = [
-        max([len(el) for el in l]) + trailing_spaces for l in zip(*case_string_tuples)
+        max([len(el) for el in l], default=0) + trailing_spaces
+        for l in (table.hosts_in(SENDER), table.hosts_in(TARGET), table.ports)
     ]
     # formats string to choose each element of the given tuple or array with the according width element
     line_format = "{0[0]:{w[0]}}{0[1]:{w[1]}}{0[2]:{w[2]}}"
     LOGGER.info("Generated %d cases in %.4f seconds\n", len(cases), run_time)
     if cases:
         LOGGER.info(line_format.format(("FROM", "TO", "PORT"), w=widths))
-        for case in case_string_tuples:
+        for case in table:
             LOGGER.info(line_format.format(case, w=widths))
     LOGGER.info("")
 
 
+def render_api_calls(rows, trailing_spaces=2):
+    """
+    Prints a summary of recorded kubernetes API calls per phase
+    """
+    header = ("PHASE", "CALL", "COUNT", "BYTES", "SECONDS")
+    string_rows = [
+        (phase, call, str(count), str(num_bytes), "%.4f" % seconds)
+        for phase, call, count, num_bytes, seconds in rows
+    ]
+    widths = [
+        max(len(el) for el in column) + trailing_spaces
+        for column in zip(header, *string_rows)
+    ]
+    line_format = "{0[0]:{w[0]}}{0[1]:{w[1]}}{0[2]:{w[2]}}{0[3]:{w[3]}}{0[4]:{w[4]}}"
+    LOGGER.info("\nKubernetes API calls:")
+    LOGGER.info(line_format.format(header, w=widths))
+    for row in string_rows:
+        LOGGER.info(line_format.format(row, w=widths))
+
+
 def simplify_successful_results(results):
     """
     Removes all information besides whether the run was successful from given results
@@ -369,6 +852,8 @@ def simplify_successful_results(results):
     default=True,
     help="Whether to delete all resources or only those with cleanup policy 'on_request'.",
 )
+@profiled("clean")
+@TRACER.traced("clean")
 def clean(hard):
     """
     Delete resources created by illuminatio.
@@ -377,6 +862,7 @@ def clean(hard):
         [CLEANUP_ON_REQUEST, CLEANUP_ALWAYS] if hard else [CLEANUP_ALWAYS]
     )
     LOGGER.info("Starting cleaning resources with policies %s", clean_up_policies)
+    load_kube_config()
     core_api = k8s.client.CoreV1Api()
     apps_api = k8s.client.AppsV1Api()
     rbac_api = k8s.client.RbacAuthorizationV1Api()
@@ -9,7 +9,6 @@ import os
 import subprocess
 import time
 import platform
-import yaml
 import nmap
 
 import click
@@ -19,6 +18,9 @@ import kubernetes as k8s
 
 from illuminatio.host import Host, ConcreteClusterHost
 from illuminatio.k8s_util import create_test_output_config_map_manifest
+from illuminatio.runner_metrics import METRICS, start_metrics_server
+from illuminatio.tracing import TRACER
+from illuminatio.util import yaml_dump, yaml_load
 
 # Otherwise we get an error on Mac
 if platform.system() == "Linux":
@@ -27,6 +29,8 @@ if platform.system() == "Linux":
 LOGGER = logging.getLogger(__name__)
 click_log.basic_config(LOGGER)
 CASE_FILE_PATH = "/etc/config/cases.yaml"
+# ConfigMaps are limited to 1 MiB, traces beyond this size are cut down to their longest spans
+TRACE_SIZE_LIMIT = 512 * 1024
 
 
 def build_result_string(port, target, should_be_blocked, was_blocked):
@@ -51,14 +55,31 @@ def build_result_string(port, target, should_be_blocked, was_blocked):
 
 @click.command()
 @click_log.simple_verbosity_option(LOGGER)
-def cli():
+@click.option(
+    "--metrics-port",
+    default=None,
+    type=int,
+    envvar="RUNNER_METRICS_PORT",
+    help="Serve Prometheus metrics, liveness (/healthz) "
+    "and readiness (/readyz) on this port.",
+)
+def cli(metrics_port):
     """
     Command Line function which runs all tests and stores the results into a ConfigMap.
     """
     run_times = {"overall": "error"}
+    if metrics_port is not None:
+        start_metrics_server(METRICS, metrics_port)
+        LOGGER.info("Serving metrics on port %s", metrics_port)
     if not os.path.exists(CASE_FILE_PATH):
         raise RuntimeError("Could not find cases.yaml in %s!" % CASE_FILE_PATH)
-    results, test_run_times = run_all_tests()
+    METRICS.ready = True
+    trace = os.environ.get("RUNNER_TRACE") == "true"
+    if trace:
+        TRACER.enable()
+    with TRACER.span("runner", node=os.environ.get("RUNNER_NODE")) as runner_span:
+        results, test_run_times = run_all_tests()
+    run_times["overall"] = runner_span.duration
     namespace = None
     name = None
     try:
@@ -68,6 +89,11 @@ def cli():
         LOGGER.error("Could not store output to ConfigMap, as env vars are not set")
     LOGGER.debug("Output EnvVars: RUNNER_NAMESPACE=%s, RUNNER_NAME=%s", namespace, name)
     if namespace is not None and name is not None:
+        if trace:
+            # stored first, so the trace is there once the orchestrator sees the results
+            store_trace_to_cfg_map(
+                TRACER.to_dict()["traceEvents"], namespace, "%s-trace" % name
+            )
         store_results_to_cfg_map(
             results,
             namespace,
@@ -78,7 +104,10 @@ def cli():
     LOGGER.info(results)
     # Sleep some time until container is killed. TODO: continuous mode ???
     # TODO we should watch for ConfigMap changes and restart the test cases
-    time.sleep(60 * 60 * 24)
+    deadline = time.time() + 60 * 60 * 24
+    while time.time() < deadline:
+        METRICS.heartbeat()
+        time.sleep(60)
 
 
 def run_all_tests():
@@ -92,7 +121,7 @@ def run_all_tests():
     ]
     results = {}
     with open(CASE_FILE_PATH, "r") as yaml_file:
-        cases = yaml.safe_load(yaml_file)
+        cases = yaml_load(yaml_file)
         LOGGER.debug("Cases: %s", cases)
         test_runtimes = {}
         all_sender_pods = [
@@ -147,13 +176,18 @@ def run_tests_for_sender_pod(sender_pod, cases):
     """
     from_host_string = sender_pod.to_identifier()
     runtimes = {}
-    network_ns = get_network_ns_of_pod(sender_pod.namespace, sender_pod.name)
+    with TRACER.span("resolve-netns", sender=from_host_string) as netns_span:
+        network_ns = get_network_ns_of_pod(sender_pod.namespace, sender_pod.name)
+    METRICS.observe_netns_resolution(netns_span.duration)
     # TODO check if network ns is None -> HostNetwork is set
     results = {}
     for target, ports in cases[from_host_string].items():
-        start_time = time.time()
-        results[target] = run_tests_for_target(network_ns, ports, target)
-        runtimes[target] = time.time() - start_time
+        with TRACER.span(
+            "probe", sender=from_host_string, target=target, ports=len(ports)
+        ) as probe_span:
+            results[target] = run_tests_for_target(network_ns, ports, target)
+        runtimes[target] = probe_span.duration
+        METRICS.observe_probe(from_host_string, probe_span.duration, results[target])
     return results, runtimes
 
 
@@ -359,17 +393,56 @@ def get_pods_on_node():
 
 def store_results_to_cfg_map(results, namespace, name, runtimes=None):
     """
-    Writes given results into a ConfigMap
+    Writes given results, and optionally runtimes, into a ConfigMap
     """
-    k8s.config.load_incluster_config()
-    api = k8s.client.CoreV1Api()
-
     LOGGER.info("Storing output to ConfigMap")
     cfg_map = create_test_output_config_map_manifest(
-        namespace, name, data=yaml.dump(results)
+        namespace, name, data=yaml_dump(results)
     )
     if runtimes:
-        cfg_map.data["runtimes"] = yaml.dump(runtimes)
+        cfg_map.data["runtimes"] = yaml_dump(runtimes)
+    _apply_cfg_map(cfg_map)
+
+
+def cap_trace_events(events, limit=TRACE_SIZE_LIMIT):
+    """
+    Returns the trace events serialized to JSON, keeping the longest spans that fit into the limit
+    """
+    kept = []
+    size = 2
+    for event in sorted(events, key=lambda event: event.get("dur", 0), reverse=True):
+        event_size = len(json.dumps(event)) + 2
+        if size + event_size > limit:
+            continue
+        kept.append(event)
+        size += event_size
+    if len(kept) < len(events):
+        LOGGER.warning(
+            "Trace exceeds %s bytes, dropped %s of %s spans",
+            limit,
+            len(events) - len(kept),
+            len(events),
+        )
+    return json.dumps(sorted(kept, key=lambda event: event.get("ts", 0)))
+
+
+def store_trace_to_cfg_map(events, namespace, name):
+    """
+    Writes the trace events into their own ConfigMap, failures are logged as the trace is optional
+    """
+    cfg_map = create_test_output_config_map_manifest(namespace, name)
+    cfg_map.data = {"trace": cap_trace_events(events)}
+    try:
+        _apply_cfg_map(cfg_map)
+    except k8s.client.rest.ApiException as api_exception:
+        LOGGER.warning("Could not store trace to ConfigMap: %s", api_exception)
+
+
+def _apply_cfg_map(cfg_map):
+    k8s.config.load_incluster_config()
+    api = k8s.client.CoreV1Api()
+    name = cfg_map.metadata.name
+    namespace = cfg_map.metadata.namespace
     try:
         api.read_namespaced_config_map(name, namespace)
         api_response = api.patch_namespaced_config_map(name, namespace, cfg_map)
@@ -0,0 +1,236 @@
+"""
+File containing the instrumentation of the kubernetes API client,
+recording calls, transferred bytes and latencies per verb, resource and run phase
+"""
+import bisect
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import kubernetes as k8s
+
+# upper bounds of the latency histogram buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+NO_PHASE = "none"
+
+
+class Histogram:
+    """
+    Class for a cumulative histogram with fixed bucket bounds
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """
+        Adds an observed value to the histogram
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        """
+        Returns a list of (upper bound, number of observations less or equal to it) pairs
+        """
+        out = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+    def to_dict(self):
+        """
+        Converts the histogram into a dictionary
+        """
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in self.cumulative_counts()
+            },
+        }
+
+
+class ApiCallStats:
+    """
+    Class for the accumulated statistics of one verb and resource
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = Histogram()
+
+    def to_dict(self):
+        """
+        Converts the statistics into a dictionary
+        """
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "bytes-sent": self.bytes_sent,
+            "bytes-received": self.bytes_received,
+            "latency": self.latency.to_dict(),
+        }
+
+
+def resource_from_url(url):
+    """
+    Extracts the resource type of a kubernetes API request url,
+    e.g. pods for /api/v1/namespaces/default/pods/name
+    """
+    parts = [p for p in urlparse(url).path.split("/") if p]
+    if parts[:1] == ["api"]:
+        parts = parts[2:]
+    elif parts[:1] == ["apis"]:
+        parts = parts[3:]
+    if len(parts) > 2 and parts[0] == "namespaces":
+        parts = parts[2:]
+    return parts[0] if parts else "unknown"
+
+
+def _body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    return len(json.dumps(body, default=str))
+
+
+def _response_size(response):
+    # newer clients only read the payload after the request returns, then the announced length is used
+    data = getattr(response, "data", None)
+    if isinstance(data, (bytes, str)):
+        return len(data)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return int(headers.get("Content-Length", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+class ApiCallRecorder:
+    """
+    Class recording all requests of the kubernetes API client while installed
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self.current_phase = NO_PHASE
+        self._lock = threading.Lock()
+        self._original_request = None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Attributes all requests made within the context to the given phase
+        """
+        previous_phase = self.current_phase
+        self.current_phase = name
+        try:
+            yield
+        finally:
+            self.current_phase = previous_phase
+
+    def record(
+        self, method, url, duration, bytes_sent=0, bytes_received=0, error=False
+    ):
+        """
+        Records a single request
+        """
+        key = "%s %s" % (method.upper(), resource_from_url(url))
+        with self._lock:
+            stats = self.stats.setdefault(self.current_phase, {}).setdefault(
+                key, ApiCallStats()
+            )
+            stats.calls += 1
+            stats.errors += 1 if error else 0
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            stats.latency.observe(duration)
+
+    def install(self, client_class=k8s.client.rest.RESTClientObject):
+        """
+        Wraps the request method of the REST client class, so that every request is recorded.
+        Its arguments are bound by name, as their order differs between client versions.
+        """
+        if self._original_request is not None:
+            return
+        original_request = client_class.request
+        signature = inspect.signature(original_request)
+        recorder = self
+
+        def recorded_request(client, *args, **kwargs):
+            arguments = signature.bind(client, *args, **kwargs).arguments
+            start_time = time.time()
+            response = None
+            try:
+                response = original_request(client, *args, **kwargs)
+                return response
+            finally:
+                recorder.record(
+                    arguments["method"],
+                    arguments["url"],
+                    time.time() - start_time,
+                    bytes_sent=_body_size(arguments.get("body")),
+                    bytes_received=_response_size(response),
+                    error=response is None
+                    or (getattr(response, "status", None) or 0) >= 400,
+                )
+
+        self._original_request = (client_class, original_request)
+        client_class.request = recorded_request
+
+    def uninstall(self):
+        """
+        Restores the original request method of the REST client class
+        """
+        if self._original_request is None:
+            return
+        client_class, original_request = self._original_request
+        client_class.request = original_request
+        self._original_request = None
+
+    def to_dict(self):
+        """
+        Converts all recorded statistics into a dictionary of phases
+        """
+        with self._lock:
+            return {
+                phase: {key: stats.to_dict() for key, stats in calls.items()}
+                for phase, calls in self.stats.items()
+            }
+
+    def summary_rows(self):
+        """
+        Returns one (phase, call, calls, bytes received, total seconds) row per recorded call type
+        """
+        rows = []
+        with self._lock:
+            for phase, calls in self.stats.items():
+                for key, stats in sorted(calls.items()):
+                    rows.append(
+                        (
+                            phase,
+                            key,
+                            stats.calls,
+                            stats.bytes_received,
+                            stats.latency.sum,
+                        )
+                    )
+        return rows
+
+
+API_CALLS = ApiCallRecorder()
@@ -2,6 +2,9 @@
 File with several useful functions for interacting with k8s
 """
 
+import functools
+import os
+
 import kubernetes as k8s
 from illuminatio.host import Host
 from illuminatio.util import (
@@ -10,8 +13,12 @@ from illuminatio.util import (
     CLEANUP_ON_REQUEST,
     CLEANUP_ALWAYS,
     ROLE_LABEL,
+    yaml_load_all,
 )
 
+# label the API server puts on every namespace, commonly used to select a namespace by name
+NAMESPACE_NAME_LABEL = "kubernetes.io/metadata.name"
+
 
 def create_service_account_manifest_for_runners(name, namespace):
     """
@@ -88,11 +95,55 @@ def create_pod_manifest(host: Host, additional_labels, generate_name, container)
     return pod
 
 
+def create_spread_affinity(match_labels, namespaces):
+    """
+    Creates an affinity which prefers spreading pods with the given labels across nodes
+    """
+    spread_term = k8s.client.V1PodAffinityTerm(
+        label_selector=k8s.client.V1LabelSelector(match_labels=match_labels),
+        namespaces=namespaces,
+        topology_key="kubernetes.io/hostname",
+    )
+    return k8s.client.V1Affinity(
+        pod_anti_affinity=k8s.client.V1PodAntiAffinity(
+            preferred_during_scheduling_ignored_during_execution=[
+                k8s.client.V1WeightedPodAffinityTerm(
+                    weight=100, pod_affinity_term=spread_term
+                )
+            ]
+        )
+    )
+
+
+def create_node_name_affinity(node_names):
+    """
+    Creates an affinity which requires pods to be scheduled on one of the given nodes
+    """
+    if not node_names:
+        # the API server rejects an In requirement without values
+        raise ValueError("A node name affinity needs at least one node")
+    node_selector_term = k8s.client.V1NodeSelectorTerm(
+        match_fields=[
+            k8s.client.V1NodeSelectorRequirement(
+                key="metadata.name", operator="In", values=list(node_names)
+            )
+        ]
+    )
+    return k8s.client.V1Affinity(
+        node_affinity=k8s.client.V1NodeAffinity(
+            required_during_scheduling_ignored_during_execution=k8s.client.V1NodeSelector(
+                node_selector_terms=[node_selector_term]
+            )
+        )
+    )
+
+
 def create_service_manifest(
-    host: Host, additional_selector_labels, svc_labels, port_nums
+    host: Host, additional_selector_labels, svc_labels, port_nums, target_port_nums=None
 ):
     """
-    Creates and returns a service manifest with given parameters
+    Creates and returns a service manifest with given parameters,
+    all ports target port 80 unless target_port_nums are given for each port
     """
     svc_meta = k8s.client.V1ObjectMeta(
         generate_name="illuminatio-test-target", namespace=host.namespace
@@ -104,10 +155,17 @@ def create_service_manifest(
         svc.spec.selector[key] = value
     svc.metadata.labels = svc_labels
     validate_cleanup_in(svc.metadata.labels)
-    # TODO: support for other protocols missing, target port might not work like that for multiple ports
+    if target_port_nums is None:
+        target_port_nums = [80] * len(port_nums)
+    # TODO: support for other protocols missing
     ports = [
-        k8s.client.V1ServicePort(protocol="TCP", port=portNum, target_port=80)
-        for portNum in port_nums
+        k8s.client.V1ServicePort(
+            name="port-%s" % portNum,
+            protocol="TCP",
+            port=portNum,
+            target_port=target_port,
+        )
+        for portNum, target_port in zip(port_nums, target_port_nums)
     ]
     svc.spec.ports = ports
     return svc
@@ -122,3 +180,83 @@ def labels_to_string(labels):
         if labels
         else "*"
     )
+
+
+@functools.lru_cache(maxsize=None)
+def _api_client():
+    return k8s.client.ApiClient()
+
+
+def deserialize_model(data, model_name):
+    """
+    Converts a dictionary in the kubernetes API format, e.g. loaded from a manifest,
+    into the client's model class of the given name, e.g. V1Pod
+    """
+    # the public deserialize expects an HTTP response and its signature differs between client versions
+    return _api_client()._ApiClient__deserialize(  # pylint: disable=protected-access
+        data, model_name
+    )
+
+
+def serialize_model(model):
+    """
+    Converts a model of the kubernetes client into a dictionary in the kubernetes API format
+    """
+    return _api_client().sanitize_for_serialization(model)
+
+
+MANIFEST_EXTENSIONS = (".yml", ".yaml", ".json")
+
+
+def read_manifests(paths):
+    """
+    Yields all objects of the manifest files in the given files and directories,
+    directories are searched recursively and List objects are unpacked
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            file_names = sorted(
+                os.path.join(directory, file_name)
+                for directory, _, file_names in os.walk(path)
+                for file_name in file_names
+                if file_name.endswith(MANIFEST_EXTENSIONS)
+            )
+        else:
+            file_names = [path]
+        for file_name in file_names:
+            with open(file_name) as manifest_file:
+                for document in yaml_load_all(manifest_file):
+                    if not document:
+                        continue
+                    if document.get("kind", "").endswith("List"):
+                        yield from document.get("items") or []
+                    else:
+                        yield document
+
+
+def load_policy_manifests(paths):
+    """
+    Returns the NetworkPolicies and Namespaces defined in manifest files and directories.
+    Namespaces of the policies that are not defined are added, and every namespace gets the
+    kubernetes.io/metadata.name label the API server sets on creation.
+    """
+    network_policies = []
+    namespaces = {}
+    for manifest in read_manifests(paths):
+        kind = manifest.get("kind")
+        if kind == "NetworkPolicy":
+            manifest.setdefault("metadata", {}).setdefault("namespace", "default")
+            network_policies.append(deserialize_model(manifest, "V1NetworkPolicy"))
+        elif kind == "Namespace":
+            namespace = deserialize_model(manifest, "V1Namespace")
+            namespaces[namespace.metadata.name] = namespace
+    for network_policy in network_policies:
+        name = network_policy.metadata.namespace
+        if name not in namespaces:
+            namespaces[name] = k8s.client.V1Namespace(
+                metadata=k8s.client.V1ObjectMeta(name=name)
+            )
+    for name, namespace in namespaces.items():
+        namespace.metadata.labels = dict(namespace.metadata.labels or {})
+        namespace.metadata.labels.setdefault(NAMESPACE_NAME_LABEL, name)
+    return network_policies, list(namespaces.values())
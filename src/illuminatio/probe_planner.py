@@ -0,0 +1,210 @@
+"""
+File containing a planner choosing a near-minimal set of probes
+that exercises every policy rule and every isolation a policy introduces
+"""
+import heapq
+from typing import List
+
+import kubernetes as k8s
+
+from illuminatio.equivalence import PodEquivalence
+from illuminatio.simulator import (
+    DEFAULT_PROTOCOL,
+    EGRESS,
+    INGRESS,
+    PolicySimulator,
+    pod_identifier,
+    port_matches,
+)
+
+
+class ProbePlan:
+    """
+    Class for the probes chosen by the ProbePlanner and the requirements they cover
+    """
+
+    def __init__(self, probes, requirements, covered, naive_case_count=None):
+        # probes are (sender identifier, receiver identifier, port, expected to connect)
+        self.probes = probes
+        self.requirements = requirements
+        self.covered = covered
+        self.naive_case_count = naive_case_count
+
+    def uncovered(self):
+        """
+        Returns the descriptions of all requirements no probe can cover
+        """
+        return [
+            description
+            for index, description in enumerate(self.requirements)
+            if index not in self.covered
+        ]
+
+    def to_dict(self):
+        """
+        Returns the probes in the merged case format, expected failures are prefixed with '-'
+        """
+        out = {}
+        for sender, receiver, port, should_connect in self.probes:
+            out.setdefault(sender, {}).setdefault(receiver, []).append(
+                "%s%s" % ("" if should_connect else "-", port)
+            )
+        return out
+
+    def report(self):
+        """
+        Returns the coverage of the plan and its reduction compared with the naive case list
+        """
+        report = {
+            "requirements": len(self.requirements),
+            "covered": len(self.covered),
+            "coverage": len(self.covered) / len(self.requirements)
+            if self.requirements
+            else 1.0,
+            "uncovered": self.uncovered(),
+            "probes": len(self.probes),
+        }
+        if self.naive_case_count is not None:
+            report["naive-cases"] = self.naive_case_count
+            report["reduction"] = (
+                self.naive_case_count / len(self.probes) if self.probes else None
+            )
+        return report
+
+
+class ProbePlanner:
+    """
+    Class planning probes over the pods of a cluster with a greedy set cover.
+    Every rule port of every policy should be seen admitting a connection
+    and every policy should be seen denying one to or from the pods it isolates.
+    Pods are taken from their equivalence classes, as members of a class cover the same requirements,
+    up to two per class so that probes within a class are possible.
+    """
+
+    def __init__(
+        self,
+        pods: List[k8s.client.V1Pod],
+        namespaces: List[k8s.client.V1Namespace],
+        network_policies: List[k8s.client.V1NetworkPolicy],
+        protocol=DEFAULT_PROTOCOL,
+    ):
+        self.simulator = PolicySimulator(pods, namespaces, network_policies)
+        self.protocol = protocol
+        index_of = {
+            pod_identifier(pod): index for index, pod in enumerate(self.simulator.pods)
+        }
+        # a second member lets rules whose peers are the pod's own class be covered
+        self.candidates = [
+            index_of[pod_identifier(pod)]
+            for pod_class in PodEquivalence(pods, namespaces, network_policies).classes
+            for pod in pod_class.pods[:2]
+        ]
+        self.requirements = []
+        # per rule the requirements of its ports, per pod and direction the isolation requirements
+        self._rule_requirements = {}
+        self._isolation_requirements = {INGRESS: {}, EGRESS: {}}
+        for policy, selected, rules_per_direction in self.simulator.resolved_policies:
+            name = "%s/%s" % (policy.metadata.namespace, policy.metadata.name)
+            for direction, rules in rules_per_direction.items():
+                requirement = self._add_requirement(
+                    "%s %s isolation" % (name, direction)
+                )
+                for index in selected:
+                    self._isolation_requirements[direction].setdefault(
+                        index, []
+                    ).append(requirement)
+                for rule_index, rule in enumerate(rules):
+                    for rule_port in rule.ports or [None]:
+                        description = "%s %s rule %d" % (name, direction, rule_index)
+                        if rule_port is not None:
+                            description += " port %s/%s" % (
+                                rule_port.protocol or DEFAULT_PROTOCOL,
+                                rule_port.port if rule_port.port is not None else "*",
+                            )
+                        self._rule_requirements.setdefault(id(rule), []).append(
+                            (self._add_requirement(description), rule_port)
+                        )
+
+    def _add_requirement(self, description):
+        self.requirements.append(description)
+        return len(self.requirements) - 1
+
+    def _rules_covered(self, direction, sender, receiver, port):
+        pod_index, peer_index = (
+            (receiver, sender) if direction == INGRESS else (sender, receiver)
+        )
+        destination_ports = self.simulator.container_ports[receiver]
+        covered = []
+        for rule in self.simulator.rules[direction][pod_index] or []:
+            if rule.peers is not None and peer_index not in rule.peers:
+                continue
+            for requirement, rule_port in self._rule_requirements[id(rule)]:
+                if rule_port is None or port_matches(
+                    rule_port, port, self.protocol, destination_ports
+                ):
+                    covered.append(requirement)
+        return covered
+
+    def coverage(self, sender, receiver, port):
+        """
+        Returns whether the probe is expected to connect and the requirements it covers
+        """
+        egress_allows = self.simulator.direction_allows(
+            EGRESS, sender, receiver, port, self.protocol
+        )
+        ingress_allows = self.simulator.direction_allows(
+            INGRESS, sender, receiver, port, self.protocol
+        )
+        if egress_allows and ingress_allows:
+            return True, set(
+                self._rules_covered(EGRESS, sender, receiver, port)
+                + self._rules_covered(INGRESS, sender, receiver, port)
+            )
+        if not egress_allows:
+            return False, set(self._isolation_requirements[EGRESS].get(sender, []))
+        # a denied ingress is only observable if the sender may send
+        return False, set(self._isolation_requirements[INGRESS].get(receiver, []))
+
+    def plan(self, naive_case_count=None):
+        """
+        Greedily picks the probe covering most uncovered requirements until no probe adds coverage
+        """
+        probes = []
+        coverages = []
+        ports = self.simulator.ports()
+        for sender in self.candidates:
+            for receiver in self.candidates:
+                if sender == receiver:
+                    continue
+                for port in ports:
+                    should_connect, covered = self.coverage(sender, receiver, port)
+                    if covered:
+                        probes.append((sender, receiver, port, should_connect))
+                        coverages.append(covered)
+        # lazy greedy: a probe's gain only shrinks, so a popped gain that is still current is the maximum
+        heap = [(-len(covered), index) for index, covered in enumerate(coverages)]
+        heapq.heapify(heap)
+        covered = set()
+        chosen = []
+        while heap:
+            negative_gain, index = heapq.heappop(heap)
+            gain = len(coverages[index] - covered)
+            if gain == 0:
+                continue
+            if gain < -negative_gain:
+                heapq.heappush(heap, (-gain, index))
+                continue
+            chosen.append(index)
+            covered |= coverages[index]
+        identifiers = [pod_identifier(pod) for pod in self.simulator.pods]
+        return ProbePlan(
+            [
+                (identifiers[sender], identifiers[receiver], port, should_connect)
+                for sender, receiver, port, should_connect in (
+                    probes[index] for index in chosen
+                )
+            ],
+            self.requirements,
+            covered,
+            naive_case_count,
+        )
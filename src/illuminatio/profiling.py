@@ -0,0 +1,100 @@
+"""
+File containing the profiling of illuminatio CLI commands with cProfile and tracemalloc
+"""
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import tracemalloc
+
+import click
+
+PROFILER_META_KEY = "illuminatio.profiler"
+
+
+class CommandProfiler:
+    """
+    Class profiling each CLI command separately,
+    writing pstats files and top-N hotspot summaries into an output directory
+    """
+
+    def __init__(self, directory, top=25, memory=False, logger=None):
+        if logger is None:
+            logger = logging.getLogger()
+        self.directory = directory
+        self.top = top
+        self.memory = memory
+        self.logger = logger
+        self.profiled_commands = 0
+
+    def _path(self, name, suffix):
+        return os.path.join(self.directory, "%s%s" % (name, suffix))
+
+    def profile(self, command_name, func, *args, **kwargs):
+        """
+        Calls the function with cProfile (and tracemalloc if enabled) running
+        and writes the results named after the command
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.profiled_commands += 1
+        name = "%02d-%s" % (self.profiled_commands, command_name)
+        if self.memory:
+            tracemalloc.start()
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            snapshot = None
+            if self.memory:
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+            self._write_cpu_profile(name, profiler)
+            if snapshot is not None:
+                self._write_memory_profile(name, snapshot)
+
+    def _write_cpu_profile(self, name, profiler):
+        profiler.dump_stats(self._path(name, ".pstats"))
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        # hotspots by own time first, then the call paths they are reached by
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        with open(self._path(name, ".txt"), "w") as summary_file:
+            summary_file.write(summary.getvalue())
+        self.logger.info("Wrote profile of %s to %s", name, self._path(name, ".pstats"))
+        self.logger.debug(summary.getvalue())
+
+    def _write_memory_profile(self, name, snapshot):
+        snapshot.dump(self._path(name, ".tracemalloc"))
+        top_stats = snapshot.statistics("lineno")[: self.top]
+        with open(self._path(name, ".tracemalloc.txt"), "w") as summary_file:
+            for stat in top_stats:
+                summary_file.write("%s\n" % stat)
+        self.logger.info(
+            "Wrote allocation snapshot of %s to %s",
+            name,
+            self._path(name, ".tracemalloc"),
+        )
+
+
+def profiled(command_name):
+    """
+    Decorator profiling the decorated CLI command if profiling was enabled on the CLI group
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            ctx = click.get_current_context(silent=True)
+            profiler = ctx.meta.get(PROFILER_META_KEY) if ctx is not None else None
+            if profiler is None:
+                return func(*args, **kwargs)
+            return profiler.profile(command_name, func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
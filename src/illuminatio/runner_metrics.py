@@ -0,0 +1,176 @@
+"""
+File containing the metrics of the illuminatio runner
+and a small HTTP server exposing them in the Prometheus text format together with health endpoints
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from illuminatio.instrumentation import Histogram
+
+PROBE_OUTCOMES = ["success", "failure", "error"]
+# the runner is considered stuck if it showed no sign of life for this long, e.g. in a hanging probe
+DEFAULT_HEARTBEAT_TIMEOUT = 600
+
+
+class RunnerMetrics:
+    """
+    Class collecting probe counts, probe and network namespace resolution latencies
+    and prober time per sender of a runner
+    """
+
+    def __init__(self, heartbeat_timeout=DEFAULT_HEARTBEAT_TIMEOUT):
+        self.probes = {outcome: 0 for outcome in PROBE_OUTCOMES}
+        self.probe_latency = Histogram()
+        self.netns_latency = Histogram()
+        self.prober_seconds = {}
+        self.ready = False
+        self.heartbeat_timeout = heartbeat_timeout
+        self.last_heartbeat = time.time()
+        self._lock = threading.Lock()
+
+    def heartbeat(self):
+        """
+        Records that the runner loop is making progress
+        """
+        self.last_heartbeat = time.time()
+
+    @property
+    def alive(self):
+        """
+        Whether the runner loop showed progress within the heartbeat timeout
+        """
+        return time.time() - self.last_heartbeat <= self.heartbeat_timeout
+
+    def observe_netns_resolution(self, duration):
+        """
+        Records the time needed to resolve a sender's network namespace
+        """
+        self.heartbeat()
+        with self._lock:
+            self.netns_latency.observe(duration)
+
+    def observe_probe(self, sender, duration, results):
+        """
+        Records a probe of one target from a sender with the per-port results it produced
+        """
+        self.heartbeat()
+        with self._lock:
+            self.probe_latency.observe(duration)
+            self.prober_seconds[sender] = self.prober_seconds.get(sender, 0) + duration
+            for result in results.values():
+                if "error" in result:
+                    self.probes["error"] += 1
+                elif result.get("success"):
+                    self.probes["success"] += 1
+                else:
+                    self.probes["failure"] += 1
+
+    def render(self):
+        """
+        Renders all metrics in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            lines.append(
+                "# HELP illuminatio_runner_probes_total Probed ports by outcome."
+            )
+            lines.append("# TYPE illuminatio_runner_probes_total counter")
+            for outcome, count in self.probes.items():
+                lines.append(
+                    'illuminatio_runner_probes_total{outcome="%s"} %s'
+                    % (outcome, count)
+                )
+            lines.extend(
+                _render_histogram(
+                    "illuminatio_runner_probe_duration_seconds",
+                    "Duration of probing one target.",
+                    self.probe_latency,
+                )
+            )
+            lines.extend(
+                _render_histogram(
+                    "illuminatio_runner_netns_resolution_duration_seconds",
+                    "Duration of resolving a sender's network namespace.",
+                    self.netns_latency,
+                )
+            )
+            lines.append(
+                "# HELP illuminatio_runner_prober_seconds_total "
+                "Time spent probing per sender."
+            )
+            lines.append("# TYPE illuminatio_runner_prober_seconds_total counter")
+            for sender, seconds in sorted(self.prober_seconds.items()):
+                lines.append(
+                    'illuminatio_runner_prober_seconds_total{sender="%s"} %s'
+                    % (_escape_label_value(sender), seconds)
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(name, help_text, histogram):
+    lines = ["# HELP %s %s" % (name, help_text), "# TYPE %s histogram" % name]
+    for bound, count in histogram.cumulative_counts():
+        bound_string = "+Inf" if bound == float("inf") else str(bound)
+        lines.append('%s_bucket{le="%s"} %s' % (name, bound_string, count))
+    lines.append("%s_sum %s" % (name, histogram.sum))
+    lines.append("%s_count %s" % (name, histogram.count))
+    return lines
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _create_handler(metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """
+        Handler serving /metrics, /healthz (liveness, failing once the runner loop stops beating)
+        and /readyz (readiness)
+        """
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            """
+            Answers GET requests for the known endpoints
+            """
+            if self.path == "/metrics":
+                self._respond(200, metrics.render(), "text/plain; version=0.0.4")
+            elif self.path == "/healthz":
+                if metrics.alive:
+                    self._respond(200, "ok\n")
+                else:
+                    self._respond(503, "no heartbeat\n")
+            elif self.path == "/readyz":
+                if metrics.ready:
+                    self._respond(200, "ready\n")
+                else:
+                    self._respond(503, "not ready\n")
+            else:
+                self._respond(404, "not found\n")
+
+        def _respond(self, status, body, content_type="text/plain"):
+            encoded = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            # scrapes and probes would otherwise flood the runner's log
+            pass
+
+    return MetricsHandler
+
+
+def start_metrics_server(metrics, port, host="0.0.0.0"):
+    """
+    Serves the metrics and health endpoints from a daemon thread and returns the server
+    """
+    server = ThreadingHTTPServer((host, port), _create_handler(metrics))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+METRICS = RunnerMetrics()
@@ -0,0 +1,650 @@
+"""
+File containing an in-memory simulator of kubernetes NetworkPolicies,
+computing the expected reachability between pods without deploying or probing anything
+"""
+import ipaddress
+from typing import List
+
+import kubernetes as k8s
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional and only needed by the BitsetSimulator
+    np = None
+
+INGRESS = "Ingress"
+EGRESS = "Egress"
+DEFAULT_PROTOCOL = "TCP"
+# stands for every port no policy and no container mentions
+OTHER_PORTS = "*"
+
+
+def labels_match_selector(labels, selector: k8s.client.V1LabelSelector):
+    """
+    Checks whether labels are selected by a label selector, an empty selector selects everything
+    """
+    labels = labels or {}
+    if selector is None:
+        return True
+    for key, value in (selector.match_labels or {}).items():
+        if labels.get(key) != value:
+            return False
+    for expression in selector.match_expressions or []:
+        present = expression.key in labels
+        values = expression.values or []
+        if expression.operator == "In" and labels.get(expression.key) not in values:
+            return False
+        if (
+            expression.operator == "NotIn"
+            and present
+            and labels[expression.key] in values
+        ):
+            return False
+        if expression.operator == "Exists" and not present:
+            return False
+        if expression.operator == "DoesNotExist" and present:
+            return False
+    return True
+
+
+def pod_identifier(pod):
+    """
+    Returns the namespace:name identifier of a pod, as used by the runners
+    """
+    return "%s:%s" % (pod.metadata.namespace, pod.metadata.name)
+
+
+def policy_types(policy: k8s.client.V1NetworkPolicy):
+    """
+    Returns the directions a NetworkPolicy isolates its pods in, defaulted like the API server does
+    """
+    if policy.spec.policy_types:
+        return set(policy.spec.policy_types)
+    if policy.spec.egress is not None:
+        return {INGRESS, EGRESS}
+    return {INGRESS}
+
+
+class _Rule:
+    """
+    An ingress or egress rule of a policy, with its peers resolved to pod indices
+    """
+
+    def __init__(self, peers, ports):
+        # None means all pods, None and an empty list mean all ports
+        self.peers = peers
+        self.ports = ports
+
+    def allows(self, peer_index, port, protocol, destination_ports):
+        """
+        Checks whether the rule allows the peer on the destination port
+        """
+        if self.peers is not None and peer_index not in self.peers:
+            return False
+        if not self.ports:
+            return True
+        return any(
+            port_matches(rule_port, port, protocol, destination_ports)
+            for rule_port in self.ports
+        )
+
+
+def port_matches(rule_port, port, protocol, destination_ports):
+    """
+    Checks whether a port of a policy rule matches the port, named ports are looked up in the destination's ports
+    """
+    if (rule_port.protocol or DEFAULT_PROTOCOL) != protocol:
+        return False
+    if rule_port.port is None:
+        return True
+    if port == OTHER_PORTS:
+        return False
+    if isinstance(rule_port.port, str) and not rule_port.port.isdigit():
+        return destination_ports.get(rule_port.port) == port
+    start = int(rule_port.port)
+    end = getattr(rule_port, "end_port", None) or start
+    return start <= port <= end
+
+
+def _containers(pod):
+    return (pod.spec.containers or []) if pod.spec is not None else []
+
+
+def _named_ports(pod):
+    return {
+        container_port.name: container_port.container_port
+        for container in _containers(pod)
+        for container_port in container.ports or []
+        if container_port.name
+    }
+
+
+class PolicySimulator:
+    """
+    Class computing which connections between pods the NetworkPolicies of a cluster allow,
+    following the kubernetes semantics:
+    a pod selected by no policy of a direction is not isolated in it, otherwise the union of the rules applies,
+    and a connection needs to be allowed by the sender's egress and the receiver's ingress.
+    """
+
+    def __init__(
+        self,
+        pods: List[k8s.client.V1Pod],
+        namespaces: List[k8s.client.V1Namespace],
+        network_policies: List[k8s.client.V1NetworkPolicy],
+    ):
+        self.pods = list(pods)
+        self.namespace_labels = {
+            namespace.metadata.name: namespace.metadata.labels or {}
+            for namespace in namespaces
+        }
+        self.container_ports = [_named_ports(pod) for pod in self.pods]
+        self.pod_ips = [
+            ipaddress.ip_address(pod.status.pod_ip)
+            if pod.status is not None and pod.status.pod_ip
+            else None
+            for pod in self.pods
+        ]
+        # per pod and direction, None if the pod is not isolated, otherwise the rules allowing traffic
+        self.rules = {INGRESS: [None] * len(self.pods), EGRESS: [None] * len(self.pods)}
+        # per policy the selected pods and the resolved rules per direction it isolates
+        self.resolved_policies = []
+        self.policy_ports = set()
+        for policy in network_policies:
+            self._add_policy(policy)
+
+    def _pods_matching(self, namespaces, pod_selector):
+        return {
+            index
+            for index, pod in enumerate(self.pods)
+            if pod.metadata.namespace in namespaces
+            and labels_match_selector(pod.metadata.labels, pod_selector)
+        }
+
+    def _namespaces_matching(self, namespace_selector):
+        return {
+            name
+            for name, labels in self.namespace_labels.items()
+            if labels_match_selector(labels, namespace_selector)
+        }
+
+    def _resolve_peers(self, policy_namespace, peers):
+        if not peers:
+            return None
+        resolved = set()
+        for peer in peers:
+            if peer.ip_block is not None:
+                resolved |= self._pods_in_ip_block(peer.ip_block)
+            elif peer.namespace_selector is not None:
+                resolved |= self._pods_matching(
+                    self._namespaces_matching(peer.namespace_selector),
+                    peer.pod_selector,
+                )
+            else:
+                resolved |= self._pods_matching({policy_namespace}, peer.pod_selector)
+        return resolved
+
+    def _pods_in_ip_block(self, ip_block):
+        network = ipaddress.ip_network(ip_block.cidr, strict=False)
+        excepted = [
+            ipaddress.ip_network(e, strict=False) for e in ip_block._except or []
+        ]
+        return {
+            index
+            for index, ip in enumerate(self.pod_ips)
+            if ip is not None
+            and ip.version == network.version
+            and ip in network
+            and not any(ip.version == e.version and ip in e for e in excepted)
+        }
+
+    def _add_policy(self, policy):
+        namespace = policy.metadata.namespace
+        selected = self._pods_matching({namespace}, policy.spec.pod_selector)
+        types = policy_types(policy)
+        directions = [
+            (INGRESS, policy.spec.ingress, lambda rule: rule._from),
+            (EGRESS, policy.spec.egress, lambda rule: rule.to),
+        ]
+        rules_per_direction = {}
+        self.resolved_policies.append((policy, selected, rules_per_direction))
+        for direction, rules, peers_of in directions:
+            if direction not in types:
+                continue
+            resolved_rules = rules_per_direction[direction] = []
+            for rule in rules or []:
+                resolved_rules.append(
+                    _Rule(self._resolve_peers(namespace, peers_of(rule)), rule.ports)
+                )
+                for rule_port in rule.ports or []:
+                    if rule_port.port is not None and str(rule_port.port).isdigit():
+                        self.policy_ports.add(int(rule_port.port))
+            for index in selected:
+                if self.rules[direction][index] is None:
+                    self.rules[direction][index] = []
+                self.rules[direction][index].extend(resolved_rules)
+
+    def direction_allows(
+        self, direction, sender, receiver, port, protocol=DEFAULT_PROTOCOL
+    ):
+        """
+        Checks whether the sender's egress or the receiver's ingress rules allow a connection
+        """
+        pod_index, peer_index = (
+            (receiver, sender) if direction == INGRESS else (sender, receiver)
+        )
+        rules = self.rules[direction][pod_index]
+        if rules is None:
+            return True
+        destination_ports = self.container_ports[receiver]
+        return any(
+            rule.allows(peer_index, port, protocol, destination_ports) for rule in rules
+        )
+
+    def is_allowed(self, sender, receiver, port, protocol=DEFAULT_PROTOCOL):
+        """
+        Checks whether the policies allow a connection between the pods with the given indices,
+        port may be OTHER_PORTS for any port not mentioned by a policy
+        """
+        return self.direction_allows(
+            EGRESS, sender, receiver, port, protocol
+        ) and self.direction_allows(INGRESS, sender, receiver, port, protocol)
+
+    def ports(self):
+        """
+        Returns the ports worth distinguishing: those mentioned by policies or containers and OTHER_PORTS
+        """
+        ports = set(self.policy_ports)
+        for pod in self.pods:
+            for container in _containers(pod):
+                ports.update(p.container_port for p in container.ports or [])
+        return sorted(ports) + [OTHER_PORTS]
+
+    def reachability_matrix(self, ports=None, protocol=DEFAULT_PROTOCOL):
+        """
+        Returns for every sender, receiver and port whether the connection is allowed,
+        keyed by the pods' namespace:name identifiers and the port as string
+        """
+        if ports is None:
+            ports = self.ports()
+        identifiers = [pod_identifier(pod) for pod in self.pods]
+        matrix = {}
+        for sender, sender_identifier in enumerate(identifiers):
+            row = matrix[sender_identifier] = {}
+            for receiver, receiver_identifier in enumerate(identifiers):
+                if sender == receiver:
+                    continue
+                row[receiver_identifier] = {
+                    str(port): self.is_allowed(sender, receiver, port, protocol)
+                    for port in ports
+                }
+        return matrix
+
+
+class Reachability:
+    """
+    Class for the result of a BitsetSimulator.
+    Per port, every sender points to a row of receiver bits packed 8 pods per byte,
+    senders treated alike by all policies share a row.
+    """
+
+    def __init__(self, pod_count, ports, rows, row_of_sender):
+        self.pod_count = pod_count
+        self.ports = ports
+        self.rows = rows
+        self.row_of_sender = row_of_sender
+
+    def receivers(self, sender, port):
+        """
+        Returns a boolean array over all pods telling which ones the sender may connect to on the port
+        """
+        row = self.rows[port][self.row_of_sender[port][sender]]
+        return np.unpackbits(row, count=self.pod_count).astype(bool)
+
+    def is_allowed(self, sender, receiver, port):
+        """
+        Checks whether the sender may connect to the receiver on the port
+        """
+        row = self.rows[port][self.row_of_sender[port][sender]]
+        return bool(row[receiver // 8] >> (7 - receiver % 8) & 1)
+
+    def chunks(self, port, chunk_size=1024):
+        """
+        Yields (first sender, boolean senders x receivers array) chunks of the matrix of a port
+        """
+        for start in range(0, self.pod_count, chunk_size):
+            packed = self.rows[port][
+                self.row_of_sender[port][start : start + chunk_size]
+            ]
+            yield start, np.unpackbits(packed, axis=1, count=self.pod_count).astype(
+                bool
+            )
+
+    def allowed_pairs(self, port):
+        """
+        Returns the number of allowed connections between different pods on the port
+        """
+        rows = self.rows[port]
+        row_of_sender = self.row_of_sender[port]
+        bits_per_row = np.unpackbits(rows, axis=1, count=self.pod_count).sum(axis=1)
+        total = int(bits_per_row[row_of_sender].sum())
+        senders = np.arange(self.pod_count)
+        to_self = (rows[row_of_sender, senders // 8] >> (7 - senders % 8)) & 1
+        return total - int(to_self.sum())
+
+
+class BitsetSimulator:
+    """
+    Class computing the same reachability as the PolicySimulator with NumPy, for large clusters.
+    Selectors are evaluated as boolean masks over a pod x label encoding
+    and the receivers a sender may reach are computed as packed bitsets.
+    Senders selected by the same rules share one bitset, so memory and time grow
+    with the number of distinct label sets rather than with the number of pod pairs.
+    """
+
+    def __init__(
+        self,
+        pods: List[k8s.client.V1Pod],
+        namespaces: List[k8s.client.V1Namespace],
+        network_policies: List[k8s.client.V1NetworkPolicy],
+    ):
+        if np is None:
+            raise ImportError(
+                "The BitsetSimulator requires numpy, install illuminatio[simulation]"
+            )
+        self.pods = list(pods)
+        self.pod_count = len(self.pods)
+        self.namespace_labels = {
+            namespace.metadata.name: namespace.metadata.labels or {}
+            for namespace in namespaces
+        }
+        # pods may live in namespaces that were not passed, those have no labels
+        self.namespace_names = list(
+            dict.fromkeys(
+                list(self.namespace_labels)
+                + [pod.metadata.namespace for pod in self.pods]
+            )
+        )
+        self._namespace_index = {
+            name: index for index, name in enumerate(self.namespace_names)
+        }
+        self.pod_namespaces = np.array(
+            [self._namespace_index[pod.metadata.namespace] for pod in self.pods],
+            dtype=np.int32,
+        )
+        self._label_rows = {}
+        self._key_rows = {}
+        for index, pod in enumerate(self.pods):
+            for key, value in (pod.metadata.labels or {}).items():
+                self._label_rows.setdefault((key, value), []).append(index)
+                self._key_rows.setdefault(key, []).append(index)
+        self._container_ports = [_named_ports(pod) for pod in self.pods]
+        self._named_port_values = {}
+        self._pod_ips = [
+            ipaddress.ip_address(pod.status.pod_ip)
+            if pod.status is not None and pod.status.pod_ip
+            else None
+            for pod in self.pods
+        ]
+        self._ipv4 = np.array(
+            [
+                int(ip) if ip is not None and ip.version == 4 else -1
+                for ip in self._pod_ips
+            ],
+            dtype=np.int64,
+        )
+        # per direction the rules as (selected pods, admitted peers or None for all, ports)
+        self.rules = {INGRESS: [], EGRESS: []}
+        self.isolated = {
+            INGRESS: np.zeros(self.pod_count, dtype=bool),
+            EGRESS: np.zeros(self.pod_count, dtype=bool),
+        }
+        self.policy_ports = set()
+        for policy in network_policies:
+            self._add_policy(policy)
+
+    def _rows_mask(self, rows):
+        mask = np.zeros(self.pod_count, dtype=bool)
+        if rows:
+            mask[rows] = True
+        return mask
+
+    def _pod_selector_mask(self, selector):
+        mask = np.ones(self.pod_count, dtype=bool)
+        if selector is None:
+            return mask
+        for key, value in (selector.match_labels or {}).items():
+            mask &= self._rows_mask(self._label_rows.get((key, value)))
+        for expression in selector.match_expressions or []:
+            if expression.operator in ("In", "NotIn"):
+                matching = np.zeros(self.pod_count, dtype=bool)
+                for value in expression.values or []:
+                    matching |= self._rows_mask(
+                        self._label_rows.get((expression.key, value))
+                    )
+                mask &= matching if expression.operator == "In" else ~matching
+            elif expression.operator == "Exists":
+                mask &= self._rows_mask(self._key_rows.get(expression.key))
+            elif expression.operator == "DoesNotExist":
+                mask &= ~self._rows_mask(self._key_rows.get(expression.key))
+        return mask
+
+    def _namespace_mask(self, namespace_selector):
+        matching = np.array(
+            [
+                name in self.namespace_labels
+                and labels_match_selector(
+                    self.namespace_labels[name], namespace_selector
+                )
+                for name in self.namespace_names
+            ],
+            dtype=bool,
+        )
+        return matching[self.pod_namespaces]
+
+    def _in_namespace_mask(self, namespace):
+        index = self._namespace_index.get(namespace)
+        if index is None:
+            return np.zeros(self.pod_count, dtype=bool)
+        return self.pod_namespaces == index
+
+    def _ip_block_mask(self, ip_block):
+        network = ipaddress.ip_network(ip_block.cidr, strict=False)
+        excepted = [
+            ipaddress.ip_network(e, strict=False) for e in ip_block._except or []
+        ]
+        if network.version == 4:
+            mask = (self._ipv4 >= 0) & (
+                self._ipv4 & int(network.netmask) == int(network.network_address)
+            )
+            for excepted_network in excepted:
+                if excepted_network.version == 4:
+                    mask &= ~(
+                        self._ipv4 & int(excepted_network.netmask)
+                        == int(excepted_network.network_address)
+                    )
+            return mask
+        # IPv6 pods are rare, they are checked one by one
+        return np.array(
+            [
+                ip is not None
+                and ip.version == network.version
+                and ip in network
+                and not any(ip.version == e.version and ip in e for e in excepted)
+                for ip in self._pod_ips
+            ],
+            dtype=bool,
+        )
+
+    def _peers_mask(self, policy_namespace, peers):
+        if not peers:
+            return None
+        mask = np.zeros(self.pod_count, dtype=bool)
+        for peer in peers:
+            if peer.ip_block is not None:
+                mask |= self._ip_block_mask(peer.ip_block)
+            elif peer.namespace_selector is not None:
+                mask |= self._namespace_mask(
+                    peer.namespace_selector
+                ) & self._pod_selector_mask(peer.pod_selector)
+            else:
+                mask |= self._in_namespace_mask(
+                    policy_namespace
+                ) & self._pod_selector_mask(peer.pod_selector)
+        return mask
+
+    def _add_policy(self, policy):
+        namespace = policy.metadata.namespace
+        selected = self._in_namespace_mask(namespace) & self._pod_selector_mask(
+            policy.spec.pod_selector
+        )
+        types = policy_types(policy)
+        directions = [
+            (INGRESS, policy.spec.ingress, lambda rule: rule._from),
+            (EGRESS, policy.spec.egress, lambda rule: rule.to),
+        ]
+        for direction, rules, peers_of in directions:
+            if direction not in types:
+                continue
+            self.isolated[direction] |= selected
+            for rule in rules or []:
+                self.rules[direction].append(
+                    (selected, self._peers_mask(namespace, peers_of(rule)), rule.ports)
+                )
+                for rule_port in rule.ports or []:
+                    if rule_port.port is not None and str(rule_port.port).isdigit():
+                        self.policy_ports.add(int(rule_port.port))
+
+    def _named_port_mask(self, name, port):
+        if name not in self._named_port_values:
+            self._named_port_values[name] = np.array(
+                [ports.get(name, -1) for ports in self._container_ports],
+                dtype=np.int64,
+            )
+        return self._named_port_values[name] == port
+
+    def _port_mask(self, rule_ports, port, protocol):
+        """
+        Returns True, False or a mask over destination pods telling whether the rule's ports match
+        """
+        if not rule_ports:
+            return True
+        mask = False
+        for rule_port in rule_ports:
+            if (rule_port.protocol or DEFAULT_PROTOCOL) != protocol:
+                continue
+            if rule_port.port is None:
+                return True
+            if port == OTHER_PORTS:
+                continue
+            if isinstance(rule_port.port, str) and not rule_port.port.isdigit():
+                mask = mask | self._named_port_mask(rule_port.port, port)
+                continue
+            start = int(rule_port.port)
+            end = getattr(rule_port, "end_port", None) or start
+            if start <= port <= end:
+                return True
+        return mask
+
+    def ports(self):
+        """
+        Returns the ports worth distinguishing: those mentioned by policies or containers and OTHER_PORTS
+        """
+        ports = set(self.policy_ports)
+        for pod in self.pods:
+            for container in _containers(pod):
+                ports.update(p.container_port for p in container.ports or [])
+        return sorted(ports) + [OTHER_PORTS]
+
+    def _rows_for_port(self, port, protocol):
+        everyone = np.ones(self.pod_count, dtype=bool)
+        # egress: the rules selecting a sender admit their peers, if the destination port matches
+        egress_members, egress_bits = [], []
+        for selected, peers, rule_ports in self.rules[EGRESS]:
+            port_mask = self._port_mask(rule_ports, port, protocol)
+            if port_mask is False:
+                continue
+            egress_members.append(selected)
+            egress_bits.append(
+                np.packbits((everyone if peers is None else peers) & port_mask)
+            )
+        # ingress: the rules admitting a sender let it reach the pods they select
+        ingress_members, ingress_bits = [], []
+        for selected, peers, rule_ports in self.rules[INGRESS]:
+            port_mask = self._port_mask(rule_ports, port, protocol)
+            if port_mask is False:
+                continue
+            ingress_members.append(everyone if peers is None else peers)
+            ingress_bits.append(np.packbits(selected & port_mask))
+        signatures = np.column_stack(
+            [self.isolated[EGRESS]] + egress_members + ingress_members
+        )
+        unique_signatures, row_of_sender = np.unique(
+            np.packbits(signatures, axis=1), axis=0, return_inverse=True
+        )
+        all_bits = np.packbits(everyone)
+        not_isolated_bits = np.packbits(~self.isolated[INGRESS])
+        rows = np.empty((len(unique_signatures), len(all_bits)), dtype=np.uint8)
+        for row, packed_signature in enumerate(unique_signatures):
+            signature = np.unpackbits(
+                packed_signature, count=signatures.shape[1]
+            ).astype(bool)
+            egress_rules = np.flatnonzero(signature[1 : 1 + len(egress_bits)])
+            ingress_rules = np.flatnonzero(signature[1 + len(egress_bits) :])
+            if not signature[0]:
+                allowed = all_bits.copy()
+            elif len(egress_rules):
+                allowed = np.bitwise_or.reduce(
+                    np.array(egress_bits)[egress_rules], axis=0
+                )
+            else:
+                allowed = np.zeros_like(all_bits)
+            admitted = not_isolated_bits
+            if len(ingress_rules):
+                admitted = admitted | np.bitwise_or.reduce(
+                    np.array(ingress_bits)[ingress_rules], axis=0
+                )
+            rows[row] = allowed & admitted
+        return rows, row_of_sender.reshape(-1)
+
+    def reachability(self, ports=None, protocol=DEFAULT_PROTOCOL):
+        """
+        Computes which receivers every sender may connect to for each of the ports
+        """
+        if ports is None:
+            ports = self.ports()
+        rows, row_of_sender = {}, {}
+        for port in ports:
+            rows[port], row_of_sender[port] = self._rows_for_port(port, protocol)
+        return Reachability(self.pod_count, ports, rows, row_of_sender)
+
+    def reachability_matrix(self, ports=None, protocol=DEFAULT_PROTOCOL):
+        """
+        Returns the same matrix as PolicySimulator.reachability_matrix
+        """
+        reachability = self.reachability(ports, protocol)
+        identifiers = [pod_identifier(pod) for pod in self.pods]
+        receivers = {
+            port: [reachability.receivers(s, port) for s in range(self.pod_count)]
+            for port in reachability.ports
+        }
+        return {
+            sender_identifier: {
+                receiver_identifier: {
+                    str(port): bool(receivers[port][sender][receiver])
+                    for port in reachability.ports
+                }
+                for receiver, receiver_identifier in enumerate(identifiers)
+                if receiver != sender
+            }
+            for sender, sender_identifier in enumerate(identifiers)
+        }
+
+
+def create_simulator(pods, namespaces, network_policies):
+    """
+    Returns a BitsetSimulator if numpy is installed, otherwise a PolicySimulator
+    """
+    if np is not None:
+        return BitsetSimulator(pods, namespaces, network_policies)
+    return PolicySimulator(pods, namespaces, network_policies)
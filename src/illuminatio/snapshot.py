@@ -0,0 +1,99 @@
+"""
+File containing the recording of the cluster state illuminatio read into compact snapshot files
+and their replay through the fake API server, for offline and reproducible runs
+"""
+import gzip
+import json
+import time
+
+from illuminatio.fake_cluster import KINDS, FakeCluster
+from illuminatio.k8s_util import deserialize_model, serialize_model
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_RESOURCES = {
+    "namespaces": "V1Namespace",
+    "pods": "V1Pod",
+    "services": "V1Service",
+    "networkpolicies": "V1NetworkPolicy",
+}
+SNAPSHOT_META_KEY = "illuminatio.snapshot"
+REPLAY_META_KEY = "illuminatio.replay"
+LAST_APPLIED_ANNOTATION = "kubectl.kubernetes.io/last-applied-configuration"
+
+
+def _compact(obj):
+    # managed fields and the last applied configuration duplicate the object and are never read
+    metadata = obj.get("metadata", {})
+    metadata.pop("managedFields", None)
+    annotations = metadata.get("annotations") or {}
+    annotations.pop(LAST_APPLIED_ANNOTATION, None)
+    if not annotations:
+        metadata.pop("annotations", None)
+    return obj
+
+
+class ClusterSnapshot:
+    """
+    Class for the pods, services, namespaces and NetworkPolicies of a cluster at one point in time
+    """
+
+    def __init__(self, resources=None, created=None):
+        self.resources = resources if resources is not None else {}
+        self.created = created if created is not None else time.time()
+
+    def record(self, resource, items):
+        """
+        Stores the items of a resource type, given as models of the kubernetes client
+        """
+        if resource not in SNAPSHOT_RESOURCES:
+            raise ValueError(
+                "Cannot record %s, supported: %s" % (resource, list(SNAPSHOT_RESOURCES))
+            )
+        self.resources[resource] = [_compact(serialize_model(item)) for item in items]
+
+    def items(self, resource):
+        """
+        Returns the stored items of a resource type as models of the kubernetes client
+        """
+        return [
+            deserialize_model(item, SNAPSHOT_RESOURCES[resource])
+            for item in self.resources.get(resource, [])
+        ]
+
+    def write(self, filename):
+        """
+        Writes the snapshot as gzip compressed JSON
+        """
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "created": self.created,
+            "resources": self.resources,
+        }
+        with gzip.open(filename, "wt", encoding="utf-8") as snapshot_file:
+            json.dump(data, snapshot_file, separators=(",", ":"), sort_keys=True)
+
+    @classmethod
+    def read(cls, filename):
+        """
+        Reads a snapshot written by write
+        """
+        with gzip.open(filename, "rt", encoding="utf-8") as snapshot_file:
+            data = json.load(snapshot_file)
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(
+                "Unsupported snapshot version %s in %s"
+                % (data.get("version"), filename)
+            )
+        return cls(data["resources"], data["created"])
+
+    def serve(self):
+        """
+        Starts a fake API server serving the snapshot.
+        Its name generation is seeded, so resources created against it are named the same in every replay.
+        """
+        cluster = FakeCluster(seed=0).start()
+        # namespaces first, the order within a resource type is the recorded one
+        for resource in SNAPSHOT_RESOURCES:
+            for item in self.resources.get(resource, []):
+                cluster.add(dict(item, kind=KINDS[resource]))
+        return cluster
@@ -0,0 +1,45 @@
+"""
+This file contains the built-in illuminatio test target, a minimal TCP server
+which accepts connections on an arbitrary list of ports
+"""
+import asyncio
+import logging
+
+import click
+import click_log
+
+LOGGER = logging.getLogger(__name__)
+click_log.basic_config(LOGGER)
+
+
+async def _close_connection(_reader, writer):
+    """
+    Closes an accepted connection right away, an established handshake is all a probe needs
+    """
+    writer.close()
+
+
+async def serve(ports, host="0.0.0.0"):
+    """
+    Starts one listener per port and serves until cancelled
+    """
+    servers = [
+        await asyncio.start_server(_close_connection, host=host, port=port)
+        for port in sorted(set(ports))
+    ]
+    LOGGER.info("Listening on ports %s", ",".join(str(p) for p in sorted(set(ports))))
+    try:
+        await asyncio.gather(*[server.serve_forever() for server in servers])
+    finally:
+        for server in servers:
+            server.close()
+
+
+@click.command()
+@click_log.simple_verbosity_option(LOGGER)
+@click.argument("ports", nargs=-1, type=click.IntRange(1, 65535), required=True)
+def cli(ports):
+    """
+    Listens on all given TCP PORTS until the container is killed.
+    """
+    asyncio.run(serve(ports))
@@ -1,16 +1,27 @@
 """
 File containing utilities for NetworkTestCases
 """
-from typing import List
-import yaml
+from typing import Iterable, List
 from illuminatio.host import Host
+from illuminatio.util import yaml_dump, yaml_load
 
 
 class NetworkTestCase:
     """
-    Class that describes a single network test case
+    Class that describes a single network test case,
+    immutable and compared, hashed and ordered by its precomputed identifiers
     """
 
+    __slots__ = (
+        "from_host",
+        "to_host",
+        "_on_port",
+        "_should_connect",
+        "port_string",
+        "_key",
+        "_hash",
+    )
+
     def __init__(self, from_host: Host, to_host: Host, on_port, should_connect):
         if from_host is None:
             raise ValueError("fromHost may not be None")
@@ -18,25 +29,41 @@ class NetworkTestCase:
             raise ValueError("toHost may not be None")
         if should_connect is None:
             raise ValueError("shouldConnect may not be None")
-        self.from_host = from_host
-        self.to_host = to_host
         # on_port can be None, which matches all ports
-        self._on_port = on_port if on_port else "*"
-        self._should_connect = should_connect
-        self.port_string = "%s%s" % (
-            ("" if self._should_connect else "-"),
-            str(self._on_port),
+        on_port = on_port if on_port else "*"
+        port_string = "%s%s" % (("" if should_connect else "-"), str(on_port))
+        key = (from_host.to_identifier(), to_host.to_identifier(), port_string)
+        for name, value in (
+            ("from_host", from_host),
+            ("to_host", to_host),
+            ("_on_port", on_port),
+            ("_should_connect", should_connect),
+            ("port_string", port_string),
+            ("_key", key),
+            ("_hash", hash(key)),
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("NetworkTestCase is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("NetworkTestCase is immutable")
+
+    def __reduce__(self):
+        return (
+            NetworkTestCase,
+            (self.from_host, self.to_host, self._on_port, self._should_connect),
         )
 
     def __eq__(self, other):
         if isinstance(other, NetworkTestCase):
-            return (
-                self.from_host == other.from_host
-                and self.to_host == other.to_host
-                and self.port_string == other.port_string
-            )
+            return self._key == other._key
         return False
 
+    def __hash__(self):
+        return self._hash
+
     def __str__(self):
         return "NetworkTestCase(from=%s, to=%s, port=%s)" % (
             str(self.from_host),
@@ -69,15 +96,11 @@ class NetworkTestCase:
         """
         Returns the stringified components of a NetworkTestCase
         """
-        return (
-            self.from_host.to_identifier(),
-            self.to_host.to_identifier(),
-            self.port_string,
-        )
+        return self._key
 
     def __lt__(self, other):
         if isinstance(other, NetworkTestCase):
-            return str(self) < str(other)
+            return self._key < other._key
         raise TypeError(
             "'<' not supported between instances of 'NetworkTestCase' and %s"
             % type(other)
@@ -97,6 +120,13 @@ class NetworkTestCase:
         return NetworkTestCase(sender_pod, target_pod, port_string[1:], False)
 
 
+def deduplicate(cases: List[NetworkTestCase]):
+    """
+    Removes repeated NetworkTestCases, keeping the first occurrence of each
+    """
+    return list(dict.fromkeys(cases))
+
+
 def merge_in_dict(cases: List[NetworkTestCase]):
     """
     Converts a list of NetworkTestCases into a dictionary
@@ -123,11 +153,21 @@ def from_merged_dict(dictionary: dict) -> List[NetworkTestCase]:
     ]
 
 
+def to_records(cases: Iterable[NetworkTestCase]):
+    """
+    Yields one record per NetworkTestCase, the entries of line-oriented case files,
+    which CaseTable.from_records reads
+    """
+    for case in cases:
+        from_host, to_host, port = case.stringify_members()
+        yield {"fromHost": from_host, "toHost": to_host, "port": port}
+
+
 def to_yaml(cases: List[NetworkTestCase]):
     """
     Converts a list of NetworkTestCases into a yaml string
     """
-    return yaml.dump(merge_in_dict(cases))
+    return yaml_dump(merge_in_dict(cases))
 
 
 def triples_from_dict(dictionary: dict):
@@ -146,4 +186,4 @@ def from_yaml(yaml_string) -> List[NetworkTestCase]:
     """
     Converts a yaml string into a list of NetworkTestCases
     """
-    return from_merged_dict(yaml.safe_load(yaml_string))
+    return from_merged_dict(yaml_load(yaml_string))
@@ -1,16 +1,27 @@
 """
 File for test case generation
 """
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import operator
+import pickle
 import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
 
 import kubernetes as k8s
 from illuminatio.k8s_util import labels_to_string
 from illuminatio.rule import Rule
-from illuminatio.test_case import NetworkTestCase
+from illuminatio.test_case import NetworkTestCase, deduplicate
 from illuminatio.host import ClusterHost, GenericClusterHost
+from illuminatio.tracing import TRACER
 from illuminatio.util import rand_port, INVERTED_ATTRIBUTE_PREFIX
 
+INCREMENTAL_STATE_VERSION = 2
+
 
 def _get_other_host_from(connection_targets, rule_namespace):
     namespace_labels = "namespaceLabels"
@@ -51,13 +62,67 @@ def get_namespace_label_strings(namespace_labels, namespaces):
     }
 
 
+def partition_by_namespace(network_policies, partitions):
+    """
+    Splits the indices of the policies into at most the given number of partitions, keeping namespaces together.
+    The largest namespaces are assigned first, each to the partition with the fewest policies so far.
+    """
+    indices_per_namespace = {}
+    for index, policy in enumerate(network_policies):
+        indices_per_namespace.setdefault(policy.metadata.namespace, []).append(index)
+    out = [[] for _ in range(min(partitions, len(indices_per_namespace)))]
+    for indices in sorted(
+        indices_per_namespace.values(), key=lambda indices: (-len(indices), indices[0])
+    ):
+        min(out, key=len).extend(indices)
+    return [sorted(partition) for partition in out]
+
+
+# the policies of the running parallel generation, set before the worker processes start
+_WORKER_POLICIES = []
+
+
+def _set_worker_policies(network_policies):
+    global _WORKER_POLICIES  # pylint: disable=global-statement
+    _WORKER_POLICIES = network_policies
+
+
+def _generate_for_policies(indices):
+    """
+    Parses policies and generates their positive cases, run in the worker processes
+    """
+    generator = NetworkTestCaseGenerator(logging.getLogger(__name__))
+    out = []
+    for index in indices:
+        rule = Rule.from_network_policy(_WORKER_POLICIES[index])
+        out.append((index, rule, generator.positive_cases_for_rule(rule)))
+    return out
+
+
+def _worker_pool(workers, network_policies):
+    if "fork" in multiprocessing.get_all_start_methods():
+        # forked workers inherit the policies, pickling them would cost more than parsing them
+        _set_worker_policies(network_policies)
+        return ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        )
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_set_worker_policies,
+        initargs=(network_policies,),
+    )
+
+
 class NetworkTestCaseGenerator:
     """
     Class for Generating Test cases out of a k8s NetworkPolicy and saving them to a specified format
     """
 
-    def __init__(self, log):
+    def __init__(self, log, workers=1):
         self.logger = log
+        # with more than one worker, policies are parsed and their positive cases generated in a process pool
+        self.workers = workers
+        self._positive_cases = {}
 
     def generate_test_cases(
         self,
@@ -68,53 +133,155 @@ class NetworkTestCaseGenerator:
         Generates positive and negative test cases, also returns measured runtimes
         """
         runtimes = {}
-        start_time = time.time()
-        isolated_hosts = []
+        # ordered set, hosts are hashable
+        isolated_hosts = {}
         other_hosts = []
         outgoing_test_cases = []
         incoming_test_cases = []
         self.logger.debug("Generating test cases for %s", network_policies)
-        rules = [Rule.from_network_policy(netPol) for netPol in network_policies]
-        net_pol_parsing_time = time.time()
-        runtimes["parse"] = net_pol_parsing_time - start_time
+        with TRACER.span("parse", policies=len(network_policies)) as parse_span:
+            rules = self.parse_rules(network_policies)
+        runtimes["parse"] = parse_span.duration
         self.logger.debug("Rule: %s", rules)
-        for rule in rules:
-            rule_host = ClusterHost(
-                rule.concerns["namespace"], rule.concerns["podLabels"]
+        with TRACER.span("positiveTestGen") as positive_span:
+            for rule in rules:
+                (
+                    rule_host,
+                    rule_outgoing_cases,
+                    rule_incoming_cases,
+                    rule_other_hosts,
+                ) = self.positive_cases_for_rule(rule)
+                isolated_hosts.setdefault(rule_host)
+                outgoing_test_cases.extend(rule_outgoing_cases)
+                incoming_test_cases.extend(rule_incoming_cases)
+                other_hosts.extend(rule_other_hosts)
+            positive_span.set_attribute(
+                "cases", len(outgoing_test_cases) + len(incoming_test_cases)
+            )
+        runtimes["positiveTestGen"] = positive_span.duration
+        with TRACER.span("negativeTestGen", isolated_hosts=len(isolated_hosts)):
+            (
+                negative_test_cases,
+                negative_test_gen_runtimes,
+            ) = self.generate_negative_cases_for_incoming_cases(
+                list(isolated_hosts), incoming_test_cases, other_hosts, namespaces
             )
-            if rule_host not in isolated_hosts:
-                isolated_hosts.append(rule_host)
-            if rule.allowed:  # means it is NOT default deny rule
-                for connection in rule.allowed:
-                    for port in connection.ports:
-                        on_port = port
-                        other_host = _get_other_host_from(
-                            connection.targets, rule.concerns["namespace"]
-                        )
-                        other_hosts.append(other_host)
-                        if connection.direction == "to":
-                            case = NetworkTestCase(rule_host, other_host, on_port, True)
-                            outgoing_test_cases.append(case)
-                        elif connection.direction == "from":
-                            case = NetworkTestCase(other_host, rule_host, on_port, True)
-                            incoming_test_cases.append(case)
-                        else:
-                            raise ValueError(
-                                "Direction '%s' unknown!" % connection.direction
-                            )
-        positive_test_time = time.time()
-        runtimes["positiveTestGen"] = positive_test_time - net_pol_parsing_time
-        (
-            negative_test_cases,
-            negative_test_gen_runtimes,
-        ) = self.generate_negative_cases_for_incoming_cases(
-            isolated_hosts, incoming_test_cases, other_hosts, namespaces
-        )
         runtimes["negativeTestGen"] = negative_test_gen_runtimes
-        return outgoing_test_cases + negative_test_cases + incoming_test_cases, runtimes
+        # rules allowing the same connection yield the same case
+        return (
+            deduplicate(
+                outgoing_test_cases + negative_test_cases + incoming_test_cases
+            ),
+            runtimes,
+        )
+
+    def iter_test_cases(
+        self,
+        network_policies: List[k8s.client.V1NetworkPolicy],
+        namespaces: List[k8s.client.V1Namespace],
+        runtimes=None,
+    ):
+        """
+        Yields the cases of generate_test_cases as they are produced, positive cases rule by rule,
+        then negative cases host by host. Only the positive cases are kept, the negative ones need them.
+        """
+        runtimes = runtimes if runtimes is not None else {}
+        isolated_hosts = {}
+        other_hosts = []
+        incoming_test_cases = []
+        positive_cases = set()
+        with TRACER.span("parse", policies=len(network_policies)) as parse_span:
+            rules = self.parse_rules(network_policies)
+        runtimes["parse"] = parse_span.duration
+        start_time = time.time()
+        for rule in rules:
+            (
+                rule_host,
+                rule_outgoing_cases,
+                rule_incoming_cases,
+                rule_other_hosts,
+            ) = self.positive_cases_for_rule(rule)
+            isolated_hosts.setdefault(rule_host)
+            incoming_test_cases.extend(rule_incoming_cases)
+            other_hosts.extend(rule_other_hosts)
+            for case in rule_outgoing_cases + rule_incoming_cases:
+                if case not in positive_cases:
+                    positive_cases.add(case)
+                    yield case
+        runtimes["positiveTestGen"] = time.time() - start_time
+        negative_runtimes = runtimes["negativeTestGen"] = {}
+        negative_cases = self.iter_negative_cases(
+            list(isolated_hosts),
+            incoming_test_cases,
+            other_hosts,
+            namespaces,
+            negative_runtimes,
+        )
+        # negative cases never repeat positive ones, which connect, nor those of other isolated hosts,
+        # which they target, so deduplicating the cases of each host suffices
+        for _, host_cases in itertools.groupby(
+            negative_cases, key=operator.attrgetter("to_host")
+        ):
+            yield from deduplicate(host_cases)
+
+    def parse_rules(self, network_policies: List[k8s.client.V1NetworkPolicy]):
+        """
+        Converts NetworkPolicies into Rules
+        """
+        # cases stashed by an earlier, abandoned generation must not be served for new rules
+        self._positive_cases = {}
+        partitions = partition_by_namespace(network_policies, self.workers)
+        if len(partitions) <= 1:
+            return [Rule.from_network_policy(netPol) for netPol in network_policies]
+        rules = [None] * len(network_policies)
+        try:
+            with _worker_pool(len(partitions), network_policies) as pool:
+                for results in pool.map(_generate_for_policies, partitions):
+                    for index, rule, positive_cases in results:
+                        rules[index] = rule
+                        # the rule is kept alive with its cases, so its id is not reused meanwhile
+                        self._positive_cases[id(rule)] = (rule, positive_cases)
+        finally:
+            _set_worker_policies([])
+        self.logger.debug(
+            "Parsed %s policies in %s partitions", len(rules), len(partitions)
+        )
+        return rules
+
+    def positive_cases_for_rule(self, rule: Rule):
+        """
+        Returns the host a rule isolates, its outgoing and incoming positive test cases
+        and the hosts these connect to
+        """
+        stashed = self._positive_cases.pop(id(rule), None)
+        if stashed is not None and stashed[0] is rule:
+            # generated by a worker along with parsing
+            return stashed[1]
+        rule_host = ClusterHost(rule.concerns["namespace"], rule.concerns["podLabels"])
+        outgoing_test_cases = []
+        incoming_test_cases = []
+        other_hosts = []
+        if rule.allowed:  # means it is NOT default deny rule
+            for connection in rule.allowed:
+                for port in connection.ports:
+                    on_port = port
+                    other_host = _get_other_host_from(
+                        connection.targets, rule.concerns["namespace"]
+                    )
+                    other_hosts.append(other_host)
+                    if connection.direction == "to":
+                        case = NetworkTestCase(rule_host, other_host, on_port, True)
+                        outgoing_test_cases.append(case)
+                    elif connection.direction == "from":
+                        case = NetworkTestCase(other_host, rule_host, on_port, True)
+                        incoming_test_cases.append(case)
+                    else:
+                        raise ValueError(
+                            "Direction '%s' unknown!" % connection.direction
+                        )
+        return rule_host, outgoing_test_cases, incoming_test_cases, other_hosts
 
     # TODO: implement it also for outgoing test cases
-    # TODO: divide this into submethods
     def generate_negative_cases_for_incoming_cases(
         self, isolated_hosts, incoming_test_cases, other_hosts, namespaces
     ):
@@ -122,138 +289,168 @@ class NetworkTestCaseGenerator:
         Generates negative test cases based on desired positive test cases
         """
         runtimes = {}
-        start_time = time.time()
-        # list of all namespace labels set on other hosts
-        namespace_labels = [
-            h.namespace_labels for h in other_hosts if isinstance(h, GenericClusterHost)
-        ]
-        namespaces_per_label_strings = get_namespace_label_strings(
-            namespace_labels, namespaces
+        cases = list(
+            self.iter_negative_cases(
+                isolated_hosts, incoming_test_cases, other_hosts, namespaces, runtimes
+            )
         )
-        namespace_label_resolve_time = time.time()
-        runtimes["nsLabelResolve"] = namespace_label_resolve_time - start_time
-        labels_per_namespace = {n.metadata.name: n.metadata.labels for n in namespaces}
-        overlaps_per_host = {
-            host: self.get_overlapping_hosts(
-                host,
-                namespaces_per_label_strings,
-                labels_per_namespace,
-                isolated_hosts + other_hosts,
+        return cases, runtimes
+
+    def iter_negative_cases(
+        self, isolated_hosts, incoming_test_cases, other_hosts, namespaces, runtimes
+    ):
+        """
+        Yields the negative test cases host by host, filling in the measured runtimes
+        """
+        start_time = time.time()
+        with TRACER.span("nsLabelResolve") as resolve_span:
+            # list of all namespace labels set on other hosts
+            namespace_labels = [
+                h.namespace_labels
+                for h in other_hosts
+                if isinstance(h, GenericClusterHost)
+            ]
+            namespaces_per_label_strings = get_namespace_label_strings(
+                namespace_labels, namespaces
             )
-            for host in isolated_hosts
-        }
-        overlap_calc_time = time.time()
-        runtimes["overlapCalc"] = overlap_calc_time - namespace_label_resolve_time
-        cases = []
+        runtimes["nsLabelResolve"] = resolve_span.duration
+        with TRACER.span("overlapCalc") as overlap_span:
+            labels_per_namespace = {
+                n.metadata.name: n.metadata.labels for n in namespaces
+            }
+            overlaps_per_host = {
+                host: self.get_overlapping_hosts(
+                    host,
+                    namespaces_per_label_strings,
+                    labels_per_namespace,
+                    isolated_hosts + other_hosts,
+                )
+                for host in isolated_hosts
+            }
+        runtimes["overlapCalc"] = overlap_span.duration
         for host in isolated_hosts:
             host_string = str(host)
-            host_start_time = time.time()
             runtimes[host_string] = {}
-            # Check for hosts that can target these to construct negative cases from
-            self.logger.debug(overlaps_per_host[host])
-            allowed_hosts_with_ports = [
-                (test_case.from_host, test_case.port_string)
-                for test_case in incoming_test_cases
-                if test_case.to_host in overlaps_per_host[host]
-            ]
-            self.logger.debug("allowed_hosts_with_ports=%s", allowed_hosts_with_ports)
-            reaching_host_find_time = time.time()
-            runtimes[host_string]["findReachingHosts"] = (
-                reaching_host_find_time - host_start_time
+            yield from self.negative_cases_for_host(
+                host,
+                overlaps_per_host[host],
+                incoming_test_cases,
+                namespaces_per_label_strings,
+                labels_per_namespace,
+                runtimes[host_string],
             )
-            if allowed_hosts_with_ports:
-                allowed_hosts, _ = zip(*allowed_hosts_with_ports)
-                ports_per_host = {
-                    host: [
-                        port
-                        for _host, port in allowed_hosts_with_ports
-                        if _host == host
-                    ]
-                    for host in allowed_hosts
-                }
-                match_all_host = GenericClusterHost({}, {})
-                if match_all_host in allowed_hosts:
-                    # All hosts are allowed to reach (on some ports or all) => results from ALLOW all
-                    if "*" in ports_per_host[match_all_host]:
-                        self.logger.info(
-                            "Not generating negative tests for host %s"
-                            "as all connections to it are allowed",
+            runtimes["all"] = time.time() - start_time
+
+    def negative_cases_for_host(
+        self,
+        host,
+        overlapping_hosts,
+        incoming_test_cases,
+        namespaces_per_label_strings,
+        labels_per_namespace,
+        runtimes,
+    ):
+        """
+        Generates the negative test cases of one isolated host, given the hosts it overlaps with
+        """
+        cases = []
+        host_start_time = time.time()
+        # Check for hosts that can target these to construct negative cases from
+        self.logger.debug(overlapping_hosts)
+        allowed_hosts_with_ports = [
+            (test_case.from_host, test_case.port_string)
+            for test_case in incoming_test_cases
+            if test_case.to_host in overlapping_hosts
+        ]
+        self.logger.debug("allowed_hosts_with_ports=%s", allowed_hosts_with_ports)
+        reaching_host_find_time = time.time()
+        runtimes["findReachingHosts"] = reaching_host_find_time - host_start_time
+        if allowed_hosts_with_ports:
+            allowed_hosts, _ = zip(*allowed_hosts_with_ports)
+            ports_per_host = {
+                host: [
+                    port for _host, port in allowed_hosts_with_ports if _host == host
+                ]
+                for host in allowed_hosts
+            }
+            match_all_host = GenericClusterHost({}, {})
+            if match_all_host in allowed_hosts:
+                # All hosts are allowed to reach (on some ports or all) => results from ALLOW all
+                if "*" in ports_per_host[match_all_host]:
+                    self.logger.info(
+                        "Not generating negative tests for host %s"
+                        "as all connections to it are allowed",
+                        host,
+                    )
+                else:
+                    cases.append(
+                        NetworkTestCase(
+                            match_all_host,
                             host,
+                            rand_port(ports_per_host[match_all_host]),
+                            False,
                         )
-                    else:
+                    )
+                runtimes["matchAllCase"] = time.time() - reaching_host_find_time
+            else:
+                inverted_hosts = set(
+                    [
+                        h
+                        for l in [invert_host(host) for host in allowed_hosts]
+                        for h in l
+                    ]
+                )
+                hosts_on_inverted = {
+                    h: originalHost
+                    for l, originalHost in [
+                        (invert_host(host), host) for host in allowed_hosts
+                    ]
+                    for h in l
+                }
+                host_inversion_time = time.time()
+                runtimes["hostInversion"] = (
+                    host_inversion_time - reaching_host_find_time
+                )
+                overlaps_for_inverted_hosts = {
+                    h: self.get_overlapping_hosts(
+                        h,
+                        namespaces_per_label_strings,
+                        labels_per_namespace,
+                        allowed_hosts,
+                    )
+                    for h in inverted_hosts
+                }
+                overlap_calc_time = time.time()
+                runtimes["overlapCalc"] = overlap_calc_time - host_inversion_time
+                self.logger.debug("InvertedHosts: %s", inverted_hosts)
+                negative_test_targets = [
+                    h
+                    for h in inverted_hosts
+                    if len(overlaps_for_inverted_hosts[h]) <= 1
+                ]
+                self.logger.debug("NegativeTestTargets: %s", negative_test_targets)
+                # now remove the inverted hosts that are reachable
+                for target in negative_test_targets:
+                    ports_for_inverted_hosts_original_host = ports_per_host[
+                        hosts_on_inverted[target]
+                    ]
+                    if ports_for_inverted_hosts_original_host:
                         cases.append(
                             NetworkTestCase(
-                                match_all_host,
+                                target,
                                 host,
-                                rand_port(ports_per_host[match_all_host]),
+                                ports_for_inverted_hosts_original_host[0],
                                 False,
                             )
                         )
-                    runtimes[host_string]["matchAllCase"] = (
-                        time.time() - reaching_host_find_time
-                    )
-                else:
-                    inverted_hosts = set(
-                        [
-                            h
-                            for l in [invert_host(host) for host in allowed_hosts]
-                            for h in l
-                        ]
-                    )
-                    hosts_on_inverted = {
-                        h: originalHost
-                        for l, originalHost in [
-                            (invert_host(host), host) for host in allowed_hosts
-                        ]
-                        for h in l
-                    }
-                    host_inversion_time = time.time()
-                    runtimes[host_string]["hostInversion"] = (
-                        host_inversion_time - reaching_host_find_time
-                    )
-                    overlaps_for_inverted_hosts = {
-                        h: self.get_overlapping_hosts(
-                            h,
-                            namespaces_per_label_strings,
-                            labels_per_namespace,
-                            allowed_hosts,
-                        )
-                        for h in inverted_hosts
-                    }
-                    overlap_calc_time = time.time()
-                    runtimes[host_string]["overlapCalc"] = (
-                        overlap_calc_time - host_inversion_time
-                    )
-                    self.logger.debug("InvertedHosts: %s", inverted_hosts)
-                    negative_test_targets = [
-                        h
-                        for h in inverted_hosts
-                        if len(overlaps_for_inverted_hosts[h]) <= 1
-                    ]
-                    self.logger.debug("NegativeTestTargets: %s", negative_test_targets)
-                    # now remove the inverted hosts that are reachable
-                    for target in negative_test_targets:
-                        ports_for_inverted_hosts_original_host = ports_per_host[
-                            hosts_on_inverted[target]
-                        ]
-                        if ports_for_inverted_hosts_original_host:
-                            cases.append(
-                                NetworkTestCase(
-                                    target,
-                                    host,
-                                    ports_for_inverted_hosts_original_host[0],
-                                    False,
-                                )
-                            )
-                        else:
-                            cases.append(NetworkTestCase(target, host, "*", False))
-                    runtimes[host_string]["casesGen"] = time.time() - overlap_calc_time
-            else:
-                # No hosts are allowed to reach host -> it should be totally isolated
-                # => results from default deny policy
-                cases.append(NetworkTestCase(host, host, "*", False))
-            runtimes["all"] = time.time() - start_time
-        return cases, runtimes
+                    else:
+                        cases.append(NetworkTestCase(target, host, "*", False))
+                runtimes["casesGen"] = time.time() - overlap_calc_time
+        else:
+            # No hosts are allowed to reach host -> it should be totally isolated
+            # => results from default deny policy
+            cases.append(NetworkTestCase(host, host, "*", False))
+        return cases
 
     def get_overlapping_hosts(
         self, host, namespaces_per_label_strings, labels_per_namespace, other_hosts
@@ -262,16 +459,16 @@ class NetworkTestCaseGenerator:
         Returns a list of hosts that might be selected by the same policies
         """
         out = [host]
+        # hosts are interned, an equal host in other_hosts is the host itself and overlaps it
         for other in other_hosts:
-            if host is not other:
-                namespace_overlap = self.namespaces_overlap(
-                    host, namespaces_per_label_strings, labels_per_namespace, other
-                )
-                pod_label_overlap = label_selector_overlap(
-                    other.pod_labels, host.pod_labels
-                )
-                if namespace_overlap and pod_label_overlap:
-                    out.append(other)
+            namespace_overlap = self.namespaces_overlap(
+                host, namespaces_per_label_strings, labels_per_namespace, other
+            )
+            pod_label_overlap = label_selector_overlap(
+                other.pod_labels, host.pod_labels
+            )
+            if namespace_overlap and pod_label_overlap:
+                out.append(other)
         return out
 
     def namespaces_overlap(
@@ -306,6 +503,207 @@ class NetworkTestCaseGenerator:
         )
 
 
+def policy_key(policy: k8s.client.V1NetworkPolicy):
+    """
+    Returns the key identifying a NetworkPolicy across generations and the version of its content,
+    policies read from manifests have neither UID nor resourceVersion and are keyed by name and content
+    """
+    metadata = policy.metadata
+    key = metadata.uid or "%s/%s" % (metadata.namespace, metadata.name)
+    version = metadata.resource_version
+    if version is None:
+        version = hashlib.sha256(
+            json.dumps(
+                k8s.client.ApiClient().sanitize_for_serialization(policy.spec),
+                sort_keys=True,
+            ).encode("utf-8")
+        ).hexdigest()
+    return key, version
+
+
+def _namespace_fingerprint(namespaces):
+    return tuple(
+        sorted(
+            (n.metadata.name, tuple(sorted((n.metadata.labels or {}).items())))
+            for n in namespaces
+        )
+    )
+
+
+class IncrementalTestCaseGenerator(NetworkTestCaseGenerator):
+    """
+    Generator keeping the rules, positive cases and negative cases of its previous generation,
+    with policies keyed by UID and resourceVersion.
+    Only policies that were added or changed are parsed again and only the isolated hosts
+    overlapping a host of an added, changed or removed policy get their negative cases recomputed,
+    the cases are the same as those of a full generation.
+    """
+
+    def __init__(self, log, workers=1):
+        super().__init__(log, workers)
+        # policy key -> (version, rule, positive cases of the rule)
+        self._policies = {}
+        self._keys_per_rule = {}
+        # isolated host -> negative cases
+        self._negative_cases = {}
+        self._namespaces = None
+        self._changed_hosts = []
+
+    def save(self, filename):
+        """
+        Writes the state of the last generation, to continue from it in another invocation
+        """
+        with open(filename, "wb") as state_file:
+            pickle.dump(
+                {
+                    "version": INCREMENTAL_STATE_VERSION,
+                    "policies": self._policies,
+                    "negativeCases": self._negative_cases,
+                    "namespaces": self._namespaces,
+                },
+                state_file,
+            )
+
+    @classmethod
+    def load(cls, filename, log, workers=1):
+        """
+        Returns a generator continuing from a state written by save,
+        or a fresh one if the file does not exist or was written by another version.
+        The state is unpickled, so the file must be trusted.
+        """
+        generator = cls(log, workers)
+        try:
+            with open(filename, "rb") as state_file:
+                state = pickle.load(state_file)
+        except FileNotFoundError:
+            return generator
+        except (pickle.UnpicklingError, AttributeError, TypeError, EOFError) as error:
+            # states of versions with other host or case classes do not even unpickle
+            log.info("Ignoring unreadable incremental state %s: %s", filename, error)
+            return generator
+        if state.get("version") != INCREMENTAL_STATE_VERSION:
+            log.info("Ignoring incremental state %s of another version", filename)
+            return generator
+        generator._policies = state["policies"]
+        generator._negative_cases = state["negativeCases"]
+        generator._namespaces = state["namespaces"]
+        return generator
+
+    def parse_rules(self, network_policies: List[k8s.client.V1NetworkPolicy]):
+        previous = self._policies
+        self._policies = {}
+        self._keys_per_rule = {}
+        self._changed_hosts = []
+        versions = [policy_key(policy) for policy in network_policies]
+        changed_policies = []
+        reused_keys = set()
+        for policy, (key, version) in zip(network_policies, versions):
+            entry = None if key in reused_keys else previous.get(key)
+            if entry is None or entry[0] != version:
+                changed_policies.append(policy)
+            else:
+                reused_keys.add(key)
+        # parsed like a full generation does, in the worker pool if there are enough workers
+        changed_rules = iter(super().parse_rules(changed_policies))
+        rules = []
+        for key, version in versions:
+            entry = previous.pop(key, None)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self._changed_hosts.append(_rule_host(entry[1]))
+                rule = next(changed_rules)
+                self._changed_hosts.append(_rule_host(rule))
+                entry = (version, rule, None)
+            self._policies[key] = entry
+            self._keys_per_rule[id(entry[1])] = key
+            rules.append(entry[1])
+        # what remains was removed
+        self._changed_hosts.extend(_rule_host(entry[1]) for entry in previous.values())
+        self.logger.debug(
+            "Reparsed policies changing hosts %s, %s removed",
+            self._changed_hosts,
+            len(previous),
+        )
+        return rules
+
+    def positive_cases_for_rule(self, rule: Rule):
+        key = self._keys_per_rule.get(id(rule))
+        if key is None:
+            return super().positive_cases_for_rule(rule)
+        version, _, positive_cases = self._policies[key]
+        if positive_cases is None:
+            positive_cases = super().positive_cases_for_rule(rule)
+            self._policies[key] = (version, rule, positive_cases)
+        return positive_cases
+
+    def iter_negative_cases(
+        self, isolated_hosts, incoming_test_cases, other_hosts, namespaces, runtimes
+    ):
+        """
+        Yields the negative test cases of isolated hosts affected by changed policies,
+        reusing those of the previous generation for all others
+        """
+        start_time = time.time()
+        namespace_labels = [
+            h.namespace_labels for h in other_hosts if isinstance(h, GenericClusterHost)
+        ]
+        namespaces_per_label_strings = get_namespace_label_strings(
+            namespace_labels, namespaces
+        )
+        labels_per_namespace = {n.metadata.name: n.metadata.labels for n in namespaces}
+        namespaces_changed = _namespace_fingerprint(namespaces) != self._namespaces
+        self._namespaces = _namespace_fingerprint(namespaces)
+        # incoming cases only target rule hosts, overlaps with other hosts never select any
+        target_hosts = list(dict.fromkeys(case.to_host for case in incoming_test_cases))
+        previous = self._negative_cases
+        self._negative_cases = {}
+        reused = 0
+        for host in isolated_hosts:
+            if (
+                not namespaces_changed
+                and host in previous
+                and len(
+                    self.get_overlapping_hosts(
+                        host,
+                        namespaces_per_label_strings,
+                        labels_per_namespace,
+                        self._changed_hosts,
+                    )
+                )
+                == 1
+            ):
+                host_cases = previous[host]
+                reused += 1
+            else:
+                runtimes[str(host)] = {}
+                host_cases = self.negative_cases_for_host(
+                    host,
+                    self.get_overlapping_hosts(
+                        host,
+                        namespaces_per_label_strings,
+                        labels_per_namespace,
+                        target_hosts,
+                    ),
+                    incoming_test_cases,
+                    namespaces_per_label_strings,
+                    labels_per_namespace,
+                    runtimes[str(host)],
+                )
+            self._negative_cases[host] = host_cases
+            yield from host_cases
+        self.logger.debug(
+            "Reused negative cases of %s of %s isolated hosts",
+            reused,
+            len(isolated_hosts),
+        )
+        runtimes["reusedHosts"] = reused
+        runtimes["all"] = time.time() - start_time
+
+
+def _rule_host(rule):
+    return ClusterHost(rule.concerns["namespace"], rule.concerns["podLabels"])
+
+
 def invert_host(host):
     """
     Returns a list of either inverted GenericClusterHosts or inverted ClusterHosts
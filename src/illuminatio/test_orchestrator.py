@@ -2,6 +2,7 @@
 File containing all utilities to interact with test case related kubernetes resources
 """
 
+import hashlib
 import time
 import json
 from pkgutil import get_data
@@ -15,10 +16,14 @@ from illuminatio.k8s_util import (
     create_role_binding_manifest_for_service_account,
     create_service_account_manifest_for_runners,
     create_service_manifest,
+    create_node_name_affinity,
+    create_spread_affinity,
     labels_to_string,
     update_role_binding_manifest,
 )
-from illuminatio.test_case import merge_in_dict
+from illuminatio.case_table import SENDER, CaseTable
+from illuminatio.simulator import labels_match_selector
+from illuminatio.tracing import TRACER
 from illuminatio.util import (
     PROJECT_NAMESPACE,
     PROJECT_PREFIX,
@@ -26,7 +31,12 @@ from illuminatio.util import (
     ROLE_LABEL,
     CLEANUP_ALWAYS,
 )
-from illuminatio.util import rand_port, add_illuminatio_labels
+from illuminatio.util import rand_port, add_illuminatio_labels, yaml_dump, yaml_load
+
+RUNNER_METRICS_PORT = 9102
+TARGET_MODE_IMAGE = "image"
+TARGET_MODE_BUILTIN = "builtin"
+TARGET_MODES = [TARGET_MODE_IMAGE, TARGET_MODE_BUILTIN]
 
 
 def get_container_runtime():
@@ -51,15 +61,181 @@ def get_container_runtime():
     raise ValueError("Node not found")
 
 
-def _hosts_are_in_cluster(case):
-    return all(
-        [
-            isinstance(host, (ClusterHost, GenericClusterHost))
-            for host in [case.from_host, case.to_host]
-        ]
+def _target_marker_label(host):
+    """
+    Returns a label key unique to the host, used to select its builtin target pod
+    """
+    digest = hashlib.sha1(host.to_identifier().encode("utf-8")).hexdigest()[:12]
+    return "%s-target-%s" % (PROJECT_PREFIX, digest)
+
+
+def _labels_conflict(labels, other_labels):
+    return any(
+        key in other_labels and other_labels[key] != value
+        for key, value in labels.items()
     )
 
 
+def group_target_hosts(pending_hosts, known_hosts, network_policies=None):
+    """
+    Greedily groups pending target hosts of the same namespace, so that each group can share one pod.
+    A host only joins a group if its labels do not conflict with the group's labels,
+    no NetworkPolicy selector tells the group members or their merged labels apart
+    and the merged labels are not matched by a known host that matches none of the group members,
+    as that pod would otherwise be allowed or denied traffic on behalf of another host.
+    Without the NetworkPolicies, every host gets its own pod.
+    """
+    if network_policies is None:
+        return [[pending] for pending in pending_hosts]
+    groups = []
+    for pending in pending_hosts:
+        host = pending[0]
+        for group in groups:
+            if group[0][0].namespace != host.namespace:
+                continue
+            members = [member[0] for member in group] + [host]
+            merged_labels = {}
+            for member in members:
+                merged_labels.update(member.pod_labels)
+            if any(_labels_conflict(m.pod_labels, merged_labels) for m in members):
+                continue
+            if any(
+                _selector_distinguishes(selector, members, merged_labels)
+                for selector in _pod_selectors(network_policies, host.namespace)
+            ):
+                continue
+            if any(
+                _selects_merged_only(known, members, merged_labels)
+                for known in known_hosts
+            ):
+                continue
+            group.append(pending)
+            break
+        else:
+            groups.append([pending])
+    return groups
+
+
+def _pod_selectors(network_policies, namespace):
+    """
+    Yields the selectors of the policies in the namespace and the pod selectors of all policy peers,
+    peers of other namespaces included, as their namespace selectors may match the namespace
+    """
+    for policy in network_policies:
+        spec = policy.spec
+        if policy.metadata.namespace == namespace:
+            yield spec.pod_selector
+        rules = [rule._from for rule in spec.ingress or []]
+        rules += [rule.to for rule in spec.egress or []]
+        for peers in rules:
+            for peer in peers or []:
+                if peer.pod_selector is not None:
+                    yield peer.pod_selector
+
+
+def _selector_distinguishes(selector, members, merged_labels):
+    selected = labels_match_selector(merged_labels, selector)
+    return any(
+        labels_match_selector(member.pod_labels, selector) != selected
+        for member in members
+    )
+
+
+def _selects_merged_only(known_host, members, merged_labels):
+    if not isinstance(known_host, ClusterHost):
+        return False
+    if known_host.namespace != members[0].namespace:
+        return False
+    if not known_host.pod_labels.items() <= merged_labels.items():
+        return False
+    return not any(
+        known_host.pod_labels.items() <= member.pod_labels.items() for member in members
+    )
+
+
+def select_sender_pods(pods_per_host, probes_per_host):
+    """
+    Chooses one sender pod per host so that the probes are balanced across the nodes of the candidate pods.
+    Hosts are assigned in descending order of their probe count, each to the candidate pod on the node
+    with the fewest probes so far, which keeps the slowest runner's workload low.
+    Pods that are not scheduled yet are treated as if they were on a node of their own.
+    """
+    probes_per_node = {}
+    selected = {}
+    for host_string in sorted(
+        pods_per_host, key=lambda h: probes_per_host.get(h, 0), reverse=True
+    ):
+        candidates = pods_per_host[host_string]
+        sender_pod = min(
+            candidates, key=lambda pod: probes_per_node.get(_node_of(pod), 0)
+        )
+        node = _node_of(sender_pod)
+        probes_per_node[node] = probes_per_node.get(node, 0) + probes_per_host.get(
+            host_string, 0
+        )
+        selected[host_string] = sender_pod
+    return selected
+
+
+def select_class_senders(pods_per_host):
+    """
+    Chooses one sender pod per host from class representatives so that hosts share senders where possible.
+    Hosts with the fewest candidates choose first, reusing an already chosen sender if they can
+    and otherwise the candidate that most other hosts could use as well.
+    """
+    usable_by = {}
+    for candidates in pods_per_host.values():
+        for pod in candidates:
+            identifier = _pod_identifier(pod)
+            usable_by[identifier] = usable_by.get(identifier, 0) + 1
+    chosen = {}
+    selected = {}
+    for host_string in sorted(pods_per_host, key=lambda h: len(pods_per_host[h])):
+        candidates = pods_per_host[host_string]
+        reused = [pod for pod in candidates if _pod_identifier(pod) in chosen]
+        if reused:
+            sender_pod = reused[0]
+        else:
+            sender_pod = max(
+                candidates, key=lambda pod: usable_by[_pod_identifier(pod)]
+            )
+            chosen[_pod_identifier(sender_pod)] = sender_pod
+        selected[host_string] = sender_pod
+    return {host_string: selected[host_string] for host_string in pods_per_host}
+
+
+def _pod_identifier(pod):
+    return "%s:%s" % (pod.metadata.namespace, pod.metadata.name)
+
+
+def _node_of(pod):
+    if pod.spec is not None and pod.spec.node_name:
+        return pod.spec.node_name
+    return "unscheduled:%s:%s" % (pod.metadata.namespace, pod.metadata.name)
+
+
+def _host_is_in_cluster(host_string):
+    return isinstance(
+        Host.from_identifier(host_string), (ClusterHost, GenericClusterHost)
+    )
+
+
+def _add_metrics_endpoint(container):
+    """
+    Lets the runner container serve metrics and probes its health and readiness endpoints
+    """
+    container["args"].append("--metrics-port=%s" % RUNNER_METRICS_PORT)
+    container["ports"] = [{"containerPort": RUNNER_METRICS_PORT, "name": "metrics"}]
+    container["livenessProbe"] = {
+        "httpGet": {"path": "/healthz", "port": "metrics"},
+        "periodSeconds": 10,
+    }
+    container["readinessProbe"] = {
+        "httpGet": {"path": "/readyz", "port": "metrics"},
+        "periodSeconds": 2,
+    }
+
+
 class NetworkTestOrchestrator:
     """
     Class for handling test case related kubernetes resources
@@ -72,6 +248,16 @@ class NetworkTestOrchestrator:
         self.current_namespaces = []
         self.runner_daemon_set = None
         self.oci_images = {}
+        self.target_mode = TARGET_MODE_IMAGE
+        self.spread_dummy_pods = False
+        self.restrict_runners = False
+        self.sender_nodes = []
+        self._sender_pods = []
+        self._pending_target_hosts = []
+        self.pod_classes = None
+        self.class_members = {}
+        self.network_policies = None
+        self.runner_metrics = False
         self.logger = log
 
     def set_runner_image(self, runner_image):
@@ -86,6 +272,30 @@ class NetworkTestOrchestrator:
         """
         self.oci_images["target"] = target_image
 
+    def set_pod_classes(self, pod_classes):
+        """
+        Probes from one representative per pod equivalence class instead of any pod matching a host,
+        so that hosts selecting pods of the same classes share their sender and their probes
+        """
+        self.pod_classes = pod_classes
+
+    def set_network_policies(self, network_policies):
+        """
+        Updates the NetworkPolicies of the cluster, which decide what builtin target hosts may share a pod
+        """
+        self.network_policies = network_policies
+
+    def set_target_mode(self, target_mode):
+        """
+        Updates how target pods are created, either from the target image with one pod per host
+        or from the builtin target of the runner image with hosts consolidated onto shared pods
+        """
+        if target_mode not in TARGET_MODES:
+            raise ValueError(
+                "Unknown target mode %s, use one of: %s" % (target_mode, TARGET_MODES)
+            )
+        self.target_mode = target_mode
+
     def template_manifest(self, manifest_file, **kwargs):
         """
         Reads an YAML manifest and convert it to a string
@@ -96,7 +306,7 @@ class NetworkTestOrchestrator:
         data_str = str(data, "utf-8")
 
         try:
-            return yaml.safe_load(data_str.format(**kwargs))
+            return yaml_load(data_str.format(**kwargs))
         except yaml.YAMLError as exc:
             self.logger.error(exc)
             exit(1)
@@ -118,16 +328,30 @@ class NetworkTestOrchestrator:
             field_selector=non_kube_namespace_selector
         ).items
         self.logger.debug(format_string.format(len(svcs), "services", svcs))
+        self._current_pods = pods
+        self._current_services = svcs
+        self.refresh_namespaces(api)
+
+    def refresh_namespaces(self, api: k8s.client.CoreV1Api):
+        """
+        Fetches all namespaces from the cluster and updates the corresponding class variable
+        """
         namespaces = api.list_namespace(
             field_selector="metadata.name!=kube-system,metadata.name!=kube-public"
         ).items
-        self.logger.debug(
-            format_string.format(len(namespaces), "namespaces", namespaces)
-        )
-        self._current_pods = pods
-        self._current_services = svcs
+        self.logger.debug("Found %s namespaces: %s", len(namespaces), namespaces)
         self.current_namespaces = namespaces
 
+    def cluster_resources(self):
+        """
+        Returns the pods, services and namespaces fetched by the last refresh per resource type
+        """
+        return {
+            "namespaces": self.current_namespaces,
+            "pods": self._current_pods,
+            "services": self._current_services,
+        }
+
     def namespace_exists(self, name, api: k8s.client.CoreV1Api):
         """
         Check if a namespace exists
@@ -244,126 +468,232 @@ class NetworkTestOrchestrator:
             self.logger.debug("Rewritten ports: %s", rewritten_ports)
             port_dict_per_host[host_string] = rewritten_ports
             if not services_for_host:
-                gen_name = "%s-test-target-pod-" % PROJECT_PREFIX
-                target_container = k8s.client.V1Container(
-                    image=self.oci_images["target"], name="runner"
-                )
-                pod_labels_tuple = (ROLE_LABEL, "test_target_pod")
-                target_pod = create_pod_manifest(
-                    host=host,
-                    additional_labels={
-                        pod_labels_tuple[0]: pod_labels_tuple[1],
-                        CLEANUP_LABEL: CLEANUP_ALWAYS,
-                    },
-                    generate_name=gen_name,
-                    container=target_container,
-                )
-                target_ports = [
-                    int(port.replace("-", ""))
-                    for port in port_dict_per_host[host_string].values()
-                ]
-                svc = create_service_manifest(
-                    host,
-                    {pod_labels_tuple[0]: pod_labels_tuple[1]},
-                    {ROLE_LABEL: "test_target_svc", CLEANUP_LABEL: CLEANUP_ALWAYS},
-                    target_ports,
+                resp = self._create_target_for_host(
+                    host, port_dict_per_host[host_string], api
                 )
-                target_pod_namespace = host.namespace
-                resp = api.create_namespaced_pod(
-                    namespace=target_pod_namespace, body=target_pod
-                )
-                if isinstance(resp, k8s.client.V1Pod):
-                    self.logger.debug(
-                        "Target pod %s created succesfully", resp.metadata.name
-                    )
-                    self._current_pods.append(resp)
-                else:
-                    self.logger.error("Failed to create pod! Resp: %s", resp)
-                resp = api.create_namespaced_service(namespace=host.namespace, body=svc)
                 if isinstance(resp, k8s.client.V1Service):
                     service_names_per_host[host_string] = resp.spec.cluster_ip
-                    self.logger.debug(
-                        "Target svc %s created succesfully", resp.metadata.name
-                    )
-                    self._current_services.append(resp)
-                else:
-                    self.logger.error("Failed to create target svc! Resp: %s", resp)
             else:
                 service_names_per_host[host_string] = services_for_host[
                     0
                 ].spec.cluster_ip
         return service_names_per_host, port_dict_per_host
 
+    def _create_target_for_host(self, host, rewritten_ports, api):
+        pod_labels_tuple = (ROLE_LABEL, "test_target_pod")
+        service_ports = [
+            int(port.replace("-", "")) for port in rewritten_ports.values()
+        ]
+        selector_labels = {pod_labels_tuple[0]: pod_labels_tuple[1]}
+        target_ports = None
+        if self.target_mode == TARGET_MODE_BUILTIN:
+            # the builtin target listens on the original port, so policies are evaluated for it
+            target_ports = [
+                int(port.replace("-", "")) if "*" not in port else service_port
+                for port, service_port in zip(rewritten_ports.keys(), service_ports)
+            ]
+            marker_label = _target_marker_label(host)
+            selector_labels[marker_label] = "true"
+            self._pending_target_hosts.append((host, marker_label, target_ports))
+        else:
+            gen_name = "%s-test-target-pod-" % PROJECT_PREFIX
+            target_container = k8s.client.V1Container(
+                image=self.oci_images["target"], name="runner"
+            )
+            target_pod = create_pod_manifest(
+                host=host,
+                additional_labels={
+                    pod_labels_tuple[0]: pod_labels_tuple[1],
+                    CLEANUP_LABEL: CLEANUP_ALWAYS,
+                },
+                generate_name=gen_name,
+                container=target_container,
+            )
+            self._create_target_pod(target_pod, api)
+        svc = create_service_manifest(
+            host,
+            selector_labels,
+            {ROLE_LABEL: "test_target_svc", CLEANUP_LABEL: CLEANUP_ALWAYS},
+            service_ports,
+            target_ports,
+        )
+        resp = api.create_namespaced_service(namespace=host.namespace, body=svc)
+        if isinstance(resp, k8s.client.V1Service):
+            self.logger.debug("Target svc %s created succesfully", resp.metadata.name)
+            self._current_services.append(resp)
+        else:
+            self.logger.error("Failed to create target svc! Resp: %s", resp)
+        return resp
+
+    def _create_target_pod(self, target_pod, api: k8s.client.CoreV1Api):
+        resp = api.create_namespaced_pod(
+            namespace=target_pod.metadata.namespace, body=target_pod
+        )
+        if isinstance(resp, k8s.client.V1Pod):
+            self.logger.debug("Target pod %s created succesfully", resp.metadata.name)
+            self._current_pods.append(resp)
+        else:
+            self.logger.error("Failed to create pod! Resp: %s", resp)
+        return resp
+
+    def _create_pending_target_pods(self, known_hosts, api: k8s.client.CoreV1Api):
+        """
+        Creates the builtin target pods for all hosts without a service,
+        consolidating hosts onto as few pods as their labels allow
+        """
+        groups = group_target_hosts(
+            self._pending_target_hosts, known_hosts, self.network_policies
+        )
+        self.logger.debug(
+            "Consolidated %s target hosts onto %s pods",
+            len(self._pending_target_hosts),
+            len(groups),
+        )
+        for group in groups:
+            labels = {ROLE_LABEL: "test_target_pod", CLEANUP_LABEL: CLEANUP_ALWAYS}
+            ports = set()
+            for host, marker_label, target_ports in group:
+                labels.update(host.pod_labels)
+                labels[marker_label] = "true"
+                ports.update(target_ports)
+            namespace = group[0][0].namespace
+            target_container = k8s.client.V1Container(
+                image=self.oci_images["runner"],
+                name="target",
+                command=["illuminatio-target"],
+                args=[str(port) for port in sorted(ports)],
+                ports=[
+                    k8s.client.V1ContainerPort(container_port=port)
+                    for port in sorted(ports)
+                ],
+            )
+            target_pod = create_pod_manifest(
+                host=ClusterHost(namespace, {}),
+                additional_labels=labels,
+                generate_name="%s-test-target-pod-" % PROJECT_PREFIX,
+                container=target_container,
+            )
+            self._create_target_pod(target_pod, api)
+        self._pending_target_hosts = []
+
     def _find_or_create_cluster_resources_for_cases(
-        self, cases_dict, api: k8s.client.CoreV1Api
+        self, table: CaseTable, api: k8s.client.CoreV1Api
     ):
         resolved_cases = {}
         from_host_mappings = {}
         to_host_mappings = {}
         port_mappings = {}
-        for from_host_string, target_dict in cases_dict.items():
-            from_host = Host.from_identifier(from_host_string)
-            self.logger.debug("Searching pod for host %s", from_host)
-            if not isinstance(from_host, (ClusterHost, GenericClusterHost)):
-                raise ValueError(
-                    "Only ClusterHost and GenericClusterHost fromHosts are supported by this Orchestrator"
-                )
-            namespaces_for_host = self._find_or_create_namespace_for_host(
-                from_host, api
+        senders = table.group_by(SENDER)
+        pods_per_host = {
+            from_host_string: self._find_or_create_pods_for_host(from_host_string, api)
+            for from_host_string, _ in senders
+        }
+        probes_per_host = {
+            from_host_string: len(rows) for from_host_string, rows in senders
+        }
+        if self.pod_classes is not None:
+            pods_per_host = {
+                host_string: self.pod_classes.representatives(pods)
+                for host_string, pods in pods_per_host.items()
+            }
+            sender_pods = select_class_senders(pods_per_host)
+            self.class_members = self.pod_classes.membership(
+                {_pod_identifier(pod) for pod in sender_pods.values()}
             )
-            from_host = ClusterHost(
-                namespaces_for_host[0].metadata.name, from_host.pod_labels
+            self.logger.info(
+                "Probing from %s class representatives for %s hosts",
+                len({_pod_identifier(pod) for pod in sender_pods.values()}),
+                len(sender_pods),
             )
-            self.logger.debug("Updated fromHost with found namespace: %s", from_host)
-            pods_for_host = [
-                pod for pod in self._current_pods if from_host.matches(pod)
-            ]
-            # create pod if none for fromHost is in cluster (and add it to podsForHost)
-            if not pods_for_host:
-                self.logger.debug("Creating dummy pod for host %s", from_host)
-                additional_labels = {
-                    ROLE_LABEL: "from_host_dummy",
-                    CLEANUP_LABEL: CLEANUP_ALWAYS,
-                }
-                # TODO replace 'dummy' with a more suitable name to prevent potential conflicts
-                container = k8s.client.V1Container(
-                    image=self.oci_images["target"], name="dummy"
-                )
-                dummy = create_pod_manifest(
-                    from_host, additional_labels, f"{PROJECT_PREFIX}-dummy-", container
-                )
-                resp = api.create_namespaced_pod(dummy.metadata.namespace, dummy)
-                if isinstance(resp, k8s.client.V1Pod):
-                    self.logger.debug(
-                        "Dummy pod %s created succesfully", resp.metadata.name
-                    )
-                    pods_for_host = [resp]
-                    self._current_pods.append(resp)
-                else:
-                    self.logger.error("Failed to create dummy pod! Resp: %s", resp)
-            else:
-                self.logger.debug(
-                    "Pods matching %s already exist: ", from_host, pods_for_host
-                )
+        else:
+            sender_pods = select_sender_pods(pods_per_host, probes_per_host)
+        self._sender_pods = list(
+            {_pod_identifier(pod): pod for pod in sender_pods.values()}.values()
+        )
+        # each target is resolved once, with the ports of all its senders
+        (
+            target_names,
+            target_port_names,
+        ) = self._get_target_names_creating_them_if_missing(
+            table.ports_per_target(), api
+        )
+        for from_host_string, rows in senders:
+            sender_pod = sender_pods[from_host_string]
+            target_dict = table.targets_of(rows)
             # resolve target names for fromHost and add them to resolved cases dict
-            pod_identifier = "%s:%s" % (
-                pods_for_host[0].metadata.namespace,
-                pods_for_host[0].metadata.name,
-            )
+            pod_identifier = _pod_identifier(sender_pod)
             self.logger.debug("Mapped pod_identifier: %s", pod_identifier)
             from_host_mappings[from_host_string] = pod_identifier
-            (
-                names_per_host,
-                port_names_per_host,
-            ) = self._get_target_names_creating_them_if_missing(target_dict, api)
+            names_per_host = {
+                target: target_names[target]
+                for target in target_dict
+                if target in target_names
+            }
+            port_names_per_host = {
+                target: {port: target_port_names[target][port] for port in ports}
+                for target, ports in target_dict.items()
+            }
             to_host_mappings[from_host_string] = names_per_host
             port_mappings[from_host_string] = port_names_per_host
-            resolved_cases[pod_identifier] = {
-                names_per_host[t]: [port_names_per_host[t][p] for p in target_dict[t]]
-                for t in target_dict
-            }
+            # hosts sharing a sender share its probes, each target and port is probed once
+            sender_cases = resolved_cases.setdefault(pod_identifier, {})
+            for target in target_dict:
+                ports = sender_cases.setdefault(names_per_host[target], [])
+                for port in target_dict[target]:
+                    if port_names_per_host[target][port] not in ports:
+                        ports.append(port_names_per_host[target][port])
+        if self._pending_target_hosts:
+            known_hosts = [Host.from_identifier(h) for h in table.hosts]
+            self._create_pending_target_pods(known_hosts, api)
         return resolved_cases, from_host_mappings, to_host_mappings, port_mappings
 
+    def _find_or_create_pods_for_host(self, from_host_string, api):
+        from_host = Host.from_identifier(from_host_string)
+        self.logger.debug("Searching pod for host %s", from_host)
+        if not isinstance(from_host, (ClusterHost, GenericClusterHost)):
+            raise ValueError(
+                "Only ClusterHost and GenericClusterHost fromHosts are supported by this Orchestrator"
+            )
+        namespaces_for_host = self._find_or_create_namespace_for_host(from_host, api)
+        from_host = ClusterHost(
+            namespaces_for_host[0].metadata.name, from_host.pod_labels
+        )
+        self.logger.debug("Updated fromHost with found namespace: %s", from_host)
+        pods_for_host = [pod for pod in self._current_pods if from_host.matches(pod)]
+        # create pod if none for fromHost is in cluster (and add it to podsForHost)
+        if not pods_for_host:
+            self.logger.debug("Creating dummy pod for host %s", from_host)
+            additional_labels = {
+                ROLE_LABEL: "from_host_dummy",
+                CLEANUP_LABEL: CLEANUP_ALWAYS,
+            }
+            # TODO replace 'dummy' with a more suitable name to prevent potential conflicts
+            container = k8s.client.V1Container(
+                image=self.oci_images["target"], name="dummy"
+            )
+            dummy = create_pod_manifest(
+                from_host, additional_labels, f"{PROJECT_PREFIX}-dummy-", container
+            )
+            if self.spread_dummy_pods:
+                dummy.spec.affinity = create_spread_affinity(
+                    {ROLE_LABEL: "from_host_dummy"},
+                    [ns.metadata.name for ns in self.current_namespaces],
+                )
+            resp = api.create_namespaced_pod(dummy.metadata.namespace, dummy)
+            if isinstance(resp, k8s.client.V1Pod):
+                self.logger.debug(
+                    "Dummy pod %s created succesfully", resp.metadata.name
+                )
+                pods_for_host = [resp]
+                self._current_pods.append(resp)
+            else:
+                self.logger.error("Failed to create dummy pod! Resp: %s", resp)
+        else:
+            self.logger.debug(
+                "Pods matching %s already exist: %s", from_host, pods_for_host
+            )
+        return pods_for_host
+
     def _find_or_create_namespace_for_host(self, from_host, api):
         namespaces_for_host = [
             ns for ns in self.current_namespaces if from_host.matches(ns)
@@ -403,23 +733,25 @@ class NetworkTestOrchestrator:
         Ensures that all required resources for testing are created
         """
         # TODO split up this method
-        supported_cases = [
-            case for case in self.test_cases if _hosts_are_in_cluster(case)
-        ]
-        filtered_cases = [
-            case for case in self.test_cases if case not in supported_cases
-        ]
+        # cases read from line-oriented files arrive as a table, without an object per case
+        cases = (
+            self.test_cases
+            if isinstance(self.test_cases, CaseTable)
+            else CaseTable.from_cases(self.test_cases)
+        )
+        table = cases.filter_hosts(_host_is_in_cluster)
         self.logger.debug(
-            "Filtered %s test cases: %s", len(filtered_cases), filtered_cases
+            "Filtered %s test cases, %s cases on %s hosts remain",
+            len(cases) - len(table),
+            len(table),
+            len(table.hosts),
         )
-        cases_dict = merge_in_dict(supported_cases)
-        self.logger.debug("Created casesDict: %s from %s", cases_dict, supported_cases)
         (
             concrete_cases,
             from_host_mappings,
             to_host_mappings,
             port_mappings,
-        ) = self._find_or_create_cluster_resources_for_cases(cases_dict, core_api)
+        ) = self._find_or_create_cluster_resources_for_cases(table, core_api)
         self.logger.debug("concreteCases: %s", concrete_cases)
         config_map_name = f"{PROJECT_PREFIX}-cases-cfgmap"
         self._create_or_update_case_config_map(
@@ -448,10 +780,31 @@ class NetworkTestOrchestrator:
             service_account_name, PROJECT_NAMESPACE
         )
 
+        runner_affinity = None
+        if self.restrict_runners:
+            self.sender_nodes = self._wait_for_sender_nodes(core_api)
+            if self.sender_nodes:
+                self.logger.info(
+                    "Restricting runners to %s nodes hosting senders",
+                    len(self.sender_nodes),
+                )
+                runner_affinity = k8s.client.ApiClient().sanitize_for_serialization(
+                    create_node_name_affinity(self.sender_nodes)
+                )
+            else:
+                self.logger.warning(
+                    "No sender was scheduled to a node, running runners on all nodes"
+                )
+
         # Ensure that our DaemonSet and the Pods are running/ready
         daemonset_name = f"{PROJECT_PREFIX}-runner"
         self._ensure_daemonset_exists(
-            daemonset_name, service_account_name, config_map_name, apps_api, cri_socket
+            daemonset_name,
+            service_account_name,
+            config_map_name,
+            apps_api,
+            cri_socket,
+            runner_affinity,
         )
         pod_selector = self._ensure_daemonset_ready(daemonset_name, apps_api)
 
@@ -475,6 +828,14 @@ class NetworkTestOrchestrator:
                 PROJECT_NAMESPACE, label_selector=labels_to_string(pod_selector)
             ).items
             self.logger.debug("Found %s daemon runner pods", len(daemon_pods))
+            if self.restrict_runners and self.sender_nodes:
+                daemon_pods = [
+                    d for d in daemon_pods if d.spec.node_name in self.sender_nodes
+                ]
+                self.logger.debug(
+                    "Expecting results from %s runners on sender nodes",
+                    len(daemon_pods),
+                )
         except k8s.client.rest.ApiException as api_exception:
             self.logger.error(api_exception)
 
@@ -500,15 +861,37 @@ class NetworkTestOrchestrator:
             )
             self.logger.debug("Expected names: %s", expected_result_map_names)
             time.sleep(2)
-        yamls = [yaml.safe_load(c.data["results"]) for c in result_config_maps]
+        yamls = [yaml_load(c.data["results"]) for c in result_config_maps]
         self.logger.debug("Found following yamls in result config maps:%s", yamls)
         times = {
-            c.metadata.name: yaml.safe_load(c.data["runtimes"])
+            c.metadata.name: yaml_load(c.data["runtimes"])
             for c in result_config_maps
             if "runtimes" in c.data
         }
+        if TRACER.enabled:
+            self._collect_traces(daemon_pods, api)
         return {k: v for yam in [y.items() for y in yamls] for k, v in yam}, times
 
+    def _collect_traces(self, daemon_pods, api: k8s.client.CoreV1Api):
+        """
+        Stitches the traces runners store next to their results into the local trace,
+        runners whose trace could not be stored are skipped
+        """
+        for daemon_pod in daemon_pods:
+            name = f"{daemon_pod.metadata.name}-trace"
+            try:
+                config_map = api.read_namespaced_config_map(
+                    name=name, namespace=PROJECT_NAMESPACE
+                )
+            except k8s.client.rest.ApiException as api_exception:
+                if api_exception.reason != "Not Found":
+                    raise api_exception
+                self.logger.warning("Runner trace %s not found", name)
+                continue
+            TRACER.add_remote_events(
+                json.loads(config_map.data["trace"]), daemon_pod.metadata.name
+            )
+
     def create_daemonset_manifest(
         self,
         daemon_set_name: str,
@@ -538,7 +921,7 @@ class NetworkTestOrchestrator:
                 f"Unsupported container runtime: {container_runtime}"
             )
 
-        return self.template_manifest(
+        manifest = self.template_manifest(
             "runner-daemonset.yaml",
             cri_socket=cri_socket,
             netns_path=netns_path,
@@ -549,7 +932,12 @@ class NetworkTestOrchestrator:
             service_account_name=service_account_name,
             config_map_name=config_map_name,
             log_level=logging.getLevelName(self.logger.level),
+            # runners only record spans when the orchestrator's trace is exported
+            trace="true" if TRACER.enabled else "false",
         )
+        if self.runner_metrics:
+            _add_metrics_endpoint(manifest["spec"]["template"]["spec"]["containers"][0])
+        return manifest
 
     def create_daemonset(self, daemon_manifest, api):
         """
@@ -569,12 +957,21 @@ class NetworkTestOrchestrator:
         config_map_name: str,
         api: k8s.client.AppsV1Api,
         cri_socket: str,
+        affinity=None,
     ):
         # Use a Kubernetes Manifest as template and replace required parts
         try:
-            api.read_namespaced_daemon_set(
+            daemonset = api.read_namespaced_daemon_set(
                 namespace=PROJECT_NAMESPACE, name=daemonset_name
             )
+            if affinity is not None or daemonset.spec.template.spec.affinity:
+                # runners of a previous run may be restricted to other nodes
+                self.logger.debug("Updating affinity of DaemonSet %s", daemonset_name)
+                api.patch_namespaced_daemon_set(
+                    daemonset_name,
+                    PROJECT_NAMESPACE,
+                    {"spec": {"template": {"spec": {"affinity": affinity}}}},
+                )
         except k8s.client.rest.ApiException as api_exception:
             if api_exception.reason == "Not Found":
                 daemonset_manifest = self.create_daemonset_manifest(
@@ -584,10 +981,51 @@ class NetworkTestOrchestrator:
                     get_container_runtime(),
                     cri_socket,
                 )
+                if affinity is not None:
+                    daemonset_manifest["spec"]["template"]["spec"][
+                        "affinity"
+                    ] = affinity
                 self.create_daemonset(daemonset_manifest, api)
             else:
                 raise api_exception
 
+    def _wait_for_sender_nodes(self, api: k8s.client.CoreV1Api):
+        """
+        Returns the names of all nodes hosting sender pods,
+        waiting for freshly created senders to be scheduled
+        """
+        # This should be configurable
+        max_tries = 30
+        sleep_time = 2
+
+        sender_nodes = set()
+        unscheduled = []
+        for pod in self._sender_pods:
+            if pod.spec is not None and pod.spec.node_name:
+                sender_nodes.add(pod.spec.node_name)
+            else:
+                unscheduled.append(pod)
+        tries = 0
+        while unscheduled and tries <= max_tries:
+            self.logger.debug(
+                "Waiting for %s senders to be scheduled", len(unscheduled)
+            )
+            pods = [
+                api.read_namespaced_pod(pod.metadata.name, pod.metadata.namespace)
+                for pod in unscheduled
+            ]
+            sender_nodes.update(p.spec.node_name for p in pods if p.spec.node_name)
+            unscheduled = [p for p in pods if not p.spec.node_name]
+            if unscheduled:
+                time.sleep(sleep_time)
+                tries += 1
+        if unscheduled:
+            self.logger.error(
+                "Senders %s were not scheduled, their cases will not be run",
+                [pod.metadata.name for pod in unscheduled],
+            )
+        return sorted(sender_nodes)
+
     def _ensure_daemonset_ready(self, daemonset_name, api: k8s.client.AppsV1Api):
         # This should be configurable
         max_tries = 30
@@ -600,12 +1038,17 @@ class NetworkTestOrchestrator:
                 daemonset = api.read_namespaced_daemon_set(
                     namespace=PROJECT_NAMESPACE, name=daemonset_name
                 )
-                ready = daemonset.status.number_ready
-                scheduled = daemonset.status.desired_number_scheduled
+                status = daemonset.status
+                ready = status.number_ready
+                scheduled = status.desired_number_scheduled
+                # a status from before the last patch may count runners on nodes that were just removed
+                rolled_out = (status.observed_generation or 0) >= (
+                    daemonset.metadata.generation or 0
+                ) and (status.updated_number_scheduled or 0) == scheduled
 
                 # Todo this will print 0/0 if the DaemonSet is not initialized
                 self.logger.debug(f"DaemonSet {ready}/{scheduled} Pods are ready")
-                if scheduled > 0 and scheduled == ready:
+                if scheduled > 0 and scheduled == ready and rolled_out:
                     return daemonset.spec.selector.match_labels
             except k8s.client.rest.ApiException as api_exception:
                 self.logger.error(api_exception)
@@ -622,7 +1065,7 @@ class NetworkTestOrchestrator:
             labels={CLEANUP_LABEL: CLEANUP_ALWAYS},
         )
         cfg_map = k8s.client.V1ConfigMap(metadata=cfg_map_meta)
-        cfg_map.data = {"cases.yaml": yaml.dump(cases_dict)}
+        cfg_map.data = {"cases.yaml": yaml_dump(cases_dict)}
         try:
             api.read_namespaced_config_map(
                 name=config_map_name, namespace=PROJECT_NAMESPACE
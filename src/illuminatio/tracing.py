@@ -0,0 +1,142 @@
+"""
+File containing a lightweight tracing facility with nested spans,
+exported in the Chrome trace event format (readable by chrome://tracing and Perfetto)
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Span:
+    """
+    Class for a single timed operation with attributes
+    """
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = attributes if attributes is not None else {}
+        self.start = time.time()
+        self.end = None
+
+    @property
+    def duration(self):
+        """
+        Returns the duration of the span in seconds, measured up to now if it has not ended yet
+        """
+        return (self.end if self.end is not None else time.time()) - self.start
+
+    def set_attribute(self, key, value):
+        """
+        Adds an attribute to the span
+        """
+        self.attributes[key] = value
+
+
+class Tracer:
+    """
+    Class collecting the spans of a process.
+    Spans are always timed, so their durations can be used for runtime reports,
+    but they are only recorded for export while the tracer is enabled.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.pid = os.getpid()
+        self.events = []
+        self._remote_processes = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        """
+        Starts recording spans
+        """
+        self.enabled = True
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Times the enclosed block as a span nested into any enclosing span of the same thread
+        """
+        current_span = Span(name, attributes)
+        try:
+            yield current_span
+        finally:
+            current_span.end = time.time()
+            if self.enabled:
+                self._record(current_span)
+
+    def traced(self, name):
+        """
+        Decorator tracing each call of the decorated function as a span
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def _record(self, span):
+        event = {
+            "name": span.name,
+            "cat": "illuminatio",
+            "ph": "X",
+            "ts": int(span.start * 1e6),
+            "dur": int((span.end - span.start) * 1e6),
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "args": {key: _json_safe(value) for key, value in span.attributes.items()},
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def add_remote_events(self, events, process_name):
+        """
+        Stitches events recorded by another process, e.g. a runner, into this trace.
+        Timestamps are absolute, so the remote spans line up with the local ones.
+        """
+        with self._lock:
+            if process_name not in self._remote_processes:
+                remote_pid = self.pid + len(self._remote_processes) + 1
+                self._remote_processes[process_name] = remote_pid
+                self.events.append(
+                    {
+                        "name": "process_name",
+                        "ph": "M",
+                        "pid": remote_pid,
+                        "args": {"name": process_name},
+                    }
+                )
+            remote_pid = self._remote_processes[process_name]
+            for event in events:
+                self.events.append(dict(event, pid=remote_pid))
+
+    def to_dict(self):
+        """
+        Returns all recorded events in the Chrome trace event format
+        """
+        with self._lock:
+            return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+    def write(self, filename):
+        """
+        Writes all recorded events to a trace file
+        """
+        with open(filename, "w") as trace_file:
+            json.dump(self.to_dict(), trace_file)
+
+
+def _json_safe(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+TRACER = Tracer()
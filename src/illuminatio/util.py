@@ -1,15 +1,31 @@
 """
 Contains several illuminatio constants especially names and some util functions
 """
+from collections.abc import Mapping
 from random import choice
 from dataclasses import dataclass
 from functools import partial
-from typing import Callable, Any, IO, Optional
+from typing import Callable, Any, IO, Iterator, Optional
 import os
 import json
+import re
 import sys
 import yaml
 
+# optional accelerated backends, the standard library and pure python PyYAML are the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# the libyaml bindings are only there if PyYAML was built against libyaml
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 PROJECT_PREFIX = "illuminatio"
 PROJECT_NAMESPACE = PROJECT_PREFIX
 CLEANUP_LABEL = "%s-cleanup" % PROJECT_PREFIX
@@ -32,15 +48,140 @@ class Format:
 
     load: Callable[[IO[bytes]], Any]
     dump: Callable[[Any, IO[str]], None]
+    # line-oriented formats dump any iterable of records and read them back one at a time
+    iterate: Optional[Callable[[IO[str]], Iterator[Any]]] = None
+    # binary formats are read and written as bytes
+    binary: bool = False
+
+    @property
+    def streaming(self) -> bool:
+        """
+        Whether records are written and read one at a time
+        """
+        return self.iterate is not None
+
+
+def yaml_load(stream):
+    """
+    Safely loads YAML, with libyaml if available
+    """
+    return yaml.load(stream, Loader=YAML_LOADER)
+
+
+def yaml_load_all(stream):
+    """
+    Safely loads all documents of a YAML stream, with libyaml if available
+    """
+    return yaml.load_all(stream, Loader=YAML_LOADER)
+
+
+def yaml_dump(data, stream=None, **kwargs):
+    """
+    Safely dumps YAML, with libyaml if available
+    """
+    return yaml.dump(data, stream, Dumper=YAML_DUMPER, **kwargs)
+
+
+# longer digit runs may be integers beyond 64 bit, which orjson loads as floats
+_LONG_DIGITS = re.compile(rb"\d{20}")
+
+
+def _json_loads(raw):
+    if orjson is not None:
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+        if _LONG_DIGITS.search(raw) is None:
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                # e.g. NaN and Infinity, which the standard library accepts
+                pass
+    return json.loads(raw)
+
+
+def _orjson_encodable(data):
+    """
+    Checks whether orjson encodes the data exactly like the standard library does,
+    which is not the case for non-ASCII text, floats and integers beyond 64 bit
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            if not value.isascii():
+                return False
+        elif isinstance(value, dict):
+            if not all(isinstance(key, str) and key.isascii() for key in value):
+                return False
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, bool) or value is None:
+            continue
+        elif isinstance(value, int):
+            if not -(2**63) <= value < 2**64:
+                return False
+        else:
+            return False
+    return True
+
+
+def _json_load(file):
+    return _json_loads(file.read())
+
 
+def _json_dump(data, file):
+    if orjson is not None and _orjson_encodable(data):
+        file.write(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8"))
+        return
+    json.dump(data, file, indent=2)
 
-JSON = Format(json.load, partial(json.dump, indent=2))
-YAML = Format(yaml.safe_load, partial(yaml.safe_dump, default_flow_style=False))
+
+def _json_line(record):
+    if orjson is not None and _orjson_encodable(record):
+        return orjson.dumps(record).decode("utf-8")
+    return json.dumps(record, separators=(",", ":"))
+
+
+def _iter_ndjson(file):
+    for line in file:
+        if line.strip():
+            yield _json_loads(line)
+
+
+def _load_ndjson(file):
+    return list(_iter_ndjson(file))
+
+
+def _dump_ndjson(records, file):
+    for record in records:
+        file.write(_json_line(record))
+        file.write("\n")
+
+
+def _msgpack_load(file):
+    return msgpack.unpack(file, raw=False, strict_map_key=False)
+
+
+def _msgpack_dump(data, file):
+    msgpack.pack(data, file, use_bin_type=True)
+
+
+JSON = Format(_json_load, _json_dump)
+YAML = Format(yaml_load, partial(yaml_dump, default_flow_style=False))
+NDJSON = Format(_load_ndjson, _dump_ndjson, _iter_ndjson)
+MSGPACK = (
+    Format(_msgpack_load, _msgpack_dump, binary=True) if msgpack is not None else None
+)
 
 FORMATS = {
     "json": JSON,
     "yaml": YAML,
     "yml": YAML,
+    "ndjson": NDJSON,
+    "jsonl": NDJSON,
+    # None if the msgpack package is not installed
+    "msgpack": MSGPACK,
 }
 
 
@@ -71,6 +212,11 @@ def format_for(
     else:
         fmt = JSON
 
+    if not fmt and format_name in FORMATS:
+        raise ValueError(
+            "Format %s needs the %s package, install illuminatio[fast]"
+            % (format_name, format_name)
+        )
     if not fmt:
         raise ValueError("Unknown format %s" % format_name)
     return fmt
@@ -84,6 +230,15 @@ def write_formatted(
     """
     fmt = format_for(filename, format_name)
 
+    if fmt.streaming and isinstance(data, Mapping):
+        # iterating a mapping would only write its keys
+        raise ValueError(
+            "Cannot write %s record by record, use YAML or JSON" % filename
+        )
+    if fmt.binary:
+        with open_or_std(filename, sys.stdout.buffer, "wb") as file:
+            fmt.dump(data, file)
+        return
     with open_or_std(filename, sys.stdout, "w") as file:
         fmt.dump(data, file)
 
@@ -94,10 +249,27 @@ def read_formatted(filename: str, format_name: Optional[str] = None) -> Any:
     """
     fmt = format_for(filename, format_name)
 
-    with open_or_std(filename, sys.stdin, "r") as file:
+    with open_or_std(
+        filename,
+        sys.stdin.buffer if fmt.binary else sys.stdin,
+        "rb" if fmt.binary else "r",
+    ) as file:
         return fmt.load(file)
 
 
+def iter_formatted(filename: str, format_name: Optional[str] = None) -> Iterator[Any]:
+    """
+    Yields the records of a file in a line-oriented format while reading it,
+    inferring the format from the filename if not specified explicitly.
+    """
+    fmt = format_for(filename, format_name)
+    if not fmt.streaming:
+        raise ValueError("Cannot read %s record by record, use NDJSON" % filename)
+
+    with open_or_std(filename, sys.stdin, "r") as file:
+        yield from fmt.iterate(file)
+
+
 def validate_cleanup_in(labels):
     """
     Validates the presence of the CLEANUP_LABEL and its values in a list of labels, raises ValueError otherwise
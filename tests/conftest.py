@@ -11,6 +11,8 @@ from __future__ import print_function, absolute_import, division
 
 import pytest
 
+from illuminatio.fake_cluster import FakeCluster
+
 
 def pytest_addoption(parser):
     parser.addoption(
@@ -26,3 +28,20 @@ def pytest_collection_modifyitems(config, items):
     for item in items:
         if "slow" in item.keywords:
             item.add_marker(skip_slow)
+
+
+@pytest.fixture
+def fake_cluster():
+    """
+    In-process fake kubernetes API server, stopped after the test
+    """
+    with FakeCluster(seed=0) as cluster:
+        yield cluster
+
+
+@pytest.fixture(autouse=True)
+def case_cache_dir(tmp_path, monkeypatch):
+    """
+    Keeps test case caches of CLI invocations out of the user's cache directory
+    """
+    monkeypatch.setenv("ILLUMINATIO_CACHE_DIR", str(tmp_path / "case-cache"))
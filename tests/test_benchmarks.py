@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from benchmarks import (
+    host_parse_benchmark,
+    serialization_benchmark,
+    simulator_benchmark,
+)
+from benchmarks.run_benchmarks import cli
+from benchmarks.synthetic_cluster import SyntheticCluster
+
+
+def test_synthetic_cluster_is_deterministic():
+    first = SyntheticCluster(namespaces=3, pods=20, policies=10, seed=1)
+    second = SyntheticCluster(namespaces=3, pods=20, policies=10, seed=1)
+    assert [p.to_dict() for p in first.policies] == [
+        p.to_dict() for p in second.policies
+    ]
+    assert len(first.pods) == 20
+    assert len(first.services) == len(
+        {(p.metadata.namespace, p.metadata.labels["app"]) for p in first.pods}
+    )
+
+
+def test_benchmark_appends_results(tmp_path):
+    results_file = tmp_path / "results.jsonl"
+    arguments = [
+        "--namespaces=2",
+        "--pods=10",
+        "--policies=5",
+        "--repeat=1",
+        "--results-file=%s" % results_file,
+    ]
+    for _ in range(2):
+        result = CliRunner().invoke(cli, arguments)
+        assert result.exit_code == 0, result.output
+    entries = [json.loads(line) for line in results_file.read_text().splitlines()]
+    assert len(entries) == 2
+    assert set(entries[0]["stages"]) == {
+        "parse",
+        "generate",
+        "merge",
+        "case-table",
+        "host-resolution",
+        "transform",
+    }
+
+
+def test_simulator_benchmark_compares_simulators(tmp_path):
+    pytest.importorskip("numpy")
+    results_file = tmp_path / "results.jsonl"
+    result = CliRunner().invoke(
+        simulator_benchmark.cli,
+        [
+            "--pods=30",
+            "--namespaces=3",
+            "--policies=10",
+            "--repeat=1",
+            "--results-file=%s" % results_file,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    entry = json.loads(results_file.read_text())
+    assert set(entry["stages"]) == {"bitset", "pairwise"}
+
+
+def test_host_parse_benchmark_reads_cases_file(tmp_path):
+    cases_file = tmp_path / "cases.yaml"
+    cases_file.write_text("default:app=web:\n  localhost: ['80', '-443']\n")
+    results_file = tmp_path / "results.jsonl"
+    result = CliRunner().invoke(
+        host_parse_benchmark.cli,
+        [
+            "--cases-file=%s" % cases_file,
+            "--repeat=1",
+            "--results-file=%s" % results_file,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    entry = json.loads(results_file.read_text())
+    assert entry["identifiers"] == 4
+    assert entry["unique-identifiers"] == 2
+    assert set(entry["stages"]) == {
+        "parse-uncached",
+        "parse-cached",
+        "from-merged-dict",
+    }
+
+
+def test_serialization_benchmark_times_backends(tmp_path):
+    results_file = tmp_path / "results.jsonl"
+    result = CliRunner().invoke(
+        serialization_benchmark.cli,
+        [
+            "--namespaces=2",
+            "--pods=10",
+            "--policies=5",
+            "--repeat=1",
+            "--results-file=%s" % results_file,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    entry = json.loads(results_file.read_text())
+    assert {"yaml-python", "json"} <= set(entry["backends"])
+    assert "cases-json-dump" in entry["stages"]
+    assert "results-yaml-python-load" in entry["stages"]
@@ -0,0 +1,85 @@
+import os
+
+import kubernetes as k8s
+import pytest
+from click.testing import CliRunner
+
+from illuminatio.case_cache import CaseCache, cache_key
+from illuminatio.illuminatio import cli
+
+
+def _policy(name, labels, resource_version="1"):
+    return k8s.client.V1NetworkPolicy(
+        metadata=k8s.client.V1ObjectMeta(
+            name=name, namespace="default", resource_version=resource_version
+        ),
+        spec=k8s.client.V1NetworkPolicySpec(
+            pod_selector=k8s.client.V1LabelSelector(match_labels=labels), ingress=[]
+        ),
+    )
+
+
+NAMESPACES = [
+    k8s.client.V1Namespace(
+        metadata=k8s.client.V1ObjectMeta(name="default", labels={"team": "a"})
+    )
+]
+
+
+def test_cache_key_is_normalized():
+    web, db = _policy("web", {"app": "web"}), _policy("db", {"app": "db"})
+    key = cache_key([web, db], NAMESPACES)
+    assert cache_key([db, _policy("web", {"app": "web"}, "2")], NAMESPACES) == key
+    assert cache_key([web], NAMESPACES) != key
+    relabeled = [
+        k8s.client.V1Namespace(
+            metadata=k8s.client.V1ObjectMeta(name="default", labels={"team": "b"})
+        )
+    ]
+    assert cache_key([web, db], relabeled) != key
+
+
+def test_cache_roundtrip_and_eviction(tmp_path):
+    cache = CaseCache(str(tmp_path), max_size=10**6)
+    cases = {"default:app=web": {"default:app=db": ["80", "-*"]}}
+    assert cache.get("a") is None
+    cache.put("a", cases)
+    assert cache.get("a") == cases
+    entry_size = cache.entries()[0][1]
+    cache.max_size = 2 * entry_size
+    os.utime(str(tmp_path / "a.json.gz"), (1, 1))
+    cache.put("b", cases)
+    cache.put("c", cases)
+    assert cache.get("a") is None
+    assert cache.get("b") == cache.get("c") == cases
+
+
+def test_unreadable_entries_are_dropped(tmp_path):
+    (tmp_path / "broken.json.gz").write_bytes(b"not gzip")
+    cache = CaseCache(str(tmp_path))
+    assert cache.get("broken") is None
+    assert not (tmp_path / "broken.json.gz").exists()
+
+
+@pytest.mark.parametrize("no_cache", [False, True])
+def test_generate_uses_the_cache(tmp_path, no_cache):
+    manifest = tmp_path / "policy.yaml"
+    manifest.write_text(
+        "apiVersion: networking.k8s.io/v1\n"
+        "kind: NetworkPolicy\n"
+        "metadata: {name: web, namespace: default}\n"
+        "spec: {podSelector: {matchLabels: {app: web}}, ingress: []}\n"
+    )
+    cache_dir = tmp_path / "cache"
+    arguments = ["--cache-dir", str(cache_dir)]
+    if no_cache:
+        arguments.append("--no-cache")
+    outputs = []
+    for _ in range(2):
+        result = CliRunner().invoke(cli, arguments + ["generate", "-f", str(manifest)])
+        assert result.exit_code == 0, result.output
+        outputs.append(result.output)
+    assert outputs[1].endswith(outputs[0])
+    assert ("Using cached test cases" in outputs[1]) != no_cache
+    entries = list(cache_dir.glob("*.json.gz")) if cache_dir.exists() else []
+    assert len(entries) == (0 if no_cache else 1)
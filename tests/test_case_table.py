@@ -0,0 +1,94 @@
+import pytest
+
+from illuminatio.case_table import SENDER, TARGET, CaseTable
+from illuminatio.host import ClusterHost, LocalHost
+from illuminatio.test_case import NetworkTestCase, merge_in_dict
+
+web = ClusterHost("default", {"app": "web"})
+db = ClusterHost("default", {"app": "db"})
+cases = [
+    NetworkTestCase(web, db, 5432, True),
+    NetworkTestCase(LocalHost(), web, 80, True),
+    NetworkTestCase(web, db, 80, False),
+    NetworkTestCase(web, LocalHost(), None, False),
+    NetworkTestCase(LocalHost(), db, 80, True),
+]
+
+
+def test_table_interns_hosts_and_ports():
+    table = CaseTable.from_cases(cases)
+    assert len(table) == 5
+    assert table.hosts == ["default:app=web", "default:app=db", "localhost"]
+    assert table.ports == ["5432", "80", "-80", "-*"]
+    assert list(table.senders) == [0, 2, 0, 0, 2]
+    assert table.row(2) == ("default:app=web", "default:app=db", "-80")
+
+
+def test_merged_dict_matches_merge_in_dict():
+    table = CaseTable.from_cases(cases)
+    assert table.to_merged_dict() == merge_in_dict(cases)
+    assert list(table.to_merged_dict()) == list(merge_in_dict(cases))
+    assert sorted(CaseTable.from_merged_dict(merge_in_dict(cases)).cases()) == sorted(
+        cases
+    )
+
+
+def test_groups_are_views_of_rows():
+    table = CaseTable.from_cases(cases)
+    senders = table.group_by(SENDER)
+    assert [(host, list(rows)) for host, rows in senders] == [
+        ("default:app=web", [0, 2, 3]),
+        ("localhost", [1, 4]),
+    ]
+    assert isinstance(senders.rows("localhost"), memoryview)
+    assert list(table.group_by(TARGET).rows("default:app=db")) == [0, 2, 4]
+    assert list(senders.rows("default:app=db")) == []
+    assert table.targets_of(senders.rows("default:app=web")) == {
+        "default:app=db": ["5432", "-80"],
+        "localhost": ["-*"],
+    }
+    assert table.ports_per_target()["default:app=db"] == ["5432", "-80", "80"]
+
+
+def test_groups_are_recomputed_after_adding():
+    table = CaseTable.from_cases(cases)
+    assert len(table.group_by(SENDER)) == 2
+    table.add("default:app=db", "localhost", "443")
+    assert table.hosts_in(SENDER) == ["default:app=web", "localhost", "default:app=db"]
+
+
+def test_unknown_column_raises():
+    with pytest.raises(ValueError):
+        CaseTable().group_by("port")
+
+
+def test_table_from_records():
+    records = iter(
+        [
+            {"fromHost": "localhost", "toHost": "default:app=web", "port": "80"},
+            {"fromHost": "localhost", "toHost": "10.0.0.1", "port": "-*"},
+        ]
+    )
+    table = CaseTable.from_records(records)
+    assert list(table) == [
+        ("localhost", "default:app=web", "80"),
+        ("localhost", "10.0.0.1", "-*"),
+    ]
+    with pytest.raises(ValueError):
+        CaseTable.from_records([{"fromHost": "localhost", "port": "80"}])
+
+
+def test_filter_hosts_checks_each_host_once():
+    table = CaseTable.from_cases(cases)
+    checked = []
+
+    def is_cluster_host(identifier):
+        checked.append(identifier)
+        return identifier != "localhost"
+
+    filtered = table.filter_hosts(is_cluster_host)
+    assert sorted(checked) == sorted(table.hosts)
+    assert list(filtered) == [
+        ("default:app=web", "default:app=db", "5432"),
+        ("default:app=web", "default:app=db", "-80"),
+    ]
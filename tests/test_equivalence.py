@@ -0,0 +1,101 @@
+import kubernetes as k8s
+
+from benchmarks.synthetic_cluster import SyntheticCluster
+from illuminatio.equivalence import PodEquivalence
+from illuminatio.simulator import PolicySimulator, pod_identifier
+
+
+def _pod(name, labels, namespace="default"):
+    return k8s.client.V1Pod(
+        metadata=k8s.client.V1ObjectMeta(name=name, namespace=namespace, labels=labels)
+    )
+
+
+def _policy(pod_labels, peer_labels):
+    return k8s.client.V1NetworkPolicy(
+        metadata=k8s.client.V1ObjectMeta(name="p", namespace="default"),
+        spec=k8s.client.V1NetworkPolicySpec(
+            pod_selector=k8s.client.V1LabelSelector(match_labels=pod_labels),
+            ingress=[
+                k8s.client.V1NetworkPolicyIngressRule(
+                    _from=[
+                        k8s.client.V1NetworkPolicyPeer(
+                            pod_selector=k8s.client.V1LabelSelector(
+                                match_labels=peer_labels
+                            )
+                        )
+                    ]
+                )
+            ],
+        ),
+    )
+
+
+NAMESPACES = [
+    k8s.client.V1Namespace(metadata=k8s.client.V1ObjectMeta(name="default")),
+    k8s.client.V1Namespace(metadata=k8s.client.V1ObjectMeta(name="other")),
+]
+
+
+def test_replicas_form_one_class():
+    pods = [
+        _pod("web-2", {"app": "web", "pod-template-hash": "b"}),
+        _pod("web-1", {"app": "web", "pod-template-hash": "a"}),
+        _pod("db-1", {"app": "db"}),
+        _pod("client-1", {"app": "client"}),
+        _pod("web-3", {"app": "web"}, namespace="other"),
+    ]
+    equivalence = PodEquivalence(
+        pods, NAMESPACES, [_policy({"app": "web"}, {"app": "client"})]
+    )
+    assert equivalence.membership() == {
+        "default:client-1": ["default:client-1"],
+        "default:db-1": ["default:db-1"],
+        "default:web-1": ["default:web-1", "default:web-2"],
+        "other:web-3": ["other:web-3"],
+    }
+    assert [pod_identifier(p) for p in equivalence.representatives(pods)] == [
+        "default:web-1",
+        "default:db-1",
+        "default:client-1",
+        "other:web-3",
+    ]
+    assert equivalence.class_of(_pod("new", {})) is None
+
+
+def test_members_of_a_class_are_reached_alike():
+    cluster = SyntheticCluster(namespaces=4, pods=150, policies=30, seed=2)
+    equivalence = PodEquivalence(cluster.pods, cluster.namespaces, cluster.policies)
+    assert len(equivalence) < len(cluster.pods)
+    simulator = PolicySimulator(cluster.pods, cluster.namespaces, cluster.policies)
+    index = {pod_identifier(pod): i for i, pod in enumerate(simulator.pods)}
+    for pod_class in equivalence.classes:
+        members = [index[member] for member in pod_class.identifiers()]
+        others = [i for i in range(len(simulator.pods)) if i not in members]
+        rows = {
+            tuple(simulator.is_allowed(member, other, 80) for other in others)
+            + tuple(simulator.is_allowed(other, member, 80) for other in others)
+            for member in members
+        }
+        assert len(rows) == 1
+
+
+def _deny_all(pod_labels, direction):
+    return k8s.client.V1NetworkPolicy(
+        metadata=k8s.client.V1ObjectMeta(name="deny", namespace="default"),
+        spec=k8s.client.V1NetworkPolicySpec(
+            pod_selector=k8s.client.V1LabelSelector(match_labels=pod_labels),
+            ingress=[] if direction == "Ingress" else None,
+            egress=[] if direction == "Egress" else None,
+            policy_types=[direction],
+        ),
+    )
+
+
+def test_deny_all_separates_isolated_pods():
+    pods = [_pod("a", {"app": "a"}), _pod("b", {"app": "b"})]
+    for direction in ("Ingress", "Egress"):
+        equivalence = PodEquivalence(
+            pods, NAMESPACES, [_deny_all({"app": "b"}, direction)]
+        )
+        assert len(equivalence) == 2
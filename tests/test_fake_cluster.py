@@ -0,0 +1,174 @@
+import time
+
+import kubernetes as k8s
+import pytest
+
+from illuminatio.cleaner import Cleaner
+from illuminatio.fake_cluster import json_patch, merge_patch
+
+
+def _pod(name, namespace, labels, generate_name=None):
+    return k8s.client.V1Pod(
+        metadata=k8s.client.V1ObjectMeta(
+            name=name, generate_name=generate_name, namespace=namespace, labels=labels
+        ),
+        spec=k8s.client.V1PodSpec(
+            containers=[k8s.client.V1Container(name="app", image="nginx")]
+        ),
+    )
+
+
+def _node(name):
+    return k8s.client.V1Node(metadata=k8s.client.V1ObjectMeta(name=name))
+
+
+@pytest.fixture
+def core_api(fake_cluster):
+    return k8s.client.CoreV1Api(fake_cluster.api_client())
+
+
+def test_list_with_label_and_field_selectors(fake_cluster, core_api):
+    fake_cluster.add(
+        _node("node-a"),
+        _pod("web-1", "default", {"app": "web"}),
+        _pod("web-2", "other", {"app": "web", "tier": "front"}),
+        _pod("db-1", "default", {"app": "db"}),
+    )
+    pods = core_api.list_pod_for_all_namespaces(label_selector="app=web")
+    assert sorted(p.metadata.name for p in pods.items) == ["web-1", "web-2"]
+    pods = core_api.list_namespaced_pod("default", label_selector="app in (web,db)")
+    assert len(pods.items) == 2
+    pods = core_api.list_pod_for_all_namespaces(label_selector="app,!tier")
+    assert sorted(p.metadata.name for p in pods.items) == ["db-1", "web-1"]
+    pods = core_api.list_pod_for_all_namespaces(field_selector="metadata.name=db-1")
+    assert [p.metadata.name for p in pods.items] == ["db-1"]
+    assert pods.items[0].spec.node_name == "node-a"
+    assert pods.items[0].status.phase == "Running"
+
+
+def test_create_with_generate_name_and_conflict(core_api):
+    created = core_api.create_namespaced_pod(
+        "default", _pod(None, "default", {"a": "b"}, generate_name="dummy-")
+    )
+    assert created.metadata.name.startswith("dummy-")
+    assert created.status.pod_ip is not None
+    with pytest.raises(k8s.client.rest.ApiException) as error:
+        core_api.create_namespaced_pod(
+            "default", _pod(created.metadata.name, "default", {})
+        )
+    assert error.value.status == 409
+
+
+def test_patch_and_delete(fake_cluster, core_api):
+    core_api.create_namespaced_config_map(
+        "default",
+        k8s.client.V1ConfigMap(
+            metadata=k8s.client.V1ObjectMeta(name="cfg", labels={"keep": "no"}),
+            data={"a": "1"},
+        ),
+    )
+    patched = core_api.patch_namespaced_config_map(
+        "cfg", "default", {"data": {"b": "2"}}
+    )
+    assert patched.data == {"a": "1", "b": "2"}
+    core_api.delete_collection_namespaced_config_map(
+        "default", label_selector="keep=no"
+    )
+    assert fake_cluster.objects("configmaps") == []
+    with pytest.raises(k8s.client.rest.ApiException) as error:
+        core_api.read_namespaced_config_map("cfg", "default")
+    assert error.value.status == 404
+
+
+def test_deleting_namespace_deletes_its_resources(fake_cluster, core_api):
+    core_api.create_namespace(
+        k8s.client.V1Namespace(metadata=k8s.client.V1ObjectMeta(name="ns"))
+    )
+    core_api.create_namespaced_pod("ns", _pod("p", "ns", {}))
+    core_api.delete_namespace("ns")
+    assert fake_cluster.objects("pods") == []
+
+
+def test_daemonset_is_ready_on_all_nodes(fake_cluster):
+    fake_cluster.add(_node("node-a"), _node("node-b"))
+    apps_api = k8s.client.AppsV1Api(fake_cluster.api_client())
+    daemonset = apps_api.create_namespaced_daemon_set(
+        "default",
+        k8s.client.V1DaemonSet(
+            metadata=k8s.client.V1ObjectMeta(name="runner"),
+            spec=k8s.client.V1DaemonSetSpec(
+                selector=k8s.client.V1LabelSelector(match_labels={"a": "b"}),
+                template=k8s.client.V1PodTemplateSpec(
+                    metadata=k8s.client.V1ObjectMeta(labels={"a": "b"}),
+                    spec=k8s.client.V1PodSpec(
+                        containers=[k8s.client.V1Container(name="runner")]
+                    ),
+                ),
+            ),
+        ),
+    )
+    assert daemonset.status.number_ready == 2
+    assert daemonset.status.desired_number_scheduled == 2
+
+
+def test_watch_streams_existing_and_new_objects(fake_cluster, core_api):
+    fake_cluster.add(_pod("first", "default", {}))
+    events = []
+    watch = k8s.watch.Watch()
+    for event in watch.stream(
+        core_api.list_namespaced_pod, "default", timeout_seconds=2
+    ):
+        events.append((event["type"], event["object"].metadata.name))
+        if len(events) == 1:
+            fake_cluster.add(_pod("second", "default", {}))
+        if len(events) == 2:
+            watch.stop()
+    assert events == [("ADDED", "first"), ("ADDED", "second")]
+
+
+def test_error_injection_and_latency(fake_cluster, core_api):
+    fake_cluster.inject_error(503, method="GET", resource="pods")
+    with pytest.raises(k8s.client.rest.ApiException) as error:
+        core_api.list_pod_for_all_namespaces()
+    assert error.value.status == 503
+    assert core_api.list_pod_for_all_namespaces().items == []
+    fake_cluster.latency = 0.05
+    start_time = time.time()
+    core_api.list_namespace()
+    assert time.time() - start_time >= 0.05
+
+
+def test_cleaner_against_fake_cluster(fake_cluster):
+    api_client = fake_cluster.api_client()
+    core_api = k8s.client.CoreV1Api(api_client)
+    fake_cluster.add(
+        k8s.client.V1Namespace(
+            metadata=k8s.client.V1ObjectMeta(name="default"),
+        ),
+        _pod("dummy", "default", {"illuminatio-cleanup": "always"}),
+        _pod("app", "default", {"app": "web"}),
+    )
+    cleaner = Cleaner(
+        core_api,
+        k8s.client.AppsV1Api(api_client),
+        k8s.client.RbacAuthorizationV1Api(api_client),
+    )
+    cleaner.clean_up_pods_in_namespaces(["default"], "always")
+    assert [p["metadata"]["name"] for p in fake_cluster.objects("pods")] == ["app"]
+
+
+def test_merge_and_json_patch():
+    target = {"a": {"b": 1, "c": 2}, "d": [1, 2]}
+    assert merge_patch(target, {"a": {"b": None, "e": 3}}) == {
+        "a": {"c": 2, "e": 3},
+        "d": [1, 2],
+    }
+    assert json_patch(
+        target,
+        [
+            {"op": "replace", "path": "/a/b", "value": 5},
+            {"op": "add", "path": "/d/-", "value": 3},
+            {"op": "remove", "path": "/a/c"},
+        ],
+    ) == {"a": {"b": 5}, "d": [1, 2, 3]}
+    assert target == {"a": {"b": 1, "c": 2}, "d": [1, 2]}
@@ -1,3 +1,6 @@
+import copy
+import pickle
+
 import pytest
 
 from illuminatio.host import (
@@ -7,6 +10,7 @@ from illuminatio.host import (
     LocalHost,
     GenericClusterHost,
     Host,
+    _parse_identifier,
 )
 
 
@@ -72,3 +76,65 @@ def test_from_identifier(identifier, expected_host):
 def test_from_identifier_invalid_hosts(identifier):
     with pytest.raises(ValueError):
         Host.from_identifier(identifier)
+
+
+@pytest.mark.parametrize(
+    "create",
+    [
+        pytest.param(LocalHost, id="LocalHost"),
+        pytest.param(lambda: ExternalHost("10.0.0.1"), id="ExternalHost"),
+        pytest.param(
+            lambda: ConcreteClusterHost("default", "nginx"), id="ConcreteClusterHost"
+        ),
+        pytest.param(
+            lambda: ClusterHost("default", {"app": "web", "tier": "a"}),
+            id="ClusterHost",
+        ),
+        pytest.param(
+            lambda: GenericClusterHost({"team": "a"}, {"app": "web"}),
+            id="GenericClusterHost",
+        ),
+    ],
+)
+def test_equal_hosts_are_interned(create):
+    host = create()
+    assert create() is host
+    assert hash(create()) == hash(host)
+    assert pickle.loads(pickle.dumps(host)) is host
+    assert copy.deepcopy(host) is host
+    assert Host.from_identifier(host.to_identifier()) is host
+
+
+def test_labels_are_canonical():
+    host = ClusterHost("default", {"tier": "a", "app": "web"})
+    assert host is ClusterHost("default", {"app": "web", "tier": "a"})
+    assert host.to_identifier() == "default:app=web,tier=a"
+    assert list(host.pod_labels) == ["app", "tier"]
+    assert host.pod_labels == {"app": "web", "tier": "a"}
+
+
+def test_hosts_are_immutable():
+    host = GenericClusterHost({"team": "a"}, {"app": "web"})
+    with pytest.raises(AttributeError):
+        host.pod_labels = {}
+    with pytest.raises(TypeError):
+        host.pod_labels["app"] = "db"
+    with pytest.raises(TypeError):
+        host.namespace_labels.update({"team": "b"})
+    assert host.to_identifier() == "team=a:app=web"
+
+
+def test_hosts_are_usable_as_dict_keys():
+    hosts = {ExternalHost("10.0.0.1"): 1, ClusterHost("default", {}): 2}
+    assert hosts[ExternalHost("10.0.0.1")] == 1
+    assert hosts[Host.from_identifier("default:*")] == 2
+    assert ClusterHost("default", {}) != GenericClusterHost({}, {})
+
+
+def test_from_identifier_is_cached():
+    identifier = "cached-namespace:app=web,tier=a"
+    host = Host.from_identifier(identifier)
+    hits = _parse_identifier.cache_info().hits
+    assert Host.from_identifier(identifier) is host
+    assert _parse_identifier.cache_info().hits == hits + 1
+    assert host == ClusterHost("cached-namespace", {"tier": "a", "app": "web"})
@@ -1,7 +1,9 @@
+import json
 import pytest
 import nmap
 from unittest.mock import MagicMock
 from illuminatio.illuminatio_runner import (
+    cap_trace_events,
     build_result_string,
     extract_results_from_nmap,
 )
@@ -128,3 +130,15 @@ def test_extract_results_from_nmap(test_input, expected):
     test_input["nmap_res"] = create_nmap_mock(test_input["hosts"])
     test_input.pop("hosts", None)
     assert extract_results_from_nmap(**test_input) == expected
+
+
+def test_cap_trace_events_keeps_longest_spans():
+    events = [{"name": "probe-%d" % i, "ts": i, "dur": i} for i in range(100)]
+    events.append({"name": "runner", "ts": -1, "dur": 1000})
+    assert json.loads(cap_trace_events(events)) == sorted(
+        events, key=lambda event: event["ts"]
+    )
+    capped = json.loads(cap_trace_events(events, limit=200))
+    assert len(json.dumps(capped)) <= 200
+    assert capped[0]["name"] == "runner"
+    assert [event["ts"] for event in capped] == sorted(event["ts"] for event in capped)
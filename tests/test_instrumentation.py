@@ -0,0 +1,107 @@
+import io
+
+import kubernetes as k8s
+import pytest
+import urllib3
+
+from illuminatio.instrumentation import ApiCallRecorder, Histogram, resource_from_url
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        ("https://k8s:6443/api/v1/pods", "pods"),
+        ("https://k8s:6443/api/v1/namespaces", "namespaces"),
+        ("https://k8s:6443/api/v1/namespaces/default", "namespaces"),
+        ("https://k8s:6443/api/v1/namespaces/default/pods/web-1", "pods"),
+        ("https://k8s:6443/api/v1/namespaces/default/configmaps?watch=1", "configmaps"),
+        ("https://k8s:6443/apis/apps/v1/namespaces/x/daemonsets/runner", "daemonsets"),
+        (
+            "https://k8s:6443/apis/networking.k8s.io/v1/networkpolicies",
+            "networkpolicies",
+        ),
+    ],
+)
+def test_resource_from_url(url, expected):
+    assert resource_from_url(url) == expected
+
+
+def test_histogram_cumulative_counts():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in [0.05, 0.1, 0.5, 2.0]:
+        histogram.observe(value)
+    assert histogram.cumulative_counts() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.to_dict()["buckets"] == {"0.1": 2, "1.0": 3, "+Inf": 4}
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeApiClient:
+    def request(self, method, url, query_params=None, body=None):
+        if "fail" in url:
+            raise ValueError("request failed")
+        return FakeResponse(b"0123456789")
+
+
+def test_recorder_records_calls_per_phase():
+    recorder = ApiCallRecorder()
+    recorder.install(FakeApiClient)
+    try:
+        client = FakeApiClient()
+        with recorder.phase("resource-pull"):
+            client.request("GET", "https://k8s/api/v1/pods")
+            client.request("GET", "https://k8s/api/v1/pods")
+        client.request("POST", "https://k8s/api/v1/namespaces/a/pods", body={"a": 1})
+        with pytest.raises(ValueError):
+            client.request("GET", "https://k8s/api/v1/fail")
+    finally:
+        recorder.uninstall()
+    stats = recorder.to_dict()
+    assert stats["resource-pull"]["GET pods"]["calls"] == 2
+    assert stats["resource-pull"]["GET pods"]["bytes-received"] == 20
+    assert stats["none"]["POST pods"]["bytes-sent"] == len('{"a": 1}')
+    assert stats["none"]["GET fail"]["errors"] == 1
+    assert "recorded_request" not in FakeApiClient.request.__name__
+
+
+def test_recorder_records_the_installed_kubernetes_client(monkeypatch):
+    namespace_list = b'{"kind": "NamespaceList", "apiVersion": "v1", "items": []}'
+    responses = {
+        "GET": (200, namespace_list),
+        "POST": (201, b'{"kind": "Namespace", "metadata": {"name": "a"}}'),
+    }
+
+    def pool_request(method, url, **kwargs):
+        status, body = responses[method]
+        return urllib3.HTTPResponse(
+            body=io.BytesIO(body),
+            status=status,
+            headers={
+                "Content-Type": "application/json",
+                "Content-Length": str(len(body)),
+            },
+            preload_content=kwargs.get("preload_content", True),
+        )
+
+    configuration = k8s.client.Configuration()
+    configuration.host = "http://k8s.invalid"
+    api_client = k8s.client.ApiClient(configuration)
+    monkeypatch.setattr(api_client.rest_client.pool_manager, "request", pool_request)
+    recorder = ApiCallRecorder()
+    recorder.install()
+    try:
+        api = k8s.client.CoreV1Api(api_client)
+        api.list_namespace()
+        api.create_namespace(
+            k8s.client.V1Namespace(metadata=k8s.client.V1ObjectMeta(name="a"))
+        )
+    finally:
+        recorder.uninstall()
+    stats = recorder.to_dict()["none"]
+    assert stats["GET namespaces"]["calls"] == 1
+    assert stats["GET namespaces"]["bytes-received"] == len(namespace_list)
+    assert stats["POST namespaces"]["bytes-sent"] > 0
+    assert stats["POST namespaces"]["errors"] == 0
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from illuminatio.illuminatio import cli
+from illuminatio.k8s_util import (
+    create_node_name_affinity,
+    load_policy_manifests,
+    read_manifests,
+)
+
+POLICY = {
+    "apiVersion": "networking.k8s.io/v1",
+    "kind": "NetworkPolicy",
+    "metadata": {"name": "web-allow-prod", "namespace": "web"},
+    "spec": {
+        "podSelector": {"matchLabels": {"app": "web"}},
+        "ingress": [
+            {"from": [{"namespaceSelector": {"matchLabels": {"purpose": "prod"}}}]}
+        ],
+    },
+}
+NAMESPACE = {
+    "apiVersion": "v1",
+    "kind": "Namespace",
+    "metadata": {"name": "prod", "labels": {"purpose": "prod"}},
+}
+DEPLOYMENT = {"apiVersion": "apps/v1", "kind": "Deployment", "metadata": {"name": "x"}}
+
+
+def _write(path, *documents):
+    path.write_text(yaml.safe_dump_all(documents))
+    return str(path)
+
+
+def test_read_manifests_walks_directories_and_unpacks_lists(tmp_path):
+    (tmp_path / "nested").mkdir()
+    _write(tmp_path / "a.yml", NAMESPACE, None)
+    _write(tmp_path / "nested" / "b.yaml", {"kind": "List", "items": [DEPLOYMENT]})
+    (tmp_path / "notes.txt").write_text("not a manifest")
+    assert list(read_manifests([str(tmp_path)])) == [NAMESPACE, DEPLOYMENT]
+
+
+def test_load_policy_manifests(tmp_path):
+    policy_without_namespace = yaml.safe_load(yaml.safe_dump(POLICY))
+    del policy_without_namespace["metadata"]["namespace"]
+    file_name = _write(
+        tmp_path / "manifests.yml",
+        POLICY,
+        NAMESPACE,
+        DEPLOYMENT,
+        policy_without_namespace,
+    )
+    policies, namespaces = load_policy_manifests([file_name])
+    assert [p.metadata.namespace for p in policies] == ["web", "default"]
+    assert policies[0].spec.ingress[0]._from[0].namespace_selector.match_labels == {
+        "purpose": "prod"
+    }
+    assert {n.metadata.name: n.metadata.labels for n in namespaces} == {
+        "prod": {"purpose": "prod", "kubernetes.io/metadata.name": "prod"},
+        "web": {"kubernetes.io/metadata.name": "web"},
+        "default": {"kubernetes.io/metadata.name": "default"},
+    }
+
+
+def test_offline_generate_needs_no_cluster(tmp_path, monkeypatch):
+    monkeypatch.setenv("KUBECONFIG", str(tmp_path / "missing-kubeconfig"))
+    file_name = _write(tmp_path / "manifests.yml", POLICY, NAMESPACE)
+    outfile = str(tmp_path / "cases.yaml")
+    result = CliRunner().invoke(cli, ["generate", "-f", file_name, "-o", outfile])
+    assert result.exit_code == 0, result.output
+    with open(outfile) as cases_file:
+        cases = yaml.safe_load(cases_file)
+    assert cases["purpose=prod:*"] == {"web:app=web": ["*"]}
+    assert cases["illuminatio-inverted-purpose=prod:*"] == {"web:app=web": ["-*"]}
+
+
+def test_offline_generate_streams_ndjson(tmp_path, monkeypatch):
+    monkeypatch.setenv("KUBECONFIG", str(tmp_path / "missing-kubeconfig"))
+    file_name = _write(tmp_path / "manifests.yml", POLICY, NAMESPACE)
+    outfile = tmp_path / "cases.ndjson"
+    result = CliRunner().invoke(cli, ["generate", "-f", file_name, "-o", str(outfile)])
+    assert result.exit_code == 0, result.output
+    records = [json.loads(line) for line in outfile.read_text().splitlines()]
+    assert {"fromHost": "purpose=prod:*", "toHost": "web:app=web", "port": "*"} in (
+        records
+    )
+    assert {
+        "fromHost": "illuminatio-inverted-purpose=prod:*",
+        "toHost": "web:app=web",
+        "port": "-*",
+    } in records
+    assert len(records) == 2
+
+
+def test_create_node_name_affinity_needs_nodes():
+    affinity = create_node_name_affinity(["node-a"])
+    terms = affinity.node_affinity.required_during_scheduling_ignored_during_execution
+    assert terms.node_selector_terms[0].match_fields[0].values == ["node-a"]
+    with pytest.raises(ValueError):
+        create_node_name_affinity([])
@@ -0,0 +1,99 @@
+import kubernetes as k8s
+
+from benchmarks.synthetic_cluster import SyntheticCluster
+from illuminatio.probe_planner import ProbePlanner
+from illuminatio.simulator import PolicySimulator, pod_identifier
+
+
+def _pod(name, labels):
+    return k8s.client.V1Pod(
+        metadata=k8s.client.V1ObjectMeta(name=name, namespace="default", labels=labels)
+    )
+
+
+def _selector(labels):
+    return k8s.client.V1LabelSelector(match_labels=labels)
+
+
+def _policy(name, pod_labels, ingress):
+    return k8s.client.V1NetworkPolicy(
+        metadata=k8s.client.V1ObjectMeta(name=name, namespace="default"),
+        spec=k8s.client.V1NetworkPolicySpec(
+            pod_selector=_selector(pod_labels), ingress=ingress
+        ),
+    )
+
+
+def _from(peer_labels, ports=None):
+    return k8s.client.V1NetworkPolicyIngressRule(
+        _from=[k8s.client.V1NetworkPolicyPeer(pod_selector=_selector(peer_labels))],
+        ports=[k8s.client.V1NetworkPolicyPort(port=p) for p in ports]
+        if ports
+        else None,
+    )
+
+
+NAMESPACES = [k8s.client.V1Namespace(metadata=k8s.client.V1ObjectMeta(name="default"))]
+PODS = [
+    _pod("web-1", {"app": "web"}),
+    _pod("web-2", {"app": "web"}),
+    _pod("db-1", {"app": "db"}),
+    _pod("db-2", {"app": "db"}),
+    _pod("client", {"app": "client"}),
+]
+
+
+def test_plan_covers_rules_and_isolation_with_few_probes():
+    policies = [
+        _policy("web", {"app": "web"}, [_from({"app": "client"}, [80, 443])]),
+        _policy("db", {"app": "db"}, [_from({"app": "web"}, [5432])]),
+    ]
+    plan = ProbePlanner(PODS, NAMESPACES, policies).plan(naive_case_count=20)
+    report = plan.report()
+    assert report["uncovered"] == []
+    assert report["requirements"] == 5
+    # two isolations and three rule ports, each allowed probe covers one rule port
+    assert report["probes"] == 5
+    assert report["reduction"] == 4
+    probes = plan.to_dict()
+    assert {"80", "443"} <= set(probes["default:client"]["default:web-1"])
+    assert "5432" in probes["default:web-1"]["default:db-1"]
+    # replicas are represented by the first pod of their class
+    assert "default:web-2" not in probes
+
+
+def test_plan_reports_uncoverable_requirements():
+    policies = [_policy("web", {"app": "web"}, [_from({"app": "missing"})])]
+    report = ProbePlanner(PODS, NAMESPACES, policies).plan().report()
+    assert report["uncovered"] == ["default/web Ingress rule 0"]
+    assert report["coverage"] == 0.5
+    assert "reduction" not in report
+
+
+def test_planned_probes_expect_what_the_simulator_computes():
+    cluster = SyntheticCluster(namespaces=4, pods=80, policies=25, seed=5)
+    args = (cluster.pods, cluster.namespaces, cluster.policies)
+    plan = ProbePlanner(*args).plan()
+    simulator = PolicySimulator(*args)
+    index = {pod_identifier(pod): i for i, pod in enumerate(simulator.pods)}
+    for sender, receiver, port, should_connect in plan.probes:
+        assert (
+            simulator.is_allowed(index[sender], index[receiver], port) == should_connect
+        )
+    assert plan.report()["covered"] > 0
+
+
+def test_plan_covers_rules_within_a_class():
+    pods = [
+        _pod("web-1", {"app": "web"}),
+        _pod("web-2", {"app": "web"}),
+        _pod("client", {"app": "client"}),
+    ]
+    policies = [_policy("web", {"app": "web"}, [_from({"app": "web"})])]
+    plan = ProbePlanner(pods, NAMESPACES, policies).plan()
+    assert plan.report()["uncovered"] == []
+    allowed = [probe[:2] for probe in plan.probes if probe[3]]
+    assert allowed in (
+        [("default:web-1", "default:web-2")],
+        [("default:web-2", "default:web-1")],
+    )
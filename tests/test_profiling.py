@@ -0,0 +1,56 @@
+import os
+import pstats
+
+import click
+from click.testing import CliRunner
+
+from illuminatio.profiling import CommandProfiler, PROFILER_META_KEY, profiled
+
+
+def _build_cli():
+    @click.group(chain=True)
+    @click.option("--profile", "profile_dir", default=None)
+    @click.option("--profile-memory", default=False, is_flag=True)
+    @click.pass_context
+    def cli(ctx, profile_dir, profile_memory):
+        if profile_dir:
+            ctx.meta[PROFILER_META_KEY] = CommandProfiler(
+                profile_dir, top=5, memory=profile_memory
+            )
+
+    @cli.command()
+    @profiled("first")
+    def first():
+        sorted(str(i) for i in range(1000))
+
+    @cli.command()
+    @profiled("second")
+    def second():
+        [{"port": i} for i in range(1000)]
+
+    return cli
+
+
+def test_profile_writes_files_per_chained_command(tmp_path):
+    result = CliRunner().invoke(
+        _build_cli(),
+        ["--profile", str(tmp_path), "--profile-memory", "first", "second"],
+    )
+    assert result.exit_code == 0, result.output
+    assert sorted(os.listdir(tmp_path)) == [
+        "01-first.pstats",
+        "01-first.tracemalloc",
+        "01-first.tracemalloc.txt",
+        "01-first.txt",
+        "02-second.pstats",
+        "02-second.tracemalloc",
+        "02-second.tracemalloc.txt",
+        "02-second.txt",
+    ]
+    assert pstats.Stats(str(tmp_path / "01-first.pstats")).total_calls > 0
+
+
+def test_commands_are_not_profiled_without_option(tmp_path):
+    result = CliRunner().invoke(_build_cli(), ["first"])
+    assert result.exit_code == 0, result.output
+    assert not os.listdir(tmp_path)
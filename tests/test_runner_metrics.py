@@ -0,0 +1,72 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from illuminatio.runner_metrics import RunnerMetrics, start_metrics_server
+
+
+def test_observe_probe_counts_outcomes():
+    metrics = RunnerMetrics()
+    metrics.observe_probe(
+        "default:sender",
+        0.5,
+        {
+            "80": {"success": True},
+            "-81": {"success": False},
+            "82": {"success": False, "error": "nmap failed"},
+        },
+    )
+    metrics.observe_probe("default:sender", 0.25, {"80": {"success": True}})
+    assert metrics.probes == {"success": 2, "failure": 1, "error": 1}
+    assert metrics.prober_seconds == {"default:sender": 0.75}
+    assert metrics.probe_latency.count == 2
+
+
+def test_render_prometheus_text():
+    metrics = RunnerMetrics()
+    metrics.observe_netns_resolution(0.02)
+    metrics.observe_probe('ns:"odd"', 1.0, {"80": {"success": True}})
+    text = metrics.render()
+    assert 'illuminatio_runner_probes_total{outcome="success"} 1' in text
+    assert (
+        'illuminatio_runner_netns_resolution_duration_seconds_bucket{le="0.025"} 1'
+        in text
+    )
+    assert 'illuminatio_runner_probe_duration_seconds_bucket{le="+Inf"} 1' in text
+    assert "illuminatio_runner_probe_duration_seconds_count 1" in text
+    assert 'illuminatio_runner_prober_seconds_total{sender="ns:\\"odd\\""} 1.0' in text
+
+
+def test_server_endpoints():
+    metrics = RunnerMetrics()
+    server = start_metrics_server(metrics, 0, host="127.0.0.1")
+    base_url = "http://127.0.0.1:%s" % server.server_address[1]
+    try:
+        assert urllib.request.urlopen(base_url + "/healthz").status == 200
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(base_url + "/readyz")
+        assert error.value.code == 503
+        metrics.ready = True
+        assert urllib.request.urlopen(base_url + "/readyz").status == 200
+        body = urllib.request.urlopen(base_url + "/metrics").read().decode()
+        assert "illuminatio_runner_probes_total" in body
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_healthz_fails_without_heartbeat():
+    metrics = RunnerMetrics(heartbeat_timeout=60)
+    server = start_metrics_server(metrics, 0, host="127.0.0.1")
+    base_url = "http://127.0.0.1:%s" % server.server_address[1]
+    try:
+        metrics.last_heartbeat -= 120
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(base_url + "/healthz")
+        assert error.value.code == 503
+        metrics.heartbeat()
+        assert urllib.request.urlopen(base_url + "/healthz").status == 200
+    finally:
+        server.shutdown()
+        server.server_close()
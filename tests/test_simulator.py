@@ -0,0 +1,246 @@
+import kubernetes as k8s
+import pytest
+
+from benchmarks.synthetic_cluster import SyntheticCluster
+from illuminatio.simulator import (
+    OTHER_PORTS,
+    BitsetSimulator,
+    PolicySimulator,
+    labels_match_selector,
+)
+
+
+def _pod(name, namespace, labels, ports=None, ip=None):
+    return k8s.client.V1Pod(
+        metadata=k8s.client.V1ObjectMeta(name=name, namespace=namespace, labels=labels),
+        spec=k8s.client.V1PodSpec(
+            containers=[
+                k8s.client.V1Container(
+                    name="c",
+                    ports=[
+                        k8s.client.V1ContainerPort(container_port=p, name=n)
+                        for n, p in (ports or {}).items()
+                    ],
+                )
+            ]
+        ),
+        status=k8s.client.V1PodStatus(pod_ip=ip),
+    )
+
+
+def _namespace(name, labels=None):
+    return k8s.client.V1Namespace(
+        metadata=k8s.client.V1ObjectMeta(name=name, labels=labels)
+    )
+
+
+def _selector(labels):
+    return k8s.client.V1LabelSelector(match_labels=labels)
+
+
+def _policy(namespace, pod_labels, ingress=None, egress=None, types=None):
+    return k8s.client.V1NetworkPolicy(
+        metadata=k8s.client.V1ObjectMeta(name="p", namespace=namespace),
+        spec=k8s.client.V1NetworkPolicySpec(
+            pod_selector=_selector(pod_labels),
+            ingress=ingress,
+            egress=egress,
+            policy_types=types,
+        ),
+    )
+
+
+def _from(peers, ports=None):
+    return k8s.client.V1NetworkPolicyIngressRule(
+        _from=peers,
+        ports=[k8s.client.V1NetworkPolicyPort(port=p) for p in ports]
+        if ports
+        else None,
+    )
+
+
+def _peer(pod_labels=None, namespace_labels=None, cidr=None):
+    return k8s.client.V1NetworkPolicyPeer(
+        pod_selector=_selector(pod_labels) if pod_labels is not None else None,
+        namespace_selector=_selector(namespace_labels)
+        if namespace_labels is not None
+        else None,
+        ip_block=k8s.client.V1IPBlock(cidr=cidr) if cidr else None,
+    )
+
+
+PODS = [
+    _pod("web", "default", {"app": "web"}, {"http": 80}, ip="10.0.0.1"),
+    _pod("db", "default", {"app": "db"}, ip="10.0.0.2"),
+    _pod("monitor", "ops", {"app": "monitor"}, ip="10.0.1.1"),
+]
+NAMESPACES = [_namespace("default"), _namespace("ops", {"team": "operations"})]
+WEB, DB, MONITOR = 0, 1, 2
+
+
+def _simulate(*policies):
+    return PolicySimulator(PODS, NAMESPACES, list(policies))
+
+
+def test_no_policies_allow_everything():
+    simulator = _simulate()
+    assert simulator.is_allowed(DB, WEB, 80)
+    assert simulator.is_allowed(WEB, MONITOR, OTHER_PORTS)
+
+
+def test_deny_all_ingress_isolates_selected_pods_only():
+    simulator = _simulate(_policy("default", {"app": "web"}, ingress=[]))
+    assert not simulator.is_allowed(DB, WEB, 80)
+    assert not simulator.is_allowed(MONITOR, WEB, OTHER_PORTS)
+    assert simulator.is_allowed(WEB, DB, 80)
+
+
+def test_pod_selector_and_port_rule():
+    simulator = _simulate(
+        _policy(
+            "default", {"app": "web"}, ingress=[_from([_peer({"app": "db"})], [80])]
+        )
+    )
+    assert simulator.is_allowed(DB, WEB, 80)
+    assert not simulator.is_allowed(DB, WEB, 443)
+    assert not simulator.is_allowed(DB, WEB, OTHER_PORTS)
+    # pod selectors without namespace selector only select the policy's namespace
+    assert not simulator.is_allowed(MONITOR, WEB, 80)
+
+
+@pytest.mark.parametrize(
+    "peer,monitor_allowed,db_allowed",
+    [
+        (_peer(namespace_labels={"team": "operations"}), True, False),
+        (_peer(namespace_labels={}), True, True),
+        (_peer({"app": "db"}, {}), False, True),
+        (_peer(cidr="10.0.1.0/24"), True, False),
+    ],
+)
+def test_peer_selection(peer, monitor_allowed, db_allowed):
+    simulator = _simulate(_policy("default", {"app": "web"}, ingress=[_from([peer])]))
+    assert simulator.is_allowed(MONITOR, WEB, 80) == monitor_allowed
+    assert simulator.is_allowed(DB, WEB, 80) == db_allowed
+
+
+def test_named_ports_resolve_against_the_receiver():
+    simulator = _simulate(
+        _policy("default", {"app": "web"}, ingress=[_from(None, ["http"])])
+    )
+    assert simulator.is_allowed(DB, WEB, 80)
+    assert not simulator.is_allowed(DB, WEB, 8080)
+
+
+def test_empty_ports_allow_all_ports():
+    rule = _from([_peer({"app": "db"})])
+    rule.ports = []
+    simulator = _simulate(_policy("default", {"app": "web"}, ingress=[rule]))
+    assert simulator.is_allowed(DB, WEB, 80)
+    assert simulator.is_allowed(DB, WEB, OTHER_PORTS)
+    assert not simulator.is_allowed(MONITOR, WEB, 80)
+
+
+def test_egress_deny_blocks_the_sender():
+    simulator = _simulate(
+        _policy("default", {"app": "db"}, egress=[], types=["Egress"])
+    )
+    assert not simulator.is_allowed(DB, WEB, 80)
+    assert simulator.is_allowed(WEB, DB, 80)
+
+
+def test_policies_are_additive():
+    simulator = _simulate(
+        _policy("default", {"app": "web"}, ingress=[]),
+        _policy("default", {"app": "web"}, ingress=[_from([_peer({"app": "db"})])]),
+    )
+    assert simulator.is_allowed(DB, WEB, 80)
+    assert not simulator.is_allowed(MONITOR, WEB, 80)
+
+
+def test_reachability_matrix():
+    matrix = _simulate(
+        _policy(
+            "default", {"app": "web"}, ingress=[_from([_peer({"app": "db"})], [80])]
+        )
+    ).reachability_matrix()
+    assert matrix["default:db"]["default:web"] == {"80": True, "*": False}
+    assert matrix["ops:monitor"]["default:web"] == {"80": False, "*": False}
+    assert matrix["default:web"]["default:db"] == {"80": True, "*": True}
+    assert "default:web" not in matrix["default:web"]
+
+
+def test_match_expressions():
+    selector = k8s.client.V1LabelSelector(
+        match_expressions=[
+            k8s.client.V1LabelSelectorRequirement(
+                key="app", operator="In", values=["web", "db"]
+            ),
+            k8s.client.V1LabelSelectorRequirement(
+                key="legacy", operator="DoesNotExist"
+            ),
+        ]
+    )
+    assert labels_match_selector({"app": "web"}, selector)
+    assert not labels_match_selector({"app": "web", "legacy": "true"}, selector)
+    assert not labels_match_selector({"app": "cache"}, selector)
+
+
+@pytest.fixture
+def numpy():
+    return pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize(
+    "policies",
+    [
+        [],
+        [_policy("default", {"app": "web"}, ingress=[])],
+        [
+            _policy(
+                "default", {"app": "web"}, ingress=[_from([_peer({"app": "db"})], [80])]
+            )
+        ],
+        [_policy("default", {"app": "web"}, ingress=[_from(None, ["http"])])],
+        [_policy("default", {"app": "db"}, egress=[], types=["Egress"])],
+        [
+            _policy(
+                "default", {"app": "web"}, ingress=[_from([_peer(cidr="10.0.1.0/24")])]
+            )
+        ],
+        [_policy("default", {}, ingress=[_from([_peer(namespace_labels={})])])],
+        [
+            _policy(
+                "default",
+                {"app": "web"},
+                ingress=[
+                    k8s.client.V1NetworkPolicyIngressRule(
+                        _from=[_peer({"app": "db"})], ports=[]
+                    )
+                ],
+            )
+        ],
+    ],
+)
+def test_bitset_simulator_matches_policy_simulator(numpy, policies):
+    expected = PolicySimulator(PODS, NAMESPACES, policies).reachability_matrix()
+    assert BitsetSimulator(PODS, NAMESPACES, policies).reachability_matrix() == expected
+
+
+def test_bitset_simulator_matches_policy_simulator_on_synthetic_cluster(numpy):
+    cluster = SyntheticCluster(namespaces=5, pods=120, policies=40, seed=3)
+    args = (cluster.pods, cluster.namespaces, cluster.policies)
+    expected = PolicySimulator(*args).reachability_matrix()
+    assert BitsetSimulator(*args).reachability_matrix() == expected
+
+
+def test_reachability_counts_pairs_without_self_connections(numpy):
+    simulator = BitsetSimulator(
+        PODS, NAMESPACES, [_policy("default", {"app": "web"}, ingress=[])]
+    )
+    reachability = simulator.reachability([80])
+    # everyone may reach everyone else except web
+    assert reachability.allowed_pairs(80) == 4
+    assert not reachability.is_allowed(DB, WEB, 80)
+    assert reachability.is_allowed(WEB, DB, 80)
+    start, chunk = next(reachability.chunks(80))
+    assert start == 0 and chunk.shape == (3, 3)
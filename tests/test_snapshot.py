@@ -0,0 +1,163 @@
+import json
+
+import kubernetes as k8s
+import pytest
+from click.testing import CliRunner
+
+from illuminatio.illuminatio import cli
+from illuminatio.snapshot import ClusterSnapshot
+
+
+def _meta(name, namespace=None, labels=None):
+    return k8s.client.V1ObjectMeta(name=name, namespace=namespace, labels=labels)
+
+
+def _snapshot():
+    snapshot = ClusterSnapshot()
+    snapshot.record(
+        "namespaces",
+        [
+            k8s.client.V1Namespace(metadata=_meta("default")),
+            k8s.client.V1Namespace(metadata=_meta("illuminatio")),
+        ],
+    )
+    pod_meta = _meta("web-1", "default", {"app": "web"})
+    pod_meta.managed_fields = [k8s.client.V1ManagedFieldsEntry(manager="kubectl")]
+    snapshot.record(
+        "pods",
+        [
+            k8s.client.V1Pod(
+                metadata=pod_meta,
+                spec=k8s.client.V1PodSpec(
+                    containers=[k8s.client.V1Container(name="web", image="nginx")]
+                ),
+            )
+        ],
+    )
+    snapshot.record("services", [])
+    snapshot.record(
+        "networkpolicies",
+        [
+            k8s.client.V1NetworkPolicy(
+                metadata=_meta("web-allow-db", "default"),
+                spec=k8s.client.V1NetworkPolicySpec(
+                    pod_selector=k8s.client.V1LabelSelector(
+                        match_labels={"app": "web"}
+                    ),
+                    ingress=[
+                        k8s.client.V1NetworkPolicyIngressRule(
+                            _from=[
+                                k8s.client.V1NetworkPolicyPeer(
+                                    pod_selector=k8s.client.V1LabelSelector(
+                                        match_labels={"app": "db"}
+                                    )
+                                )
+                            ]
+                        )
+                    ],
+                ),
+            )
+        ],
+    )
+    return snapshot
+
+
+@pytest.fixture
+def reset_default_configuration():
+    yield
+    k8s.client.Configuration.set_default(None)
+
+
+def test_snapshot_roundtrip(tmp_path):
+    filename = str(tmp_path / "snapshot.json.gz")
+    _snapshot().write(filename)
+    snapshot = ClusterSnapshot.read(filename)
+    pods = snapshot.items("pods")
+    assert pods[0].metadata.labels == {"app": "web"}
+    assert pods[0].metadata.managed_fields is None
+    policies = snapshot.items("networkpolicies")
+    assert policies[0].spec.ingress[0]._from[0].pod_selector.match_labels == {
+        "app": "db"
+    }
+
+
+def test_record_rejects_unknown_resources():
+    with pytest.raises(ValueError):
+        ClusterSnapshot().record("secrets", [])
+
+
+def test_replayed_run_resolves_cases_deterministically(
+    tmp_path, reset_default_configuration
+):
+    filename = str(tmp_path / "snapshot.json.gz")
+    _snapshot().write(filename)
+    outputs = []
+    for index in range(2):
+        outfile = str(tmp_path / ("result-%d.json" % index))
+        result = CliRunner().invoke(
+            cli, ["--replay-snapshot", filename, "run", "-o", outfile]
+        )
+        assert result.exit_code == 0, result.output
+        with open(outfile) as output:
+            outputs.append(json.load(output))
+    assert outputs[0]["cases"] == outputs[1]["cases"]
+    assert outputs[0]["results"]["mappings"] == outputs[1]["results"]["mappings"]
+    assert "default:app=db" in outputs[0]["cases"]
+
+
+def test_replayed_generate(tmp_path, reset_default_configuration):
+    filename = str(tmp_path / "snapshot.json.gz")
+    _snapshot().write(filename)
+    outfile = str(tmp_path / "cases.yaml")
+    result = CliRunner().invoke(
+        cli, ["--replay-snapshot", filename, "generate", "-o", outfile]
+    )
+    assert result.exit_code == 0, result.output
+    with open(outfile) as output:
+        assert "default:app=db" in output.read()
+
+
+def test_replayed_run_reads_ndjson_cases(tmp_path, reset_default_configuration):
+    filename = str(tmp_path / "snapshot.json.gz")
+    _snapshot().write(filename)
+    cases_file = str(tmp_path / "cases.ndjson")
+    result = CliRunner().invoke(
+        cli, ["--replay-snapshot", filename, "generate", "-o", cases_file]
+    )
+    assert result.exit_code == 0, result.output
+    outfile = str(tmp_path / "result.json")
+    result = CliRunner().invoke(
+        cli,
+        [
+            "--replay-snapshot",
+            filename,
+            "run",
+            "--test-cases",
+            cases_file,
+            "-o",
+            outfile,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    with open(outfile) as output:
+        cases = json.load(output)["cases"]
+    with open(cases_file) as records:
+        assert sum(len(ports) for t in cases.values() for ports in t.values()) == len(
+            records.readlines()
+        )
+    assert "default:app=db" in cases
+
+
+@pytest.mark.parametrize("command", ["run", "simulate", "plan"])
+def test_document_outfiles_reject_ndjson(
+    tmp_path, command, reset_default_configuration
+):
+    filename = str(tmp_path / "snapshot.json.gz")
+    _snapshot().write(filename)
+    outfile = tmp_path / "result.ndjson"
+    result = CliRunner().invoke(
+        cli, ["--replay-snapshot", filename, command, "-o", str(outfile)]
+    )
+    assert result.exit_code == 2
+    assert "record by record" in result.output
+    assert not outfile.exists()
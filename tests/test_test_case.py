@@ -1,6 +1,15 @@
+import pickle
+
 import kubernetes as k8s
+import pytest
 from illuminatio.host import ClusterHost, ExternalHost, LocalHost
-from illuminatio.test_case import NetworkTestCase, merge_in_dict, to_yaml, from_yaml
+from illuminatio.test_case import (
+    NetworkTestCase,
+    deduplicate,
+    from_yaml,
+    merge_in_dict,
+    to_yaml,
+)
 
 test_host1 = ClusterHost("default", {"app": "test"})
 test_host2 = ClusterHost("default", {"app": "test", "label2": "value"})
@@ -241,3 +250,30 @@ def test_fromYaml_simpleSampleYaml_returnsExpectedCase():
     actual = from_yaml(testYaml)
     assert len(actual) == 1
     assert actual[0] == expected
+
+
+# Below: hashing and ordering tests
+
+
+def test_equalCases_haveEqualHashes():
+    case1 = NetworkTestCase(LocalHost(), test_host1, 80, True)
+    case2 = NetworkTestCase(
+        LocalHost(), ClusterHost("default", {"app": "test"}), 80, True
+    )
+    assert hash(case1) == hash(case2)
+    assert {case1: 1}[case2] == 1
+    assert NetworkTestCase(LocalHost(), test_host1, 80, False) not in {case1}
+
+
+def test_deduplicate_keepsFirstOccurrenceOrder():
+    case1 = NetworkTestCase(LocalHost(), test_host1, 80, True)
+    case2 = NetworkTestCase(test_host1, test_host2, None, False)
+    duplicate = NetworkTestCase(LocalHost(), test_host1, "80", True)
+    assert deduplicate([case1, case2, duplicate, case2]) == [case1, case2]
+
+
+def test_case_isImmutableAndPicklable():
+    case = NetworkTestCase(LocalHost(), test_host1, 80, True)
+    with pytest.raises(AttributeError):
+        case.port_string = "443"
+    assert pickle.loads(pickle.dumps(case)) == case
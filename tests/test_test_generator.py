@@ -1,9 +1,15 @@
+import copy
 import logging
 import pytest
 
 import kubernetes as k8s
 
-from illuminatio.test_generator import NetworkTestCaseGenerator
+from benchmarks.synthetic_cluster import SyntheticCluster
+from illuminatio.test_generator import (
+    IncrementalTestCaseGenerator,
+    NetworkTestCaseGenerator,
+    partition_by_namespace,
+)
 from illuminatio.host import GenericClusterHost, ClusterHost
 from illuminatio.test_case import NetworkTestCase
 from illuminatio.util import INVERTED_ATTRIBUTE_PREFIX
@@ -143,7 +149,8 @@ gen = NetworkTestCaseGenerator(logging.getLogger("test_test_generator"))
                 NetworkTestCase(
                     GenericClusterHost({}, {}),
                     ClusterHost(
-                        "default", {"test.io/test-123_XYZ": "test_456-123.ABC"},
+                        "default",
+                        {"test.io/test-123_XYZ": "test_456-123.ABC"},
                     ),
                     "*",
                     True,
@@ -311,3 +318,159 @@ gen = NetworkTestCaseGenerator(logging.getLogger("test_test_generator"))
 def test__generate_test_cases(namespaces, networkpolicies, expected_testcases):
     cases, _ = gen.generate_test_cases(networkpolicies, namespaces)
     assert sorted(cases) == sorted(expected_testcases)
+
+
+def test_incremental_generation_matches_full_generation(tmp_path):
+    cluster = SyntheticCluster(namespaces=8, pods=100, policies=60, seed=1)
+    changed = SyntheticCluster(namespaces=8, pods=100, policies=70, seed=1)
+    edited = copy.deepcopy(changed.policies[3])
+    edited.spec.pod_selector.match_labels = {"tier": "db"}
+    generations = [
+        cluster.policies,
+        # one removed, ten added
+        changed.policies[:20] + changed.policies[21:],
+        # one changed in place
+        changed.policies[:3]
+        + [edited]
+        + changed.policies[4:20]
+        + changed.policies[21:],
+    ]
+    logger = logging.getLogger("test_test_generator")
+    state_file = str(tmp_path / "state.pickle")
+    for policies in generations:
+        incremental = IncrementalTestCaseGenerator.load(state_file, logger)
+        cases, runtimes = incremental.generate_test_cases(policies, cluster.namespaces)
+        incremental.save(state_file)
+        expected, _ = gen.generate_test_cases(policies, cluster.namespaces)
+        assert sorted(cases) == sorted(expected)
+    assert runtimes["negativeTestGen"]["reusedHosts"] > 0
+
+
+def test_incremental_generation_parses_changed_policies_in_workers(tmp_path):
+    cluster = SyntheticCluster(namespaces=8, pods=50, policies=60, seed=6)
+    changed = SyntheticCluster(namespaces=8, pods=50, policies=70, seed=6)
+    logger = logging.getLogger("test_test_generator")
+    state_file = str(tmp_path / "state.pickle")
+    for policies in [cluster.policies, changed.policies]:
+        incremental = IncrementalTestCaseGenerator.load(state_file, logger, workers=3)
+        assert incremental.workers == 3
+        cases, _ = incremental.generate_test_cases(policies, cluster.namespaces)
+        incremental.save(state_file)
+        expected, _ = gen.generate_test_cases(policies, cluster.namespaces)
+        assert sorted(cases) == sorted(expected)
+    assert not incremental._positive_cases
+
+
+def test_incremental_generation_of_duplicated_policies():
+    cluster = SyntheticCluster(namespaces=4, pods=40, policies=30, seed=2)
+    policies = cluster.policies + cluster.policies[:10]
+    incremental = IncrementalTestCaseGenerator(logging.getLogger("test_test_generator"))
+    incremental.generate_test_cases(cluster.policies, cluster.namespaces)
+    cases, _ = incremental.generate_test_cases(policies, cluster.namespaces)
+    expected, _ = gen.generate_test_cases(policies, cluster.namespaces)
+    assert sorted(cases) == sorted(expected)
+
+
+def test_incremental_generation_recomputes_on_namespace_changes():
+    namespaces = [
+        k8s.client.V1Namespace(
+            metadata=k8s.client.V1ObjectMeta(name=name, labels={"team": name})
+        )
+        for name in ["a", "b"]
+    ]
+    policy = k8s.client.V1NetworkPolicy(
+        metadata=k8s.client.V1ObjectMeta(
+            name="p", namespace="a", uid="uid-1", resource_version="1"
+        ),
+        spec=k8s.client.V1NetworkPolicySpec(
+            pod_selector=k8s.client.V1LabelSelector(match_labels={"app": "web"}),
+            ingress=[
+                k8s.client.V1NetworkPolicyIngressRule(
+                    _from=[
+                        k8s.client.V1NetworkPolicyPeer(
+                            namespace_selector=k8s.client.V1LabelSelector(
+                                match_labels={"team": "b"}
+                            )
+                        )
+                    ]
+                )
+            ],
+        ),
+    )
+    incremental = IncrementalTestCaseGenerator(logging.getLogger("test_test_generator"))
+    incremental.generate_test_cases([policy], namespaces)
+    namespaces[0].metadata.labels = {"team": "b"}
+    cases, runtimes = incremental.generate_test_cases([policy], namespaces)
+    expected, _ = gen.generate_test_cases([policy], namespaces)
+    assert sorted(cases) == sorted(expected)
+    assert runtimes["negativeTestGen"]["reusedHosts"] == 0
+
+
+def test_partition_by_namespace_keeps_namespaces_together():
+    cluster = SyntheticCluster(namespaces=6, pods=10, policies=40, seed=4)
+    partitions = partition_by_namespace(cluster.policies, 3)
+    assert len(partitions) == 3
+    assert sorted(i for p in partitions for i in p) == list(range(40))
+    for partition in partitions:
+        namespaces = {cluster.policies[i].metadata.namespace for i in partition}
+        for other in partitions:
+            if other is not partition:
+                assert not namespaces & {
+                    cluster.policies[i].metadata.namespace for i in other
+                }
+    assert partition_by_namespace(cluster.policies[:1], 3) == [[0]]
+
+
+def test_parallel_generation_matches_serial_generation():
+    cluster = SyntheticCluster(namespaces=8, pods=50, policies=60, seed=6)
+    parallel = NetworkTestCaseGenerator(logging.getLogger("test_test_generator"), 3)
+    cases, _ = parallel.generate_test_cases(cluster.policies, cluster.namespaces)
+    expected, _ = gen.generate_test_cases(cluster.policies, cluster.namespaces)
+    assert [str(case) for case in cases if case.port_string[0] != "-"] == [
+        str(case) for case in expected if case.port_string[0] != "-"
+    ]
+    assert sorted(cases) == sorted(expected)
+
+
+def test_abandoned_parallel_generation_leaves_no_stale_cases():
+    cluster = SyntheticCluster(namespaces=8, pods=50, policies=60, seed=6)
+    parallel = NetworkTestCaseGenerator(logging.getLogger("test_test_generator"), 3)
+    abandoned = parallel.iter_test_cases(cluster.policies, cluster.namespaces)
+    next(abandoned)
+    abandoned.close()
+    assert parallel._positive_cases
+    other = SyntheticCluster(namespaces=8, pods=50, policies=60, seed=7)
+    cases, _ = parallel.generate_test_cases(other.policies, other.namespaces)
+    expected, _ = gen.generate_test_cases(other.policies, other.namespaces)
+    assert sorted(cases) == sorted(expected)
+    assert not parallel._positive_cases
+
+
+def test_incremental_generation_ignores_unreadable_state(tmp_path):
+    state_file = tmp_path / "state.pickle"
+    state_file.write_bytes(b"not a pickle")
+    incremental = IncrementalTestCaseGenerator.load(
+        str(state_file), logging.getLogger("test_test_generator")
+    )
+    assert incremental._policies == {}
+
+
+def test_generated_cases_are_unique():
+    cluster = SyntheticCluster(namespaces=4, pods=40, policies=30, seed=2)
+    cases, _ = gen.generate_test_cases(
+        cluster.policies + cluster.policies[:10], cluster.namespaces
+    )
+    assert len(cases) == len(set(cases))
+
+
+def test_streamed_cases_match_generated_cases():
+    cluster = SyntheticCluster(namespaces=8, pods=100, policies=60, seed=1)
+    expected, _ = gen.generate_test_cases(cluster.policies, cluster.namespaces)
+    runtimes = {}
+    streamed = gen.iter_test_cases(cluster.policies, cluster.namespaces, runtimes)
+    first = next(streamed)
+    assert "negativeTestGen" not in runtimes
+    cases = [first] + list(streamed)
+    assert len(cases) == len(set(cases))
+    assert sorted(cases) == sorted(expected)
+    assert set(runtimes) == {"parse", "positiveTestGen", "negativeTestGen"}
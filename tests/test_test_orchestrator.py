@@ -5,7 +5,15 @@ import yaml
 import pytest
 
 import kubernetes as k8s
-from illuminatio.test_orchestrator import NetworkTestOrchestrator
+from illuminatio.equivalence import PodEquivalence
+from illuminatio.host import ClusterHost
+from illuminatio.k8s_util import create_node_name_affinity
+from illuminatio.test_case import NetworkTestCase
+from illuminatio.test_orchestrator import (
+    NetworkTestOrchestrator,
+    group_target_hosts,
+    select_sender_pods,
+)
 
 
 def createOrchestrator(cases):
@@ -137,6 +145,33 @@ def test_create_daemonset_manifest_containerd_custom_socket():
     assert result == expected
 
 
+def test_create_daemonset_manifest_runner_metrics():
+    orch = createOrchestrator([])
+    orch.set_runner_image("inovex/illuminatio-runner:dev")
+    orch.runner_metrics = True
+
+    expected = get_manifest("docker.yaml")
+    result = orch.create_daemonset_manifest(
+        "illuminatio-runner",
+        "illuminatio-runner",
+        "illuminatio-cases-cfgmap",
+        "docker://18.9.3",
+        None,
+    )
+    container = result["spec"]["template"]["spec"]["containers"][0]
+    expected_container = expected["spec"]["template"]["spec"]["containers"][0]
+    assert container["args"] == expected_container["args"] + ["--metrics-port=9102"]
+    assert container["ports"] == [{"containerPort": 9102, "name": "metrics"}]
+    assert container["livenessProbe"]["httpGet"] == {
+        "path": "/healthz",
+        "port": "metrics",
+    }
+    assert container["readinessProbe"]["httpGet"] == {
+        "path": "/readyz",
+        "port": "metrics",
+    }
+
+
 def test_create_daemonset_manifest_unsupported():
     orch = createOrchestrator([])
     orch.set_runner_image("inovex/illuminatio-runner:dev")
@@ -153,3 +188,284 @@ def test_create_daemonset_manifest_unsupported():
             container_runtime,
             None,
         )
+
+
+@pytest.mark.parametrize(
+    "hosts,known_hosts,expected_group_sizes",
+    [
+        pytest.param(
+            [
+                ClusterHost("default", {"app": "a"}),
+                ClusterHost("default", {"tier": "b"}),
+            ],
+            [],
+            [2],
+            id="Compatible labels share a pod",
+        ),
+        pytest.param(
+            [
+                ClusterHost("default", {"app": "a"}),
+                ClusterHost("default", {"app": "b"}),
+            ],
+            [],
+            [1, 1],
+            id="Conflicting label values need separate pods",
+        ),
+        pytest.param(
+            [ClusterHost("default", {"app": "a"}), ClusterHost("other", {"tier": "b"})],
+            [],
+            [1, 1],
+            id="Different namespaces need separate pods",
+        ),
+        pytest.param(
+            [
+                ClusterHost("default", {"app": "a"}),
+                ClusterHost("default", {"tier": "b"}),
+            ],
+            [ClusterHost("default", {"app": "a", "tier": "b"})],
+            [1, 1],
+            id="Merged labels must not match additional known hosts",
+        ),
+    ],
+)
+def test_group_target_hosts(hosts, known_hosts, expected_group_sizes):
+    pending = [(host, "marker-%s" % i, [80]) for i, host in enumerate(hosts)]
+    groups = group_target_hosts(pending, known_hosts + hosts, [])
+    assert [len(group) for group in groups] == expected_group_sizes
+
+
+def _ingress_policy(pod_labels, peer_labels):
+    return k8s.client.V1NetworkPolicy(
+        metadata=k8s.client.V1ObjectMeta(name="p", namespace="default"),
+        spec=k8s.client.V1NetworkPolicySpec(
+            pod_selector=k8s.client.V1LabelSelector(match_labels=pod_labels),
+            ingress=[
+                k8s.client.V1NetworkPolicyIngressRule(
+                    _from=[
+                        k8s.client.V1NetworkPolicyPeer(
+                            pod_selector=k8s.client.V1LabelSelector(
+                                match_labels=peer_labels
+                            )
+                        )
+                    ]
+                )
+            ],
+        ),
+    )
+
+
+def test_group_target_hosts_keeps_differently_policied_hosts_apart():
+    hosts = [
+        ClusterHost("default", {"app": "a"}),
+        ClusterHost("default", {"tier": "b"}),
+        ClusterHost("default", {"role": "c"}),
+    ]
+    pending = [(host, "marker-%s" % i, [80]) for i, host in enumerate(hosts)]
+    policies = [
+        _ingress_policy({"app": "a"}, {"app": "x"}),
+        _ingress_policy({"tier": "b"}, {"app": "y"}),
+    ]
+    groups = group_target_hosts(pending, hosts, policies)
+    # a pod with app=a and tier=b would accept app=x on behalf of the tier=b host
+    assert [[member[0] for member in group] for group in groups] == [
+        [hosts[0]],
+        [hosts[1]],
+        [hosts[2]],
+    ]
+    # hosts no policy tells apart still share a pod
+    unpolicied = [
+        ClusterHost("default", {"role": "c"}),
+        ClusterHost("default", {"zone": "d"}),
+    ]
+    pending = [(host, "marker-%s" % i, [80]) for i, host in enumerate(unpolicied)]
+    assert len(group_target_hosts(pending, unpolicied, policies)) == 1
+
+
+def test_group_target_hosts_without_policies_does_not_consolidate():
+    hosts = [
+        ClusterHost("default", {"app": "a"}),
+        ClusterHost("default", {"tier": "b"}),
+    ]
+    pending = [(host, "marker-%s" % i, [80]) for i, host in enumerate(hosts)]
+    assert len(group_target_hosts(pending, hosts)) == 2
+
+
+def _pod_on_node(name, node):
+    return k8s.client.V1Pod(
+        metadata=k8s.client.V1ObjectMeta(namespace="default", name=name),
+        spec=k8s.client.V1PodSpec(containers=[], node_name=node),
+    )
+
+
+def test_select_sender_pods_balances_probes_across_nodes():
+    pod_a1 = _pod_on_node("a1", "node-a")
+    pod_b1 = _pod_on_node("b1", "node-b")
+    pod_a2 = _pod_on_node("a2", "node-a")
+    pod_b2 = _pod_on_node("b2", "node-b")
+    pods_per_host = {
+        "default:app=web": [pod_a1, pod_b1],
+        "default:app=db": [pod_a2, pod_b2],
+        "default:app=cache": [pod_a2],
+    }
+    probes_per_host = {
+        "default:app=web": 10,
+        "default:app=db": 8,
+        "default:app=cache": 3,
+    }
+    selected = select_sender_pods(pods_per_host, probes_per_host)
+    assert selected["default:app=web"] is pod_a1
+    assert selected["default:app=db"] is pod_b2
+    assert selected["default:app=cache"] is pod_a2
+
+
+def test_wait_for_sender_nodes_waits_for_unscheduled_senders():
+    orch = createOrchestrator([])
+    unscheduled = _pod_on_node("dummy", None)
+    orch._sender_pods = [_pod_on_node("a1", "node-a"), unscheduled]
+    api_mock = k8s.client.CoreV1Api()
+    api_mock.read_namespaced_pod = MagicMock(
+        return_value=_pod_on_node("dummy", "node-b")
+    )
+    assert orch._wait_for_sender_nodes(api_mock) == ["node-a", "node-b"]
+    api_mock.read_namespaced_pod.assert_called_once_with("dummy", "default")
+
+
+def test_restricted_runners_without_scheduled_senders_run_everywhere(monkeypatch):
+    monkeypatch.setattr("illuminatio.test_orchestrator.time.sleep", lambda _: None)
+    orch = createOrchestrator([])
+    orch.restrict_runners = True
+    orch._ensure_service_account_exists = MagicMock()
+    orch._ensure_cluster_role_exists = MagicMock()
+    orch._ensure_cluster_role_binding_exists = MagicMock()
+    orch._ensure_daemonset_exists = MagicMock()
+    orch._ensure_daemonset_ready = MagicMock(return_value={"app": "runner"})
+    orch.ensure_daemonset_is_ready("cases", None, None, "/run/containerd.sock")
+    assert orch._ensure_daemonset_exists.call_args[0][-1] is None
+    api_mock = k8s.client.CoreV1Api()
+    runner = _pod_on_node("runner", "node-a")
+    api_mock.list_namespaced_pod = MagicMock(
+        return_value=k8s.client.V1PodList(items=[runner])
+    )
+    api_mock.read_namespaced_config_map = MagicMock(
+        return_value=k8s.client.V1ConfigMap(
+            metadata=k8s.client.V1ObjectMeta(name="runner-results"),
+            data={"results": "{}"},
+        )
+    )
+    assert orch.collect_results({"app": "runner"}, api_mock) == ({}, {})
+    api_mock.read_namespaced_config_map.assert_called_once()
+
+
+def _daemonset(generation, observed_generation, updated, ready, affinity=None):
+    return k8s.client.V1DaemonSet(
+        metadata=k8s.client.V1ObjectMeta(name="runner", generation=generation),
+        spec=k8s.client.V1DaemonSetSpec(
+            selector=k8s.client.V1LabelSelector(match_labels={"app": "runner"}),
+            template=k8s.client.V1PodTemplateSpec(
+                spec=k8s.client.V1PodSpec(containers=[], affinity=affinity)
+            ),
+        ),
+        status=k8s.client.V1DaemonSetStatus(
+            current_number_scheduled=2,
+            desired_number_scheduled=2,
+            number_misscheduled=0,
+            number_ready=ready,
+            observed_generation=observed_generation,
+            updated_number_scheduled=updated,
+        ),
+    )
+
+
+def test_daemonset_is_ready_once_a_new_node_set_is_rolled_out(monkeypatch):
+    monkeypatch.setattr("illuminatio.test_orchestrator.time.sleep", lambda _: None)
+    orch = createOrchestrator([])
+    apps_api = k8s.client.AppsV1Api()
+    apps_api.read_namespaced_daemon_set = MagicMock(
+        side_effect=[
+            _daemonset(1, 1, 2, 2, affinity={"nodeAffinity": {}}),
+            # the old status of two ready runners, before and during the rollout
+            _daemonset(2, 1, 2, 2),
+            _daemonset(2, 2, 1, 2),
+            _daemonset(2, 2, 2, 2),
+        ]
+    )
+    apps_api.patch_namespaced_daemon_set = MagicMock()
+    affinity = k8s.client.ApiClient().sanitize_for_serialization(
+        create_node_name_affinity(["node-b"])
+    )
+    orch._ensure_daemonset_exists("runner", "runner", "cases", apps_api, None, affinity)
+    apps_api.patch_namespaced_daemon_set.assert_called_once()
+    assert orch._ensure_daemonset_ready("runner", apps_api) == {"app": "runner"}
+    assert apps_api.read_namespaced_daemon_set.call_count == 4
+
+
+def test_ensure_cases_are_generated_against_fake_cluster(fake_cluster):
+    fake_cluster.add(
+        k8s.client.V1Node(metadata=k8s.client.V1ObjectMeta(name="node-a")),
+        k8s.client.V1Namespace(metadata=k8s.client.V1ObjectMeta(name="default")),
+        k8s.client.V1Pod(
+            metadata=k8s.client.V1ObjectMeta(
+                name="web", namespace="default", labels={"app": "web"}
+            ),
+            spec=k8s.client.V1PodSpec(
+                containers=[k8s.client.V1Container(name="web", image="nginx")]
+            ),
+        ),
+    )
+    core_api = k8s.client.CoreV1Api(fake_cluster.api_client())
+    case = NetworkTestCase(
+        ClusterHost("default", {"app": "web"}),
+        ClusterHost("default", {"app": "db"}),
+        "5432",
+        False,
+    )
+    orch = createOrchestrator([case])
+    orch.set_target_image("nginx")
+    orch.refresh_cluster_resources(core_api)
+    from_mappings, _, _, config_map_name = orch.ensure_cases_are_generated(core_api)
+    assert from_mappings == {"default:app=web": "default:web"}
+    assert [s["metadata"]["name"] for s in fake_cluster.objects("configmaps")] == [
+        config_map_name
+    ]
+    assert any(
+        p["metadata"]["labels"].get("app") == "db"
+        for p in fake_cluster.objects("pods", "default")
+    )
+
+
+def test_hosts_of_one_pod_class_share_sender_and_probes(fake_cluster):
+    labels = {"app": "web", "tier": "frontend"}
+    fake_cluster.add(
+        k8s.client.V1Node(metadata=k8s.client.V1ObjectMeta(name="node-a")),
+        k8s.client.V1Namespace(metadata=k8s.client.V1ObjectMeta(name="default")),
+        *[
+            k8s.client.V1Pod(
+                metadata=k8s.client.V1ObjectMeta(
+                    name=name, namespace="default", labels=labels
+                ),
+                spec=k8s.client.V1PodSpec(
+                    containers=[k8s.client.V1Container(name="web", image="nginx")]
+                ),
+            )
+            for name in ["web-1", "web-2"]
+        ],
+    )
+    core_api = k8s.client.CoreV1Api(fake_cluster.api_client())
+    target = ClusterHost("default", {"app": "db"})
+    cases = [
+        NetworkTestCase(ClusterHost("default", {"app": "web"}), target, "80", True),
+        NetworkTestCase(
+            ClusterHost("default", {"tier": "frontend"}), target, "80", True
+        ),
+    ]
+    orch = createOrchestrator(cases)
+    orch.set_target_image("nginx")
+    orch.refresh_cluster_resources(core_api)
+    resources = orch.cluster_resources()
+    orch.set_pod_classes(PodEquivalence(resources["pods"], resources["namespaces"], []))
+    from_mappings, _, _, _ = orch.ensure_cases_are_generated(core_api)
+    assert set(from_mappings.values()) == {"default:web-1"}
+    assert orch.class_members == {"default:web-1": ["default:web-1", "default:web-2"]}
+    (config_map,) = fake_cluster.objects("configmaps")
+    probes = yaml.safe_load(config_map["data"]["cases.yaml"])
+    assert [len(ports) for ports in probes["default:web-1"].values()] == [1]
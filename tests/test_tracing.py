@@ -0,0 +1,56 @@
+from illuminatio.tracing import Tracer
+
+
+def test_span_is_timed_but_not_recorded_while_disabled():
+    tracer = Tracer()
+    with tracer.span("parse") as span:
+        pass
+    assert span.duration >= 0
+    assert tracer.to_dict()["traceEvents"] == []
+
+
+def test_nested_spans_are_exported_as_complete_events():
+    tracer = Tracer()
+    tracer.enable()
+    with tracer.span("run", cases=3):
+        with tracer.span("generate") as inner:
+            inner.set_attribute("host", object())
+    events = tracer.to_dict()["traceEvents"]
+    assert [e["name"] for e in events] == ["generate", "run"]
+    assert all(e["ph"] == "X" for e in events)
+    inner_event, outer_event = events
+    assert outer_event["ts"] <= inner_event["ts"]
+    assert (
+        inner_event["ts"] + inner_event["dur"] <= outer_event["ts"] + outer_event["dur"]
+    )
+    assert outer_event["args"] == {"cases": 3}
+    assert isinstance(inner_event["args"]["host"], str)
+
+
+def test_traced_decorator():
+    tracer = Tracer()
+    tracer.enable()
+
+    @tracer.traced("work")
+    def work(value):
+        return value * 2
+
+    assert work(2) == 4
+    assert tracer.to_dict()["traceEvents"][0]["name"] == "work"
+
+
+def test_remote_events_are_stitched_into_own_process():
+    tracer = Tracer()
+    tracer.enable()
+    remote = [{"name": "probe", "ph": "X", "ts": 1, "dur": 2, "pid": 1, "tid": 1}]
+    tracer.add_remote_events(remote, "runner-a-results")
+    tracer.add_remote_events(remote, "runner-b-results")
+    events = tracer.to_dict()["traceEvents"]
+    metadata = [e for e in events if e["ph"] == "M"]
+    probes = [e for e in events if e["name"] == "probe"]
+    assert [m["args"]["name"] for m in metadata] == [
+        "runner-a-results",
+        "runner-b-results",
+    ]
+    assert {p["pid"] for p in probes} == {m["pid"] for m in metadata}
+    assert tracer.pid not in {p["pid"] for p in probes}
@@ -5,6 +5,7 @@ from illuminatio.util import (
     rand_port,
     add_illuminatio_labels,
     format_for,
+    iter_formatted,
     open_or_std,
     write_formatted,
     read_formatted,
@@ -13,7 +14,9 @@ from illuminatio.util import (
     STD_IDENTIFIER,
     YAML,
     JSON,
+    NDJSON,
 )
+from illuminatio import util
 
 
 @pytest.mark.parametrize(
@@ -22,6 +25,8 @@ from illuminatio.util import (
         ("foo.yaml", None, YAML),
         ("foo.yml", None, YAML),
         ("foo.json", None, JSON),
+        ("foo.ndjson", None, NDJSON),
+        ("foo.jsonl", None, NDJSON),
         ("foo", None, JSON),
         ("foo.yaml", "yaml", YAML),
         ("foo.yaml", "json", JSON),
@@ -79,3 +84,78 @@ def test_randPort_allButOnePortsExcepted_returnsRemainingPort():
 )
 def test_add_illuminatio_labels(test_input, expected):
     assert add_illuminatio_labels(test_input) == expected
+
+
+def test_ndjson_streams_records(tmp_path):
+    test_file = tmp_path / "test.ndjson"
+    write_formatted(({"n": n} for n in range(3)), test_file)
+    assert test_file.read_text() == '{"n":0}\n{"n":1}\n{"n":2}\n'
+    assert read_formatted(test_file) == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+def test_ndjson_rejects_mappings(tmp_path):
+    test_file = tmp_path / "results.ndjson"
+    with pytest.raises(ValueError):
+        write_formatted({"cases": {}, "runtimes": {}}, test_file)
+    assert not test_file.exists()
+
+
+def test_iter_formatted_yields_records(tmp_path):
+    test_file = tmp_path / "test.jsonl"
+    test_file.write_text('{"n":0}\n\n{"n":1}\n')
+    records = iter_formatted(test_file)
+    assert next(records) == {"n": 0}
+    assert list(records) == [{"n": 1}]
+    with pytest.raises(ValueError):
+        next(iter_formatted(tmp_path / "test.yaml"))
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"default:app=web": {"localhost": ["80", "-443"]}, "ok": True, "n": None},
+        {"ports": [80, 2**63 - 1], "empty": {}, "none": []},
+        {"caf\u00e9": "\u00e9t\u00e9 \U0001f600"},
+        {"runtime": 1e-05, "overall": 0.1},
+        {"nan": float("nan"), "inf": float("inf")},
+        {"large": 2**70},
+    ],
+)
+def test_json_output_matches_standard_library(tmp_path, data):
+    test_file = tmp_path / "test.json"
+    write_formatted(data, test_file)
+    assert test_file.read_text() == json.dumps(data, indent=2)
+    assert json.dumps(read_formatted(test_file)) == json.dumps(data)
+    lines_file = tmp_path / "test.ndjson"
+    write_formatted([data], lines_file)
+    assert lines_file.read_text() == json.dumps(data, separators=(",", ":")) + "\n"
+    assert json.dumps(read_formatted(lines_file)) == json.dumps([data])
+
+
+def test_orjson_encodes_plain_data_only():
+    assert util._orjson_encodable({"a": ["80", "-443", 2**63 - 1, True, None]})
+    assert not util._orjson_encodable({"a": ["\u00e9"]})
+    assert not util._orjson_encodable({"a": [0.5]})
+    assert not util._orjson_encodable({1: "a"})
+    assert not util._orjson_encodable([2**64])
+
+
+def test_large_integers_load_exactly(tmp_path):
+    test_file = tmp_path / "test.json"
+    test_file.write_text('{"large": %d}' % 2**70)
+    assert read_formatted(test_file)["large"] == 2**70
+    assert isinstance(read_formatted(test_file)["large"], int)
+
+
+def test_msgpack_roundtrip(tmp_path):
+    pytest.importorskip("msgpack")
+    data = {"a": {"b": ["80", "-443"]}, "c": {"success": True}}
+    test_file = tmp_path / "test.msgpack"
+    write_formatted(data, test_file)
+    assert read_formatted(test_file) == data
+
+
+def test_msgpack_without_package(monkeypatch):
+    monkeypatch.setitem(util.FORMATS, "msgpack", None)
+    with pytest.raises(ValueError, match="illuminatio\\[fast\\]"):
+        format_for("results.msgpack")